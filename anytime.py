@@ -0,0 +1,74 @@
+import random
+import time
+
+from local_search import EPSILON, double_bridge, iter_two_opt_or_opt, two_opt_or_opt
+
+DEFAULT_REPORT_INTERVAL = 0.5  # Seconds between progress reports while a search is improving
+MIN_PERTURBATION_CITIES = 8
+
+
+class TourUpdate:
+    """A better tour found by an anytime solve
+
+    ``route`` is the closed route (start city repeated at the end), ``distance`` its
+    length in km, ``elapsed`` the seconds since the solve started and ``phase`` the
+    step that found it ("construction", "improvement", "perturbation" or "exact").
+    """
+
+    __slots__ = ("route", "distance", "elapsed", "phase")
+
+    def __init__(self, route, distance, elapsed, phase):
+        self.route = route
+        self.distance = distance
+        self.elapsed = elapsed
+        self.phase = phase
+
+    def __repr__(self):
+        return f"TourUpdate({self.phase}, {self.distance:.2f} km, {self.elapsed:.2f}s)"
+
+
+def remaining_time(deadline):
+    """Seconds left until a time.monotonic() deadline, None without one"""
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def improve_anytime(tour, dist, neighbors, length, deadline=None, cancel=None,
+                    report_interval=DEFAULT_REPORT_INTERVAL, seed=None):
+    """Improve a tour until the deadline, yielding (phase, tour, length) for better tours
+
+    2-opt/Or-opt runs to a local optimum first. If a ``deadline`` (a time.monotonic()
+    value) leaves time after that, the search continues with double-bridge kicks,
+    each repaired by a local search around the kicked edges and kept only if the
+    tour got shorter. Reports are at least ``report_interval`` seconds apart, except
+    the last one, and a better tour is reported at most ``report_interval`` seconds
+    after it was found. ``length(tour)`` gives a tour's closed length and ``cancel`` (e.g.
+    a threading.Event) stops the search as soon as it is set.
+    """
+    best_length = length(tour)
+    for current, moves in iter_two_opt_or_opt(tour, dist, neighbors, time_budget=remaining_time(deadline),
+                                              report_interval=report_interval, cancel=cancel):
+        current_length = length(current)
+        if moves and current_length < best_length - EPSILON:
+            best_length = current_length
+            yield "improvement", current, current_length
+    tour = current
+
+    if deadline is None or len(tour) < MIN_PERTURBATION_CITIES:
+        return
+    rng = random.Random(seed)
+    last_report = time.monotonic()
+    unreported = False
+    while remaining_time(deadline) > 0 and not (cancel is not None and cancel.is_set()):
+        candidate, touched = double_bridge(tour, rng)
+        candidate, _ = two_opt_or_opt(candidate, dist, neighbors, time_budget=remaining_time(deadline),
+                                      active=touched)
+        candidate_length = length(candidate)
+        if candidate_length < best_length - EPSILON:
+            tour, best_length, unreported = candidate, candidate_length, True
+        # Checked after every kick, so a pending tour waits for the interval, not for the next improvement
+        if unreported and time.monotonic() - last_report >= report_interval:
+            last_report = time.monotonic()
+            unreported = False
+            yield "perturbation", tour, best_length
+    if unreported:
+        yield "perturbation", tour, best_length
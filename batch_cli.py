@@ -0,0 +1,213 @@
+"""Solve many tour CSV files in parallel without a display
+
+Example:
+    python batch_cli.py tours/ --output-dir results --format csv --render none
+
+Inputs are CSV files, directories (every *.csv inside) or manifest files listing
+one CSV path per line. Every tour is solved in its own worker process; all workers
+share one on-disk geocode cache. A summary with the throughput is written to
+``batch_summary.json`` in the output directory.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from city_tour_optimizer import SOLVERS
+from decomposition import DEFAULT_CLUSTER_SIZE
+from geocode_cache import DEFAULT_CACHE_PATH
+from geocoding import DEFAULT_RATE_LIMIT
+
+OUTPUT_FORMATS = ("json", "csv")
+RENDER_CHOICES = ("none", "png", "html", "both")
+SUMMARY_FILE = "batch_summary.json"
+
+
+def collect_inputs(paths):
+    """Expand files, directories and manifests into a sorted, de-duplicated list of CSV paths"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".csv"))
+        elif path.lower().endswith(".csv"):
+            found.append(path)
+        else:
+            # Manifest: one path per line, relative to the manifest, '#' starts a comment
+            base = os.path.dirname(os.path.abspath(path))
+            with open(path) as manifest:
+                for line in manifest:
+                    line = line.split("#", 1)[0].strip()
+                    if line:
+                        found.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return sorted(set(os.path.normpath(p) for p in found))
+
+
+def output_names(paths):
+    """Name of every input's outputs: its path relative to the inputs' common directory, without .csv
+
+    Inputs with the same file name in different directories keep the directories
+    apart, e.g. ``a/t1.csv`` and ``b/t1.csv`` become ``a/t1`` and ``b/t1``.
+    """
+    if not paths:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return {path: os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] for path in paths}
+
+
+def _column(value):
+    """Column given on the command line: a position if numeric, else a header name"""
+    if value is None:
+        return None
+    return int(value) if value.isdigit() else value
+
+
+def _route_rows(optimizer):
+    """One row per stop of the closed route: stop number, city, coordinates, leg and cumulative km"""
+    rows = []
+    total = 0.0
+    previous = None
+    for stop, index in enumerate(optimizer.optimized_route):
+        leg = 0.0 if previous is None else optimizer.distance(previous, index)
+        total += leg
+        lat, lon = optimizer.city_store.get_coordinates(index)
+        rows.append({"stop": stop, "city": optimizer.cities[index], "latitude": lat, "longitude": lon,
+                     "leg_km": round(leg, 3), "cumulative_km": round(total, 3)})
+        previous = index
+    return rows
+
+
+def solve_file(path, options, name=None):
+    """Load, geocode, solve and write one tour as ``name``; runs in a worker process"""
+    from city_tour_optimizer import CityTourOptimizer
+    from instrumentation import Instrumentation, LoggingSink
+
+    started = time.perf_counter()
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    optimizer = CityTourOptimizer(geocode_cache=options["geocode_cache"], solve_cache=options["solve_cache"],
+                                  instrumentation=Instrumentation(sinks=[LoggingSink()]))
+    optimizer.load_cities_from_csv(path, name_column=options["name_column"], lat_column=options["lat_column"],
+                                   lon_column=options["lon_column"])
+    optimizer.fetch_coordinates(rate_limit=options["rate_limit"])
+    n = len(optimizer.cities)
+    result = {"source": path, "cities": n}
+    if n == 0:
+        result.update(status="error", error="no cities with coordinates", seconds=time.perf_counter() - started)
+        return result
+
+    solver = optimizer.solve(options["solver"], time_budget=options["time_budget"],
+                             cluster_size=options["cluster_size"])
+
+    output_dir = options["output_dir"]
+    os.makedirs(os.path.dirname(os.path.join(output_dir, name)), exist_ok=True)
+    rows = _route_rows(optimizer)
+    if options["format"] == "csv":
+        output = os.path.join(output_dir, f"{name}_route.csv")
+        with open(output, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        output = os.path.join(output_dir, f"{name}_route.json")
+        with open(output, "w") as file:
+            json.dump({"source": path, "solver": solver, "total_distance_km": optimizer.total_distance,
+                       "route": rows}, file, indent=1)
+
+    render = options["render"]
+    if render in ("png", "both"):
+        optimizer.visualize_matplotlib(os.path.join(output_dir, f"{name}_route.png"), show=False)
+    if render in ("html", "both"):
+        optimizer.visualize_folium(os.path.join(output_dir, f"{name}_route.html"))
+
+    result.update(status="ok", solver=solver, total_distance_km=round(optimizer.total_distance, 3), output=output,
+                  seconds=round(time.perf_counter() - started, 3))
+    return result
+
+
+def _solve_file_safely(path, options, name):
+    try:
+        return solve_file(path, options, name)
+    except Exception as e:
+        return {"source": path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories of CSV files or manifest files")
+    parser.add_argument("--output-dir", default="batch_results")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json", help="route file format")
+    parser.add_argument("--render", choices=RENDER_CHOICES, default="none", help="maps to render per tour")
+    parser.add_argument("--solver", choices=SOLVERS, default="auto")
+    parser.add_argument("--time-budget", type=float, default=10.0, help="seconds of local search per tour")
+    parser.add_argument("--cluster-size", type=int, default=DEFAULT_CLUSTER_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--geocode-cache", default=DEFAULT_CACHE_PATH, help="SQLite cache shared by all workers")
+    parser.add_argument("--solve-cache", help="SQLite cache of solved tours shared by all workers and runs")
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE_LIMIT,
+                        help="geocoding requests per second across all workers")
+    parser.add_argument("--name-column", default="0")
+    parser.add_argument("--lat-column")
+    parser.add_argument("--lon-column")
+    parser.add_argument("--verbose", action="store_true", help="log every optimizer message")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        parser.error("no CSV files found")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    workers = max(1, min(args.workers, len(paths)))
+    options = {
+        "output_dir": args.output_dir,
+        "format": args.format,
+        "render": args.render,
+        "solver": args.solver,
+        "time_budget": args.time_budget,
+        "cluster_size": args.cluster_size,
+        "geocode_cache": args.geocode_cache,
+        "solve_cache": args.solve_cache,
+        # The geocoding rate limit is split evenly between the workers
+        "rate_limit": args.rate_limit / workers if args.rate_limit else None,
+        "name_column": _column(args.name_column),
+        "lat_column": _column(args.lat_column),
+        "lon_column": _column(args.lon_column),
+    }
+
+    names = output_names(paths)
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_solve_file_safely, path, options, names[path]) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["status"] == "ok":
+                print(f"{result['source']}: {result['cities']} cities, {result['total_distance_km']:.2f} km "
+                      f"({result['solver']}, {result['seconds']:.2f}s)")
+            else:
+                print(f"{result['source']}: {result['error']}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    solved = sum(result["status"] == "ok" for result in results)
+    summary = {
+        "tours": len(paths),
+        "solved": solved,
+        "failed": len(paths) - solved,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "tours_per_second": round(len(paths) / elapsed, 3) if elapsed else None,
+        "results": sorted(results, key=lambda result: result["source"]),
+    }
+    with open(os.path.join(args.output_dir, SUMMARY_FILE), "w") as file:
+        json.dump(summary, file, indent=2)
+    print(f"Solved {solved}/{len(paths)} tours in {elapsed:.2f}s ({summary['tours_per_second']} tours/s) "
+          f"with {workers} workers")
+    return 0 if solved == len(paths) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Benchmark the load -> geocode -> matrix -> solve -> render pipeline on synthetic tours
+
+Example:
+    python benchmark.py --sizes 10 100 1000 10000 --output benchmark_results.json
+
+Every (distribution, size) run executes in a fresh process, so the peak RSS
+recorded after each stage belongs to that run alone.
+
+    python benchmark.py --check-imports
+
+only checks that solving without geocoding or maps imports none of the rendering
+and geocoding libraries, and that importing the optimizer stays within budget.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DISTRIBUTIONS = ("uniform", "clustered", "corridor")
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+HEAVY_MODULES = ("folium", "matplotlib", "geopy", "pandas")  # Not needed to solve a tour
+DEFAULT_IMPORT_BUDGET = 0.5  # Seconds to import city_tour_optimizer in a fresh interpreter
+IMPORT_CHECK_RUNS = 3
+
+# Solver-only use of the optimizer, run in a fresh interpreter by check_imports with
+# the module names to look for as arguments
+IMPORT_CHECK_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from city_tour_optimizer import CityTourOptimizer
+from instrumentation import Instrumentation
+import_seconds = time.perf_counter() - started
+
+optimizer = CityTourOptimizer(geocode_cache=None, instrumentation=Instrumentation(sinks=[]))
+for i in range(200):
+    optimizer.city_store.append(f"City {i}", (8.0 + (i * 7919 % 240) / 10, 68.0 + (i * 104729 % 240) / 10))
+optimizer.solve("heuristic", time_budget=1)
+optimizer.solve("lk", time_budget=0.2)
+optimizer.solve_clustered(cluster_size=50, time_budget=1, max_workers=1)
+optimizer.cities = optimizer.cities[:10]
+optimizer.solve("exact")
+loaded = sorted(module for module in sys.modules if module.split(".")[0] in sys.argv[1:])
+print(json.dumps({"import_seconds": import_seconds, "loaded": loaded}))
+"""
+
+# Roughly mainland India
+LAT_RANGE = (8.0, 32.0)
+LON_RANGE = (68.0, 92.0)
+
+
+def generate_points(distribution, n, seed=0):
+    """Synthetic (lat, lon) arrays: uniform, clustered around a few centers, or along a corridor"""
+    rng = np.random.default_rng(seed)
+    if distribution == "uniform":
+        lats = rng.uniform(*LAT_RANGE, n)
+        lons = rng.uniform(*LON_RANGE, n)
+    elif distribution == "clustered":
+        centers = max(1, int(np.sqrt(n) / 2))
+        center_lats = rng.uniform(*LAT_RANGE, centers)
+        center_lons = rng.uniform(*LON_RANGE, centers)
+        which = rng.integers(0, centers, n)
+        lats = center_lats[which] + rng.normal(0, 0.3, n)
+        lons = center_lons[which] + rng.normal(0, 0.3, n)
+    elif distribution == "corridor":
+        # A band along the Mumbai-Delhi highway
+        t = rng.uniform(0, 1, n)
+        lats = 19.07 + t * (28.70 - 19.07) + rng.normal(0, 0.15, n)
+        lons = 72.87 + t * (77.10 - 72.87) + rng.normal(0, 0.15, n)
+    else:
+        raise ValueError(f"Unknown distribution {distribution!r}")
+    return np.clip(lats, -90, 90), np.clip(lons, -180, 180)
+
+
+class _Location:
+    __slots__ = ("latitude", "longitude")
+
+    def __init__(self, latitude, longitude):
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class StubGeocoder:
+    """Answers geocode() from a precomputed table instead of the network"""
+
+    def __init__(self, coordinates):
+        self.coordinates = coordinates
+
+    def geocode(self, query, timeout=None):
+        city = query.rsplit(",", 1)[0]
+        lat, lon = self.coordinates[city]
+        return _Location(lat, lon)
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident set size, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(distribution, n, seed, max_dense, max_render, workdir):
+    """Run the whole pipeline once and return per-stage measurements"""
+    import matplotlib
+    matplotlib.use("Agg")
+    from city_tour_optimizer import CityTourOptimizer
+
+    lats, lons = generate_points(distribution, n, seed)
+    names = [f"City {i}" for i in range(n)]
+    csv_path = os.path.join(workdir, f"{distribution}_{n}.csv")
+    with open(csv_path, "w", newline="") as file:
+        csv.writer(file).writerows([name] for name in names)
+
+    geocoder = StubGeocoder(dict(zip(names, zip(lats.tolist(), lons.tolist()))))
+    optimizer = CityTourOptimizer(geocoder=geocoder, geocode_cache=None)
+    stages = []
+
+    def stage(name, func):
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            func()
+        stages.append({
+            "stage": name,
+            "seconds": round(time.perf_counter() - start, 6),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        })
+
+    dense = n <= max_dense
+    stage("load_cities_from_csv", lambda: optimizer.load_cities_from_csv(csv_path))
+    stage("fetch_coordinates", lambda: optimizer.fetch_coordinates(rate_limit=None))
+    if dense:
+        stage("calculate_distance_matrix", optimizer.calculate_distance_matrix)
+    stage("nearest_neighbor_tsp", optimizer.nearest_neighbor_tsp)
+    nn_distance = optimizer.total_distance
+    stage("improve_route", lambda: optimizer.improve_route(time_budget=60))
+
+    if n <= max_render:
+        stage("visualize_matplotlib",
+              lambda: optimizer.visualize_matplotlib(os.path.join(workdir, f"{distribution}_{n}.png"), show=False))
+        stage("visualize_folium",
+              lambda: optimizer.visualize_folium(os.path.join(workdir, f"{distribution}_{n}.html")))
+
+    return {
+        "distribution": distribution,
+        "n": n,
+        "seed": seed,
+        "distance_mode": "dense" if dense else "on-demand",
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages), 6),
+        "quality": {
+            "nearest_neighbor_km": round(nn_distance, 3),
+            "improved_km": round(optimizer.total_distance, 3),
+            "improvement": round(1 - optimizer.total_distance / nn_distance, 6) if nn_distance else 0.0,
+        },
+    }
+
+
+def _run_case_in_child(args):
+    return run_case(*args)
+
+
+def check_imports(budget=DEFAULT_IMPORT_BUDGET, runs=IMPORT_CHECK_RUNS):
+    """Import time of city_tour_optimizer and the heavy modules a solver-only run loads
+
+    Each run uses a fresh interpreter; the fastest import counts. ``ok`` is False if
+    any of HEAVY_MODULES was imported or the import took longer than ``budget`` seconds.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_CHECK_SCRIPT, *HEAVY_MODULES], capture_output=True, text=True,
+                                cwd=here, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    import_seconds = min(sample["import_seconds"] for sample in samples)
+    loaded = sorted({module.split(".")[0] for sample in samples for module in sample["loaded"]})
+    return {
+        "import_seconds": round(import_seconds, 4),
+        "budget_seconds": budget,
+        "heavy_modules_loaded": loaded,
+        "ok": not loaded and import_seconds <= budget,
+    }
+
+
+def git_revision():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--distributions", nargs="+", choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-dense", type=int, default=20000,
+                        help="largest n for which the dense distance matrix is built")
+    parser.add_argument("--max-render", type=int, default=10000,
+                        help="largest n for which the maps are rendered")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument("--check-imports", action="store_true",
+                        help="only run the import check, exiting with status 1 if it fails")
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET,
+                        help="seconds allowed for importing city_tour_optimizer")
+    args = parser.parse_args(argv)
+
+    imports = check_imports(args.import_budget)
+    print(f"import city_tour_optimizer: {imports['import_seconds']:.3f}s (budget {args.import_budget}s), "
+          f"heavy modules loaded by a solver-only run: {', '.join(imports['heavy_modules_loaded']) or 'none'}")
+    if args.check_imports:
+        return 0 if imports["ok"] else 1
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # A fresh process per run keeps the peak RSS figures independent
+        context = multiprocessing.get_context("spawn")
+        for distribution in args.distributions:
+            for n in args.sizes:
+                with context.Pool(1) as pool:
+                    result = pool.apply(_run_case_in_child,
+                                        ((distribution, n, args.seed, args.max_dense, args.max_render, workdir),))
+                results.append(result)
+                timings = ", ".join(f"{s['stage']} {s['seconds']:.3f}s" for s in result["stages"])
+                print(f"{distribution:>9} n={n:<7} {timings}")
+
+    report = {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "imports": imports,
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
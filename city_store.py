@@ -0,0 +1,156 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+
+class CityStore:
+    """Cities held as a name list, a name -> index dict and parallel lat/lon arrays
+
+    The coordinate arrays are float64 with spare capacity, so appending is amortized
+    O(1). Cities without coordinates yet (not geocoded) hold NaN. Everything else in
+    the optimizer addresses cities by index.
+    """
+
+    __slots__ = ("names", "_index", "_lats", "_lons", "coordinates")
+
+    def __init__(self):
+        self.names = []
+        self._index = {}
+        self._lats = np.full(INITIAL_CAPACITY, np.nan)
+        self._lons = np.full(INITIAL_CAPACITY, np.nan)
+        # Dict-like view keyed by name, for code written against a coordinates dict
+        self.coordinates = CoordinateMapping(self)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __getitem__(self, i):
+        return self.names[i]
+
+    @property
+    def lats(self):
+        """Latitudes in city order (a view, NaN where unknown)"""
+        return self._lats[:len(self.names)]
+
+    @property
+    def lons(self):
+        """Longitudes in city order (a view, NaN where unknown)"""
+        return self._lons[:len(self.names)]
+
+    def coordinate_arrays(self):
+        """Copies of the latitude and longitude arrays, safe to hand to other objects"""
+        return self.lats.copy(), self.lons.copy()
+
+    def index(self, name):
+        """Index of a city, raises KeyError if it is not stored"""
+        return self._index[name]
+
+    def get_coordinates(self, i):
+        """(lat, lon) of city i, or None if it has no coordinates"""
+        lat = self._lats[i]
+        if lat != lat:
+            return None
+        return float(lat), float(self._lons[i])
+
+    def set_coordinates(self, i, coordinates):
+        """Set or, with None, clear the coordinates of city i"""
+        if coordinates is None:
+            self._lats[i] = self._lons[i] = np.nan
+        else:
+            self._lats[i], self._lons[i] = coordinates
+
+    def has_coordinates(self):
+        """Boolean mask of the cities with coordinates"""
+        return ~np.isnan(self.lats)
+
+    def append(self, name, coordinates=None):
+        """Add a city and return its index"""
+        n = len(self.names)
+        if n == len(self._lats):
+            self._grow(2 * n)
+        self.names.append(name)
+        self._index[name] = n
+        self.set_coordinates(n, coordinates)
+        return n
+
+    def swap_remove(self, i):
+        """Remove city i by moving the last city into its place"""
+        last = len(self.names) - 1
+        del self._index[self.names[i]]
+        if i != last:
+            name = self.names[last]
+            self.names[i] = name
+            self._index[name] = i
+            self._lats[i] = self._lats[last]
+            self._lons[i] = self._lons[last]
+        self.names.pop()
+        self._lats[last] = self._lons[last] = np.nan
+
+    def keep(self, mask):
+        """Keep only the cities where ``mask`` is true, preserving their order"""
+        mask = np.asarray(mask, dtype=bool)
+        lats, lons = self.lats[mask], self.lons[mask]
+        self.names = [name for name, keep in zip(self.names, mask.tolist()) if keep]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._lats[:] = self._lons[:] = np.nan
+        self._lats[:len(lats)] = lats
+        self._lons[:len(lons)] = lons
+
+    def clear(self):
+        self.names = []
+        self._index = {}
+        self._lats[:] = self._lons[:] = np.nan
+
+    def _grow(self, capacity):
+        for attribute in ("_lats", "_lons"):
+            old = getattr(self, attribute)
+            new = np.full(max(capacity, INITIAL_CAPACITY), np.nan)
+            new[:len(old)] = old
+            setattr(self, attribute, new)
+
+
+class CoordinateMapping(MutableMapping):
+    """``{city: (lat, lon)}`` view of a CityStore, listing only cities with coordinates
+
+    Assigning coordinates to an unknown name appends that city to the store.
+    """
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, name):
+        coordinates = self._store.get_coordinates(self._store.index(name))
+        if coordinates is None:
+            raise KeyError(name)
+        return coordinates
+
+    def __setitem__(self, name, coordinates):
+        if name in self._store:
+            self._store.set_coordinates(self._store.index(name), coordinates)
+        else:
+            self._store.append(name, coordinates)
+
+    def __delitem__(self, name):
+        self._store.set_coordinates(self._store.index(name), None)
+
+    def __contains__(self, name):
+        return name in self._store and self._store.get_coordinates(self._store.index(name)) is not None
+
+    def __iter__(self):
+        store = self._store
+        for name, known in zip(store.names, store.has_coordinates().tolist()):
+            if known:
+                yield name
+
+    def __len__(self):
+        return int(np.count_nonzero(self._store.has_coordinates()))
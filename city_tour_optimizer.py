@@ -1,272 +1,1098 @@
-import csv
-import math
-import folium
-import matplotlib.pyplot as plt
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-import time
-
-class CityTourOptimizer:
-    def __init__(self, csv_file=None):
-        self.cities = []
-        self.coordinates = {}
-        self.distance_matrix = []
-        self.optimized_route = []
-        self.total_distance = 0
-        
-        if csv_file:
-            self.load_cities_from_csv(csv_file)
-    
-    def load_cities_from_csv(self, csv_file):
-        """Load city names from a CSV file"""
-        try:
-            with open(csv_file, 'r') as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    if row:  # Check if row is not empty
-                        city = row[0].strip()
-                        if city and city not in self.cities:
-                            self.cities.append(city)
-            print(f"Loaded {len(self.cities)} cities from {csv_file}")
-        except FileNotFoundError:
-            print(f"Error: File {csv_file} not found")
-        except Exception as e:
-            print(f"Error reading CSV file: {e}")
-    
-    def fetch_coordinates(self):
-        """Fetch geographical coordinates for each city"""
-        geolocator = Nominatim(user_agent="city_tour_optimizer")
-        
-        for city in self.cities:
-            tries = 0
-            max_tries = 3
-            
-            while tries < max_tries:
-                try:
-                    # Add ", India" to ensure we get Indian cities
-                    location = geolocator.geocode(f"{city}, India")
-                    if location:
-                        self.coordinates[city] = (location.latitude, location.longitude)
-                        print(f"Found coordinates for {city}: {self.coordinates[city]}")
-                        break
-                    else:
-                        print(f"Warning: Could not find coordinates for {city}")
-                        break
-                except (GeocoderTimedOut, GeocoderServiceError):
-                    tries += 1
-                    if tries == max_tries:
-                        print(f"Error: Failed to fetch coordinates for {city} after {max_tries} attempts")
-                    else:
-                        print(f"Timeout fetching coordinates for {city}. Retrying ({tries}/{max_tries})...")
-                        time.sleep(1)  # Wait before retrying
-                except Exception as e:
-                    print(f"Error fetching coordinates for {city}: {e}")
-                    break
-            
-            # If we couldn't get coordinates after all tries, remove the city
-            if city not in self.coordinates:
-                print(f"Removing {city} from the list due to missing coordinates")
-                self.cities.remove(city)
-        
-        print(f"Successfully fetched coordinates for {len(self.coordinates)} cities")
-    
-    def haversine_distance(self, lat1, lon1, lat2, lon2):
-        """Calculate the great circle distance between two points on earth (in km)"""
-        # Convert decimal degrees to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        
-        # Haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Radius of earth in kilometers
-        return c * r
-    
-    def calculate_distance_matrix(self):
-        """Calculate the distance matrix between all cities"""
-        n = len(self.cities)
-        self.distance_matrix = [[0 for _ in range(n)] for _ in range(n)]
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    city_i = self.cities[i]
-                    city_j = self.cities[j]
-                    lat1, lon1 = self.coordinates[city_i]
-                    lat2, lon2 = self.coordinates[city_j]
-                    
-                    distance = self.haversine_distance(lat1, lon1, lat2, lon2)
-                    self.distance_matrix[i][j] = distance
-        
-        print("Distance matrix calculated successfully")
-    
-    def nearest_neighbor_tsp(self, start_city_index=0):
-        """Implement the Nearest Neighbor algorithm for TSP"""
-        n = len(self.cities)
-        if n == 0:
-            print("Error: No cities available for optimization")
-            return
-            
-        # Initialize variables
-        unvisited = set(range(n))
-        current = start_city_index
-        self.optimized_route = [current]
-        self.total_distance = 0
-        unvisited.remove(current)
-        
-        # Main loop to find the nearest unvisited city
-        while unvisited:
-            nearest = min(unvisited, key=lambda city: self.distance_matrix[current][city])
-            self.total_distance += self.distance_matrix[current][nearest]
-            current = nearest
-            self.optimized_route.append(current)
-            unvisited.remove(nearest)
-        
-        # Return to the starting city
-        self.total_distance += self.distance_matrix[current][start_city_index]
-        self.optimized_route.append(start_city_index)
-        
-        print("Optimized route calculated using Nearest Neighbor algorithm")
-        
-    def print_optimized_route(self):
-        """Print the optimized route with step-by-step details"""
-        if not self.optimized_route:
-            print("No optimized route available. Run the TSP algorithm first.")
-            return
-            
-        print("\n--- Optimized Tour Route ---")
-        print(f"Starting from: {self.cities[self.optimized_route[0]]}")
-        
-        for i in range(1, len(self.optimized_route)):
-            from_idx = self.optimized_route[i-1]
-            to_idx = self.optimized_route[i]
-            from_city = self.cities[from_idx]
-            to_city = self.cities[to_idx]
-            distance = self.distance_matrix[from_idx][to_idx]
-            
-            print(f"{i}. {from_city} → {to_city} ({distance:.2f} km)")
-        
-        print(f"\nTotal tour distance: {self.total_distance:.2f} km")
-        print(f"Number of cities visited: {len(self.cities)}")
-    
-    def visualize_matplotlib(self, save_path=None):
-        """Create a static visualization of the optimized route using Matplotlib"""
-        if not self.optimized_route:
-            print("No optimized route available. Run the TSP algorithm first.")
-            return
-        
-        plt.figure(figsize=(12, 10))
-        
-        # Plot all cities
-        lats = [self.coordinates[city][0] for city in self.cities]
-        lons = [self.coordinates[city][1] for city in self.cities]
-        plt.scatter(lons, lats, c='blue', s=50, label='Cities')
-        
-        # Plot the optimized route
-        route_lats = []
-        route_lons = []
-        for idx in self.optimized_route:
-            city = self.cities[idx]
-            lat, lon = self.coordinates[city]
-            route_lats.append(lat)
-            route_lons.append(lon)
-        
-        plt.plot(route_lons, route_lats, 'r-', linewidth=2, label='Optimized Route')
-        
-        # Mark the starting city
-        start_idx = self.optimized_route[0]
-        start_city = self.cities[start_idx]
-        start_lat, start_lon = self.coordinates[start_city]
-        plt.scatter(start_lon, start_lat, c='green', s=200, marker='*', label='Start/End City')
-        
-        # Add city labels
-        for city, (lat, lon) in self.coordinates.items():
-            plt.annotate(city, (lon, lat), fontsize=8, ha='right', va='bottom')
-        
-        plt.title('Optimized City Tour Route')
-        plt.xlabel('Longitude')
-        plt.ylabel('Latitude')
-        plt.grid(True)
-        plt.legend()
-        
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"Map saved to {save_path}")
-        
-        plt.show()
-    
-    def visualize_folium(self, save_path=None):
-        """Create an interactive visualization of the optimized route using Folium"""
-        if not self.optimized_route:
-            print("No optimized route available. Run the TSP algorithm first.")
-            return
-        
-        # Calculate center coordinates for the map
-        center_lat = sum(coord[0] for coord in self.coordinates.values()) / len(self.coordinates)
-        center_lon = sum(coord[1] for coord in self.coordinates.values()) / len(self.coordinates)
-        
-        # Create a map
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=6)
-        
-        # Add markers for each city
-        for city, (lat, lon) in self.coordinates.items():
-            tooltip = f"{city}"
-            # Make the start/end city marker more prominent
-            if city == self.cities[self.optimized_route[0]]:
-                folium.Marker(
-                    [lat, lon],
-                    popup=f"{city} (Start/End)",
-                    tooltip=tooltip,
-                    icon=folium.Icon(color='green', icon='star')
-                ).add_to(m)
-            else:
-                folium.Marker(
-                    [lat, lon],
-                    popup=city,
-                    tooltip=tooltip,
-                    icon=folium.Icon(color='blue')
-                ).add_to(m)
-        
-        # Draw the optimized route
-        route_points = []
-        for idx in self.optimized_route:
-            city = self.cities[idx]
-            lat, lon = self.coordinates[city]
-            route_points.append([lat, lon])
-        
-        folium.PolyLine(
-            route_points,
-            color='red',
-            weight=2.5,
-            opacity=1,
-            tooltip="Optimized Route"
-        ).add_to(m)
-        
-        # Add distance information
-        route_info = f"Total Distance: {self.total_distance:.2f} km<br>Cities: {len(self.cities)}"
-        title_html = f'<h3 align="center" style="font-size:16px"><b>Optimized City Tour</b><br>{route_info}</h3>'
-        m.get_root().html.add_child(folium.Element(title_html))
-        
-        if save_path:
-            m.save(save_path)
-            print(f"Interactive map saved to {save_path}")
-        
-        return m
-
-def main():
-    # Example usage
-    optimizer = CityTourOptimizer("cities.csv")
-    optimizer.fetch_coordinates()
-    optimizer.calculate_distance_matrix()
-    optimizer.nearest_neighbor_tsp()
-    optimizer.print_optimized_route()
-    
-    # Generate visualizations
-    optimizer.visualize_matplotlib("tour_route_static.png")
-    interactive_map = optimizer.visualize_folium("tour_route_interactive.html")
-    
-    print("\nVisualization complete! Check the generated files.")
-
-if __name__ == "__main__":
+import os
+import time
+import numpy as np
+from anytime import DEFAULT_REPORT_INTERVAL, TourUpdate, improve_anytime
+from city_store import CityStore
+from csv_loader import iter_unique_city_rows
+from decomposition import DEFAULT_CLUSTER_SIZE, solve_clustered
+from distance_engine import city_list_hash, haversine, haversine_to_many, load_distance_matrix, save_distance_matrix
+from distance_providers import DenseDistanceProvider, LazyNeighborLists, RoadDistanceProvider, create_distance_provider
+from folium_layers import DEFAULT_COORDINATE_PRECISION, DEFAULT_LARGE_TOUR_CITIES
+from geocode_cache import DEFAULT_CACHE_PATH, MISSING, open_geocode_cache
+from geocoding import (DEFAULT_MAX_TRIES, DEFAULT_MAX_WORKERS, DEFAULT_RATE_LIMIT, geocode_all, geocode_one,
+                       geopy_retry_errors, nominatim_geocoder)
+from held_karp import DEFAULT_BOUND_MAX_CITIES, DEFAULT_EXACT_MAX_CITIES, held_karp, held_karp_bound
+from instrumentation import Instrumentation, timed_stage
+from lin_kernighan import (CANDIDATE_POOL_FACTOR, DEFAULT_LK_CANDIDATES, DEFAULT_LK_DEPTH, lin_kernighan,
+                           quadrant_candidates)
+from local_search import DEFAULT_NEIGHBOR_K, nearest_neighbor_tour, tour_length, two_opt_or_opt
+from multistart import choose_starts, solve_multistart
+from road_network import DEFAULT_ROAD_CACHE_DIR, MAX_SNAP_KM
+from solve_cache import canonical_instance, from_canonical, open_solve_cache, to_canonical
+from vrp import DEFAULT_SAVINGS_NEIGHBORS, DEFAULT_SPEED_KMH, VehicleRouter
+from spatial_index import UnitSphereKDTree, chord_to_km
+
+# Seconds of local search spent around a city added to or removed from the route
+DEFAULT_REPAIR_BUDGET = 0.05
+SOLVERS = ("auto", "exact", "heuristic", "clustered", "lk")
+CLUSTERED_MIN_CITIES = 20000  # solve("auto") switches to the cluster-first solver from here
+# Attributes describing how good the route is, kept with it in the solve cache
+SOLUTION_STATS = ("heuristic_gap", "lower_bound", "lower_bound_gap")
+
+class CityTourOptimizer:
+    def __init__(self, csv_file=None, geocoder=None, geocode_cache=DEFAULT_CACHE_PATH, instrumentation=None,
+                 solve_cache=True):
+        # Names, a name -> index dict and lat/lon arrays; see the cities/coordinates properties
+        self.city_store = CityStore()
+        self.distance_matrix = []
+        self.distance_provider = None
+        self.optimized_route = []
+        self.total_distance = 0
+        self.heuristic_gap = None
+        # Held-Karp lower bound on the tour length and how far above it the route is, from solve_lk
+        self.lower_bound = None
+        self.lower_bound_gap = None
+        # Closed route per vehicle from solve_vrp, whose optimized_route then runs through them in turn
+        self.vehicle_routes = []
+        self.vehicle_plan = []
+        self.unserved_cities = []
+        
+        # Any object with a geopy-style geocode(query) method, Nominatim by default
+        self.geocoder = geocoder
+        # A GeocodeCache, a path to one, or None to always ask the geocoder
+        self.geocode_cache = geocode_cache
+        # A SolveCache, a path to an on-disk one, True for one in memory, or None to always solve
+        self.solve_cache = solve_cache
+        # Stage timings, counters and status messages, printed to stdout by default
+        self.instrumentation = instrumentation or Instrumentation()
+        self._reported_evaluations = 0
+        # Matplotlib figure reused by visualize_matplotlib
+        self._renderer = None
+        
+        if csv_file:
+            self.load_cities_from_csv(csv_file)
+    
+    @property
+    def cities(self):
+        """City names in index order"""
+        return self.city_store.names
+    
+    @cities.setter
+    def cities(self, names):
+        known = {name: self.city_store.get_coordinates(self.city_store.index(name))
+                 for name in names if name in self.city_store}
+        self.city_store.clear()
+        for name in names:
+            self.city_store.append(name, known.get(name))
+    
+    @property
+    def coordinates(self):
+        """``{city: (lat, lon)}`` view of the cities that have coordinates"""
+        return self.city_store.coordinates
+    
+    @coordinates.setter
+    def coordinates(self, coordinates):
+        self.city_store.lats[:] = self.city_store.lons[:] = np.nan
+        for city, value in coordinates.items():
+            self.city_store.coordinates[city] = value
+    
+    def _log(self, message, level="info"):
+        """Report a status message through the instrumentation sinks"""
+        self.instrumentation.message(message, level)
+    
+    def _count_distance_evaluations(self):
+        """Add the distance provider's new haversine evaluations to the counters"""
+        if self.distance_provider is None:
+            return
+        evaluations = self.distance_provider.evaluations
+        self.instrumentation.count("distance_evaluations", evaluations - self._reported_evaluations)
+        self._reported_evaluations = evaluations
+    
+    @timed_stage("load_cities_from_csv")
+    def load_cities_from_csv(self, csv_file, name_column=0, lat_column=None, lon_column=None, has_header=None):
+        """Load city names from a CSV file
+        
+        Rows are streamed and duplicates are detected with a set, so large files load
+        in linear time. Columns are given by position or by header name (the first row
+        is then read as a header). Valid latitude/longitude columns go straight into
+        ``coordinates`` and those cities are not geocoded.
+        """
+        try:
+            seen = set(self.city_store.names)
+            preset = 0
+            for city, coordinates in iter_unique_city_rows(csv_file, seen=seen, name_column=name_column,
+                                                           lat_column=lat_column, lon_column=lon_column,
+                                                           has_header=has_header):
+                self.city_store.append(city, coordinates)
+                if coordinates:
+                    preset += 1
+            self._log(f"Loaded {len(self.cities)} cities from {csv_file}")
+            if preset:
+                self._log(f"Coordinates for {preset} cities read from the file")
+        except FileNotFoundError:
+            self._log(f"Error: File {csv_file} not found", level="error")
+        except Exception as e:
+            self._log(f"Error reading CSV file: {e}", level="error")
+    
+    @timed_stage("fetch_coordinates")
+    def fetch_coordinates(self, rate_limit=DEFAULT_RATE_LIMIT, max_workers=DEFAULT_MAX_WORKERS,
+                          max_tries=DEFAULT_MAX_TRIES, timeout=None):
+        """Fetch geographical coordinates for each city
+        
+        Cities that already have coordinates (e.g. from the CSV file) are skipped, cached
+        cities are answered from the geocode cache, and the rest are geocoded
+        concurrently while staying under ``rate_limit`` requests per second. A ``timeout``
+        in seconds is passed to every ``geocode`` call; by default the geocoder's own applies.
+        """
+        self.geocode_cache = open_geocode_cache(self.geocode_cache)
+        
+        store = self.city_store
+        found = store.has_coordinates()
+        pending = []
+        
+        for i in np.flatnonzero(~found).tolist():
+            city = store[i]
+            # Add ", India" to ensure we get Indian cities
+            query = f"{city}, India"
+            cached = self.geocode_cache.get(query) if self.geocode_cache is not None else MISSING
+            if cached is MISSING:
+                pending.append(i)
+            elif cached:
+                self.instrumentation.count("geocode_cache_hits")
+                store.set_coordinates(i, cached)
+                found[i] = True
+                self._log(f"Found cached coordinates for {city}: {cached}")
+            else:
+                self.instrumentation.count("geocode_cache_hits")
+                self._log(f"Warning: Could not find coordinates for {city} (cached)", level="warning")
+        
+        if pending:
+            if self.geocoder is None:
+                self.geocoder = nominatim_geocoder()
+            retry_on = geopy_retry_errors()
+            
+            def on_retry(query, attempt, error):
+                self._log(f"Timeout fetching coordinates for {query}. Retrying ({attempt}/{max_tries})...", level="warning")
+            
+            queries = [f"{store[i]}, India" for i in pending]
+            results = geocode_all(
+                self.geocoder,
+                queries,
+                rate_limit=rate_limit,
+                max_workers=max_workers,
+                max_tries=max_tries,
+                timeout=timeout,
+                retry_on=retry_on,
+                on_retry=on_retry
+            )
+            
+            for i, query, result in zip(pending, queries, results):
+                city = store[i]
+                self.instrumentation.count("geocode_calls", result.attempts)
+                self.instrumentation.count("geocode_retries", max(result.attempts - 1, 0))
+                if result.coordinates:
+                    store.set_coordinates(i, result.coordinates)
+                    found[i] = True
+                    self._log(f"Found coordinates for {city}: {result.coordinates}")
+                elif result.error is None:
+                    self._log(f"Warning: Could not find coordinates for {city}", level="warning")
+                elif isinstance(result.error, retry_on):
+                    self._log(f"Error: Failed to fetch coordinates for {city} after {max_tries} attempts", level="error")
+                else:
+                    self._log(f"Error fetching coordinates for {city}: {result.error}", level="error")
+                
+                # Only definitive answers are cached, errors are retried next time
+                if self.geocode_cache is not None and result.error is None:
+                    self.geocode_cache.put(query, result.coordinates)
+        
+        # Drop cities we couldn't locate, keeping the others in order
+        for i in np.flatnonzero(~found).tolist():
+            self._log(f"Removing {store[i]} from the list due to missing coordinates", level="warning")
+        if not found.all():
+            store.keep(found)
+        
+        self._log(f"Successfully fetched coordinates for {len(store)} cities")
+    
+    def haversine_distance(self, lat1, lon1, lat2, lon2):
+        """Calculate the great circle distance between two points on earth (in km)"""
+        return haversine(lat1, lon1, lat2, lon2)
+    
+    @timed_stage("calculate_distance_matrix")
+    def calculate_distance_matrix(self, dtype=np.float64, road_graph=None, max_workers=None,
+                                  road_cache_dir=DEFAULT_ROAD_CACHE_DIR):
+        """Calculate the distance matrix between all cities
+        
+        The matrix is a contiguous ndarray (float64 by default, float32 halves the memory),
+        so ``distance_matrix[i][j]`` indexing keeps working. With ``road_graph`` (a RoadGraph
+        or the path to a saved one) distances follow the roads instead of straight lines;
+        the shortest paths run on ``max_workers`` processes and are cached in ``road_cache_dir``.
+        """
+        if road_graph is None:
+            self.build_distance_provider("dense", dtype=dtype)
+            self._log("Distance matrix calculated successfully")
+            return
+        
+        provider = self.build_distance_provider("road", graph=road_graph, dtype=dtype, max_workers=max_workers,
+                                                cache_dir=road_cache_dir)
+        for i in np.flatnonzero(provider.snap_km > MAX_SNAP_KM).tolist():
+            self._log(f"Warning: {self.cities[i]} is {provider.snap_km[i]:.1f} km from the nearest road", level="warning")
+        source = "read from the cache" if provider.cached else "calculated"
+        self._log(f"Road distance matrix {source} ({provider.graph.num_nodes} road nodes)")
+    
+    @timed_stage("build_distance_provider")
+    def build_distance_provider(self, kind="dense", **options):
+        """Choose how distances between cities are obtained
+        
+        - "dense": the full distance matrix, as calculate_distance_matrix builds
+        - "lazy": haversine on demand, keeping an LRU cache of ``cache_rows`` rows
+        - "knn": only the ``k`` nearest neighbors of each city are stored
+        - "road": the full matrix of shortest paths over a road ``graph``
+        
+        ``distance_matrix`` is the ndarray for "dense" and the provider itself otherwise,
+        so ``distance_matrix[i][j]`` works in every mode.
+        """
+        lats, lons = self.city_store.coordinate_arrays()
+        provider = create_distance_provider(kind, lats, lons, **options)
+        self.set_distance_provider(provider)
+        # Count the evaluations spent building it
+        self._reported_evaluations = 0
+        self._count_distance_evaluations()
+        return provider
+    
+    def set_distance_provider(self, provider):
+        """Use an existing distance provider built for the current cities, e.g. one kept from an earlier solve"""
+        self.distance_provider = provider
+        self._reported_evaluations = provider.evaluations
+        if isinstance(provider, DenseDistanceProvider):
+            self.distance_matrix = provider.matrix
+        else:
+            self.distance_matrix = provider
+    
+    @timed_stage("save_distance_matrix")
+    def save_distance_matrix(self, path):
+        """Save the dense distance matrix to a binary file for reuse by later runs"""
+        if not (self.has_distance_provider() and self.distance_provider.dense):
+            self._log("Error: No distance matrix to save. Run calculate_distance_matrix first.", level="error")
+            return False
+        
+        save_distance_matrix(path, self.distance_provider.matrix, city_list_hash(self.cities, self.coordinates))
+        self._log(f"Distance matrix saved to {path}")
+        return True
+    
+    @timed_stage("load_distance_matrix")
+    def load_distance_matrix(self, path, mmap=True):
+        """Load a distance matrix saved for the current cities, memory-mapped by default"""
+        try:
+            matrix = load_distance_matrix(path, city_list_hash(self.cities, self.coordinates), mmap=mmap)
+        except FileNotFoundError:
+            self._log(f"Error: File {path} not found", level="error")
+            return False
+        except ValueError as e:
+            self._log(f"Error loading distance matrix: {e}", level="error")
+            return False
+        
+        lats, lons = self.city_store.coordinate_arrays()
+        self.distance_provider = DenseDistanceProvider(lats, lons, matrix=matrix)
+        self._reported_evaluations = 0
+        self.distance_matrix = matrix
+        self._log(f"Distance matrix loaded from {path}")
+        return True
+    
+    def has_distance_provider(self):
+        """Check whether distances for the current cities are available"""
+        return self.distance_provider is not None and len(self.distance_provider) == len(self.cities) > 0
+    
+    def distance(self, i, j):
+        """Distance in km between the cities at indices i and j"""
+        if self.has_distance_provider():
+            return self.distance_provider.distance(i, j)
+        lat1, lon1 = self.city_store.get_coordinates(i)
+        lat2, lon2 = self.city_store.get_coordinates(j)
+        return self.haversine_distance(lat1, lon1, lat2, lon2)
+    
+    @timed_stage("nearest_neighbor_tsp")
+    def nearest_neighbor_tsp(self, start_city_index=0, use_spatial_index=None):
+        """Implement the Nearest Neighbor algorithm for TSP
+        
+        With ``use_spatial_index`` the next city is found with a KD-tree instead of a
+        distance matrix row, so no matrix is needed. By default the KD-tree is used
+        unless a dense distance matrix has been calculated.
+        """
+        n = len(self.cities)
+        if n == 0:
+            self._log("Error: No cities available for optimization", level="error")
+            return
+        self._reset_solution_stats()
+        
+        if use_spatial_index is None:
+            use_spatial_index = not (self.has_distance_provider() and self.distance_provider.dense)
+        if use_spatial_index:
+            self._nearest_neighbor_tsp_spatial(start_city_index)
+            self._log("Optimized route calculated using Nearest Neighbor algorithm (spatial index)")
+            return
+        if not self.has_distance_provider():
+            self.calculate_distance_matrix()
+            
+        tour, self.total_distance = nearest_neighbor_tour(self.distance_provider.row, n, start_city_index)
+        self.optimized_route = tour + [start_city_index]
+        self._count_distance_evaluations()
+        
+        self._log("Optimized route calculated using Nearest Neighbor algorithm")
+    
+    def _nearest_neighbor_tsp_spatial(self, start_city_index):
+        """Nearest Neighbor tour answering nearest-unvisited queries from a KD-tree"""
+        lats, lons = self.city_store.coordinate_arrays()
+        tree = UnitSphereKDTree(lats, lons)
+        
+        current = start_city_index
+        tree.remove(current)
+        route = [current]
+        chords = []
+        
+        for _ in range(len(self.cities) - 1):
+            nearest, chord = tree.nearest(current, exclude_self=False)
+            tree.remove(nearest)
+            route.append(nearest)
+            chords.append(chord)
+            current = nearest
+        
+        route.append(start_city_index)
+        self.optimized_route = route
+        self.total_distance = float(np.sum(chord_to_km(chords))) + self.distance(current, start_city_index)
+    
+    @timed_stage("improve_route")
+    def improve_route(self, time_budget=None, neighbor_k=DEFAULT_NEIGHBOR_K):
+        """Improve the optimized route in place with 2-opt and Or-opt local search
+        
+        Only the ``neighbor_k`` nearest cities are considered as new neighbors of each
+        city. ``time_budget`` (seconds) stops the search early, None runs it to a local optimum.
+        Without a distance provider, distances are computed on demand.
+        """
+        if not self.optimized_route:
+            self._log("No optimized route available. Run the TSP algorithm first.", level="warning")
+            return
+        if self._current_vehicle_routes():
+            self._log("improve_route works on a single tour, solve_vrp already improves vehicle routes", level="warning")
+            return
+        self._reset_solution_stats()
+        
+        if not self.has_distance_provider():
+            self.build_distance_provider("lazy")
+        previous_distance = self.total_distance
+        moves = self._local_search(self.distance_provider.neighbor_lists(neighbor_k), time_budget)
+        self._count_distance_evaluations()
+        self._log(f"Route improved with 2-opt/Or-opt ({moves} moves): "
+                  f"{previous_distance:.2f} km -> {self.total_distance:.2f} km")
+    
+    def _local_search(self, neighbors, time_budget, active=None):
+        """Run 2-opt/Or-opt on the optimized route, keep its start city and update the total distance"""
+        start = self.optimized_route[0]
+        tour, moves = two_opt_or_opt(self.optimized_route[:-1], self.distance_provider.distance, neighbors,
+                                     time_budget=time_budget, active=active)
+        
+        # Keep the tour starting and ending at the same city
+        i = tour.index(start)
+        tour = tour[i:] + tour[:i]
+        self.optimized_route[:] = tour + [start]
+        
+        if moves or active is None:
+            self.total_distance = self._route_length(tour)
+        self.instrumentation.count("improvement_moves", moves)
+        return moves
+    
+    def _route_length(self, tour):
+        """Length of a closed tour, summed over all edges at once"""
+        a = np.asarray(tour)
+        return float(self.distance_provider.pair_distances(a, np.roll(a, -1)).sum())
+    
+    def _reset_solution_stats(self):
+        """Forget the optimality gap and lower bound, which only hold for the route they were computed for"""
+        for name in SOLUTION_STATS:
+            setattr(self, name, None)
+    
+    def _set_route(self, tour, distance, start_city_index):
+        """Store a tour (without the repeated start) rotated to begin at the start city"""
+        i = tour.index(start_city_index)
+        self.optimized_route = tour[i:] + tour[:i] + [start_city_index]
+        self.total_distance = distance
+    
+    def solve_anytime(self, time_budget=None, deadline=None, cancel=None, start_city_index=0,
+                      report_interval=DEFAULT_REPORT_INTERVAL, neighbor_k=DEFAULT_NEIGHBOR_K,
+                      exact_max_cities=DEFAULT_EXACT_MAX_CITIES, seed=None):
+        """Solve step by step, yielding a TourUpdate every time a better tour is found
+        
+        The Nearest Neighbor tour comes first, then 2-opt/Or-opt improvements and, while
+        time remains, perturbation rounds. Tours up to ``exact_max_cities`` go straight
+        from the Nearest Neighbor tour to the Held-Karp optimum. The search ends at ``deadline`` (a time.monotonic() value) or
+        after ``time_budget`` seconds, or as soon as ``cancel`` (a threading.Event) is
+        set; without either limit it stops at the local optimum. ``optimized_route``
+        always holds the best tour so far.
+        
+        Finished searches are kept in the solve cache, so solving the same cities with
+        the same ``time_budget`` again yields the cached tour at once.
+        """
+        n = len(self.cities)
+        if n == 0:
+            self._log("Error: No cities available for optimization", level="error")
+            return
+        
+        started = time.monotonic()
+        # An absolute deadline is not part of the instance, so those searches are not cached
+        cache_key = None
+        if deadline is None:
+            cache_key = self._solve_cache_key(start_city_index, solver="anytime", time_budget=time_budget,
+                                              neighbor_k=neighbor_k, exact_max_cities=exact_max_cities, seed=seed)
+        if time_budget is not None:
+            deadline = started + time_budget if deadline is None else min(deadline, started + time_budget)
+        
+        def update(phase):
+            return TourUpdate(list(self.optimized_route), self.total_distance, time.monotonic() - started, phase)
+        
+        def cancelled():
+            return cancel is not None and cancel.is_set()
+        
+        if self._load_cached_route(cache_key, start_city_index):
+            yield update("cached")
+            return
+        
+        with self.instrumentation.stage("solve_anytime"):
+            if n <= exact_max_cities and not (self.has_distance_provider() and self.distance_provider.dense):
+                self.calculate_distance_matrix()
+            self.nearest_neighbor_tsp(start_city_index)
+            yield update("construction")
+            
+            if n <= exact_max_cities:
+                # The optimum takes milliseconds here, searching until the deadline can't beat it
+                if not cancelled():
+                    tour, length = held_karp(self.distance_provider.matrix, start_city_index)
+                    if length < self.total_distance - 1e-9:
+                        self._set_route(tour, length, start_city_index)
+                        yield update("exact")
+            else:
+                if not self.has_distance_provider():
+                    self.build_distance_provider("lazy")
+                if not cancelled():
+                    neighbors = self.distance_provider.neighbor_lists(neighbor_k)
+                    for phase, tour, length in improve_anytime(self.optimized_route[:-1],
+                                                               self.distance_provider.distance, neighbors,
+                                                               self._route_length, deadline=deadline, cancel=cancel,
+                                                               report_interval=report_interval, seed=seed):
+                        self._set_route(tour, length, start_city_index)
+                        yield update(phase)
+            
+            self._count_distance_evaluations()
+            if not cancelled():
+                self._store_cached_route(cache_key)
+            self._log(f"Anytime solve {'cancelled' if cancelled() else 'finished'} after "
+                      f"{time.monotonic() - started:.2f}s: {self.total_distance:.2f} km")
+    
+    def _geocode_city(self, city):
+        """Coordinates of a single city from the geocode cache or the geocoder, None if not found"""
+        self.geocode_cache = open_geocode_cache(self.geocode_cache)
+        query = f"{city}, India"
+        cached = self.geocode_cache.get(query) if self.geocode_cache is not None else MISSING
+        if cached is not MISSING:
+            self.instrumentation.count("geocode_cache_hits")
+            return cached
+        
+        if self.geocoder is None:
+            self.geocoder = nominatim_geocoder()
+        result = geocode_one(self.geocoder, query, retry_on=geopy_retry_errors())
+        self.instrumentation.count("geocode_calls", result.attempts)
+        if result.error is not None:
+            self._log(f"Error fetching coordinates for {city}: {result.error}", level="error")
+            return None
+        if self.geocode_cache is not None:
+            self.geocode_cache.put(query, result.coordinates)
+        return result.coordinates
+    
+    @timed_stage("add_city")
+    def add_city(self, city, coordinates=None, repair_budget=DEFAULT_REPAIR_BUDGET, neighbor_k=DEFAULT_NEIGHBOR_K):
+        """Add a city and insert it into the optimized route without re-solving
+        
+        Only the new city's row and column of the distance data are computed. The city
+        goes where it lengthens the route least, then 2-opt/Or-opt runs around it for at
+        most ``repair_budget`` seconds. Without ``coordinates`` the city is geocoded.
+        Returns the new city's index, or None if it could not be added.
+        """
+        if city in self.city_store:
+            self._log(f"{city} is already in the list", level="warning")
+            return None
+        if coordinates is None:
+            coordinates = self._geocode_city(city)
+            if coordinates is None:
+                self._log(f"Warning: Could not find coordinates for {city}", level="warning")
+                return None
+        self._drop_vehicle_routes()
+        
+        had_provider = self.has_distance_provider()
+        index = self.city_store.append(city, coordinates)
+        if had_provider:
+            self.distance_provider.add_point(*coordinates)
+            if self.distance_provider.dense:
+                self.distance_matrix = self.distance_provider.matrix
+        elif self.optimized_route:
+            self.build_distance_provider("lazy")
+        
+        if self.optimized_route:
+            # Cheapest insertion: the edge (a, b) minimising d(a, new) + d(new, b) - d(a, b)
+            tour = self.optimized_route[:-1]
+            a = np.asarray(tour)
+            b = np.roll(a, -1)
+            row = np.asarray(self.distance_provider.row(index), dtype=np.float64)
+            costs = row[a] + row[b] - self.distance_provider.pair_distances(a, b)
+            position = int(np.argmin(costs)) + 1
+            tour.insert(position, index)
+            self.optimized_route[:] = tour + [tour[0]]
+            self.total_distance += float(costs[position - 1])
+            self._reset_solution_stats()
+            
+            neighbors = LazyNeighborLists(self.distance_provider, neighbor_k)
+            self._local_search(neighbors, repair_budget, active=[int(a[position - 1]), index, int(b[position - 1])])
+        
+        self._count_distance_evaluations()
+        self._log(f"Added {city} at index {index}" +
+                  (f", route is now {self.total_distance:.2f} km" if self.optimized_route else ""))
+        return index
+    
+    @timed_stage("remove_city")
+    def remove_city(self, city, repair_budget=DEFAULT_REPAIR_BUDGET, neighbor_k=DEFAULT_NEIGHBOR_K):
+        """Remove a city (by name or index) and splice it out of the optimized route
+        
+        The last city takes over the removed city's index, so only one row and column
+        of the distance data move. The route is repaired with 2-opt/Or-opt around the
+        gap for at most ``repair_budget`` seconds. Returns True if the city was removed.
+        """
+        if isinstance(city, str):
+            if city not in self.city_store:
+                self._log(f"{city} is not in the list", level="warning")
+                return False
+            index = self.city_store.index(city)
+        else:
+            index = city
+            if not 0 <= index < len(self.cities):
+                self._log(f"No city at index {index}", level="warning")
+                return False
+        name = self.cities[index]
+        last = len(self.cities) - 1
+        self._drop_vehicle_routes()
+        had_provider = self.has_distance_provider()
+        
+        active = None
+        if self.optimized_route:
+            if not had_provider:
+                self.build_distance_provider("lazy")
+                had_provider = True
+            tour = self.optimized_route[:-1]
+            position = tour.index(index)
+            prev, nxt = tour[position - 1], tour[(position + 1) % len(tour)]
+            dist = self.distance_provider.distance
+            self.total_distance += dist(prev, nxt) - dist(prev, index) - dist(index, nxt)
+            del tour[position]
+            if index != last:
+                tour[tour.index(last)] = index
+            relabel = {last: index}
+            active = [relabel.get(prev, prev), relabel.get(nxt, nxt)]
+            self._reset_solution_stats()
+        
+        if had_provider:
+            self.distance_provider.remove_point(index)
+            if self.distance_provider.dense:
+                self.distance_matrix = self.distance_provider.matrix
+        self.city_store.swap_remove(index)
+        
+        if active is not None:
+            if len(tour) <= 1:
+                self.optimized_route = tour + tour
+                self.total_distance = 0.0
+            else:
+                self.optimized_route[:] = tour + [tour[0]]
+                if len(tour) > 3:
+                    neighbors = LazyNeighborLists(self.distance_provider, neighbor_k)
+                    self._local_search(neighbors, repair_budget, active=active)
+        
+        self._count_distance_evaluations()
+        self._log(f"Removed {name}" + (f", route is now {self.total_distance:.2f} km" if self.optimized_route else ""))
+        return True
+        
+    @timed_stage("solve_multistart")
+    def solve_multistart(self, num_starts=None, starts=None, random_starts=False, improve=True,
+                         time_budget=None, max_workers=None, start_city_index=0, seed=None):
+        """Run Nearest Neighbor (and the 2-opt/Or-opt improvement) from many start cities in parallel
+        
+        Start cities are ``starts`` if given, otherwise ``num_starts`` cities (4 per CPU by
+        default) spread over the list, or sampled at random with ``random_starts``.
+        ``time_budget`` limits the improvement of each start. The best tour is kept and
+        rotated to begin at ``start_city_index``.
+        """
+        n = len(self.cities)
+        if n == 0:
+            self._log("Error: No cities available for optimization", level="error")
+            return
+        self._reset_solution_stats()
+        if not (self.has_distance_provider() and self.distance_provider.dense):
+            self.calculate_distance_matrix()
+        
+        if starts is None:
+            num_starts = num_starts or 4 * (os.cpu_count() or 1)
+            starts = choose_starts(n, num_starts, random_starts, seed, include=start_city_index)
+        starts = list(starts)
+        
+        length, best_start, tour = solve_multistart(
+            self.distance_provider.matrix, starts, improve=improve, time_budget=time_budget,
+            max_workers=max_workers
+        )
+        
+        i = tour.index(start_city_index)
+        tour = tour[i:] + tour[:i]
+        self.optimized_route = tour + [start_city_index]
+        self.total_distance = length
+        self._log(f"Best tour of {len(starts)} starts found from {self.cities[best_start]}: {length:.2f} km")
+    
+    def solve(self, solver="auto", time_budget=None, start_city_index=0, cluster_size=DEFAULT_CLUSTER_SIZE):
+        """Solve with the named solver and return its name
+        
+        "auto" picks by size: "exact" (Held-Karp) up to DEFAULT_EXACT_MAX_CITIES cities,
+        "clustered" from CLUSTERED_MIN_CITIES, and "heuristic" (Nearest Neighbor +
+        2-opt/Or-opt for ``time_budget`` seconds) in between. "lk" runs solve_lk. An instance solved before
+        with the same solver, start city and options is answered from the solve cache.
+        """
+        n = len(self.cities)
+        if solver == "auto":
+            if n <= DEFAULT_EXACT_MAX_CITIES:
+                solver = "exact"
+            elif n >= CLUSTERED_MIN_CITIES:
+                solver = "clustered"
+            else:
+                solver = "heuristic"
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver {solver!r}, expected one of {SOLVERS}")
+        cache_key = self._solve_cache_key(start_city_index, solver=solver, time_budget=time_budget,
+                                          cluster_size=cluster_size)
+        if self._load_cached_route(cache_key, start_city_index):
+            return solver
+        
+        if solver == "exact":
+            self.solve_exact(start_city_index, time_budget=time_budget)
+        elif solver == "clustered":
+            self.solve_clustered(cluster_size=cluster_size, time_budget=time_budget, start_city_index=start_city_index)
+        elif solver == "lk":
+            self.solve_lk(time_budget=time_budget, start_city_index=start_city_index)
+        else:
+            self.nearest_neighbor_tsp(start_city_index)
+            self.improve_route(time_budget=time_budget)
+        self._store_cached_route(cache_key)
+        return solver
+    
+    def _solve_cache_key(self, start_city_index, **params):
+        """Cache key and canonical city order of the current instance, None if solves are not cached"""
+        self.solve_cache = open_solve_cache(self.solve_cache)
+        if self.solve_cache is None or not self.city_store.has_coordinates().all():
+            return None
+        # Road distances give other tours than straight lines, and differ per road graph
+        if self.has_distance_provider() and isinstance(self.distance_provider, RoadDistanceProvider):
+            params["distance"] = "road:" + self.distance_provider.graph.fingerprint().hex()
+        else:
+            params["distance"] = "haversine"
+        return canonical_instance(self.city_store.lats, self.city_store.lons, start_city_index, params)
+    
+    def _load_cached_route(self, cache_key, start_city_index):
+        """Use the cached tour of an instance solved before, mapped to the current city indices"""
+        if cache_key is None:
+            return False
+        entry = self.solve_cache.get(cache_key[0])
+        if entry is None:
+            self.instrumentation.count("solve_cache_misses")
+            return False
+        positions, distance, stats = entry
+        self._set_route(from_canonical(positions, cache_key[1]), distance, start_city_index)
+        # The gap and lower bound depend only on the instance, so they hold for the mapped tour too
+        for name in SOLUTION_STATS:
+            setattr(self, name, stats.get(name))
+        self.instrumentation.count("solve_cache_hits")
+        self._log(f"Route read from the solve cache: {distance:.2f} km")
+        return True
+    
+    def _store_cached_route(self, cache_key):
+        if cache_key is not None and self.optimized_route:
+            stats = {name: getattr(self, name) for name in SOLUTION_STATS if getattr(self, name) is not None}
+            self.solve_cache.put(cache_key[0], to_canonical(self.optimized_route[:-1], cache_key[1]),
+                                 self.total_distance, stats)
+    
+    @timed_stage("solve_vrp")
+    def solve_vrp(self, capacity=None, demands=None, time_windows=None, service_times=None, num_vehicles=None,
+                  depot_index=0, speed_kmh=DEFAULT_SPEED_KMH, time_budget=None, neighbor_k=DEFAULT_SAVINGS_NEIGHBORS):
+        """Split the cities into routes for vehicles that leave from and return to the depot city
+        
+        ``demands``, ``time_windows`` and ``service_times`` map city names to a demand (default 1),
+        an (earliest, latest) window in minutes after the depot opens in which service
+        must begin (default none) and minutes spent at the city (default 0). A window for
+        the depot bounds the whole shift. Each vehicle carries at most ``capacity``, travel
+        takes ``speed_kmh`` and at most ``num_vehicles`` routes are used; cities that fit
+        no route are listed in ``unserved_cities``.
+        
+        Routes are built with the savings algorithm and improved with relocate and
+        exchange moves between routes for at most ``time_budget`` seconds. Returns the
+        closed route of every vehicle, also kept in ``vehicle_routes``.
+        """
+        n = len(self.cities)
+        if n == 0:
+            self._log("Error: No cities available for optimization", level="error")
+            return []
+        if not self.has_distance_provider():
+            self.build_distance_provider("lazy")
+        
+        def per_city(values, default):
+            result = [default] * n
+            for city, value in (values or {}).items():
+                if city not in self.city_store:
+                    raise ValueError(f"Unknown city {city!r}")
+                result[self.city_store.index(city)] = value
+            return result
+        
+        windows = per_city(time_windows, (0.0, float("inf")))
+        router = VehicleRouter(
+            self.distance_provider.distance, n, depot_index,
+            demand=per_city(demands, 1.0),
+            capacity=float("inf") if capacity is None else capacity,
+            earliest=[window[0] for window in windows],
+            latest=[window[1] for window in windows],
+            service=per_city(service_times, 0.0),
+            minutes_per_km=60.0 / speed_kmh,
+            neighbors=self.distance_provider.neighbor_lists(neighbor_k),
+        )
+        router.construct([c for c in range(n) if c != depot_index])
+        if num_vehicles is not None:
+            router.limit_vehicles(num_vehicles)
+        moves = router.improve(time_budget)
+        self.instrumentation.count("improvement_moves", moves)
+        self._count_distance_evaluations()
+        
+        self.vehicle_plan = router.routes
+        self.vehicle_routes = [[depot_index] + route.stops + [depot_index] for route in router.routes]
+        self.unserved_cities = [self.cities[c] for c in router.unserved]
+        self.optimized_route = [depot_index]
+        for route in self.vehicle_routes:
+            self.optimized_route.extend(route[1:])
+        if not self.vehicle_routes:
+            self.optimized_route = []
+        self.total_distance = sum(route.length for route in router.routes)
+        self._reset_solution_stats()
+        
+        self._log(f"Vehicle routes calculated: {len(self.vehicle_routes)} vehicles, {self.total_distance:.2f} km "
+                  f"({moves} improving moves)")
+        if self.unserved_cities:
+            self._log(f"Warning: {len(self.unserved_cities)} cities fit no vehicle route: "
+                      f"{', '.join(self.unserved_cities)}", level="warning")
+        return self.vehicle_routes
+    
+    def _current_vehicle_routes(self):
+        """The vehicle routes, if the optimized route is still the one solve_vrp produced"""
+        if not self.vehicle_routes:
+            return []
+        walk = [self.vehicle_routes[0][0]]
+        for route in self.vehicle_routes:
+            walk.extend(route[1:])
+        return self.vehicle_routes if walk == self.optimized_route else []
+    
+    def _drop_vehicle_routes(self):
+        """Forget the vehicle routes before the city list changes, they are not repaired incrementally"""
+        if self._current_vehicle_routes():
+            self._log("Vehicle routes are not updated when cities change, run solve_vrp again", level="warning")
+            self.optimized_route = []
+            self.total_distance = 0
+        self.vehicle_routes = []
+        self.vehicle_plan = []
+    
+    @timed_stage("solve_clustered")
+    def solve_clustered(self, cluster_size=DEFAULT_CLUSTER_SIZE, method="kmeans", time_budget=None,
+                        max_workers=None, start_city_index=0, seed=0):
+        """Cluster-first, route-second tour for very large city sets
+        
+        Cities are split into clusters of about ``cluster_size`` ("kmeans" or "grid"),
+        every cluster is solved with Nearest Neighbor + 2-opt/Or-opt in parallel
+        (``time_budget`` seconds each), and the sub-tours are joined in centroid tour
+        order at the cheapest boundary edges. No n x n matrix is built, so peak memory
+        depends on the largest cluster rather than on n. The tour is planned by
+        straight-line distance; with a distance provider set, its length is measured by it.
+        """
+        n = len(self.cities)
+        if n == 0:
+            self._log("Error: No cities available for optimization", level="error")
+            return
+        
+        if self.has_distance_provider() and isinstance(self.distance_provider, RoadDistanceProvider):
+            self._log("Clusters are solved by straight-line distance, road distances only measure the tour",
+                      level="warning")
+        lats, lons = self.city_store.lats, self.city_store.lons
+        tour, num_clusters = solve_clustered(lats, lons, cluster_size=cluster_size, method=method,
+                                             time_budget=time_budget, max_workers=max_workers, seed=seed)
+        
+        i = tour.index(start_city_index)
+        tour = tour[i:] + tour[:i]
+        self.optimized_route = tour + [start_city_index]
+        if self.has_distance_provider():
+            self.total_distance = self._route_length(tour)
+        else:
+            route = np.asarray(self.optimized_route)
+            self.total_distance = float(np.sum(haversine_to_many(lats[route[:-1]], lons[route[:-1]],
+                                                                  lats[route[1:]], lons[route[1:]])))
+        self._reset_solution_stats()
+        self.instrumentation.count("clusters", num_clusters)
+        self._log(f"Route through {num_clusters} clusters calculated: {self.total_distance:.2f} km")
+    
+    @timed_stage("solve_lk")
+    def solve_lk(self, time_budget=None, start_city_index=0, candidates=DEFAULT_LK_CANDIDATES,
+                 max_depth=DEFAULT_LK_DEPTH, bound_max_cities=DEFAULT_BOUND_MAX_CITIES, seed=0):
+        """High-quality tour with Lin-Kernighan style moves, for when time matters less than length
+        
+        Starts from the Nearest Neighbor tour and applies chains of up to ``max_depth``
+        edge exchanges towards ``candidates`` cities per city, chosen from every
+        quadrant around it; time left in ``time_budget`` (seconds) goes to
+        double-bridge kicks. Up to ``bound_max_cities`` cities, the Held-Karp lower
+        bound is computed too: ``lower_bound_gap`` is how far the tour can at most be
+        above the optimum.
+        """
+        n = len(self.cities)
+        if n == 0:
+            self._log("Error: No cities available for optimization", level="error")
+            return
+        
+        with_bound = n <= bound_max_cities
+        if with_bound and not (self.has_distance_provider() and self.distance_provider.dense):
+            self.calculate_distance_matrix()
+        self.nearest_neighbor_tsp(start_city_index)
+        if not self.has_distance_provider():
+            self.build_distance_provider("lazy")
+        initial_distance = self.total_distance
+        
+        pool = self.distance_provider.neighbor_lists(candidates * CANDIDATE_POOL_FACTOR)
+        lats, lons = self.city_store.coordinate_arrays()
+        candidate_lists = quadrant_candidates(lats, lons, pool, candidates)
+        tour, moves, kicks = lin_kernighan(self.optimized_route[:-1], self.distance_provider.distance,
+                                           candidate_lists, time_budget=time_budget, max_depth=max_depth, seed=seed)
+        self._set_route(tour, self._route_length(tour), start_city_index)
+        self.instrumentation.count("improvement_moves", moves)
+        self.instrumentation.count("kicks", kicks)
+        
+        if with_bound and self.distance_provider.dense:
+            with self.instrumentation.stage("held_karp_bound"):
+                self.lower_bound = held_karp_bound(self.distance_provider.matrix, self.total_distance)
+            gap = (self.total_distance - self.lower_bound) / self.lower_bound if self.lower_bound else 0.0
+            self.lower_bound_gap = max(gap, 0.0)  # Rounding can put the bound of an optimal tour a hair above it
+        self._count_distance_evaluations()
+        
+        bound = f", at most {self.lower_bound_gap:.2%} above optimal" if self.lower_bound_gap is not None else ""
+        self._log(f"Route calculated using Lin-Kernighan ({moves} moves, {kicks} kicks): "
+                  f"{initial_distance:.2f} km -> {self.total_distance:.2f} km{bound}")
+    
+    @timed_stage("solve_exact")
+    def solve_exact(self, start_city_index=0, max_cities=DEFAULT_EXACT_MAX_CITIES, time_budget=None):
+        """Find the provably shortest tour with the Held-Karp dynamic program
+        
+        Above ``max_cities`` the exact solver would need too much memory, so the
+        Nearest Neighbor tour improved with 2-opt/Or-opt (within ``time_budget``) is used
+        instead. For exact solves the heuristic is run too, and how much longer its
+        tour is than the optimum is stored in ``heuristic_gap``.
+        """
+        n = len(self.cities)
+        if n == 0:
+            self._log("Error: No cities available for optimization", level="error")
+            return
+        self._reset_solution_stats()
+        if n > max_cities:
+            self._log(f"{n} cities is too many for the exact solver (max {max_cities}), using the heuristic")
+            self.nearest_neighbor_tsp(start_city_index)
+            self.improve_route(time_budget=time_budget)
+            return
+        if not (self.has_distance_provider() and self.distance_provider.dense):
+            self.calculate_distance_matrix()
+        
+        # Heuristic tour, only to measure how far from optimal it is
+        matrix = self.distance_provider.matrix
+        neighbors = self.distance_provider.neighbor_lists(DEFAULT_NEIGHBOR_K)
+        heuristic_tour, _ = nearest_neighbor_tour(self.distance_provider.row, n, start_city_index)
+        heuristic_tour, _ = two_opt_or_opt(heuristic_tour, matrix.item, neighbors, time_budget=time_budget)
+        heuristic_distance = tour_length(heuristic_tour, matrix.item)
+        
+        tour, self.total_distance = held_karp(matrix, start_city_index)
+        self.optimized_route = tour + [start_city_index]
+        self.heuristic_gap = (heuristic_distance - self.total_distance) / self.total_distance if self.total_distance else 0.0
+        self.lower_bound, self.lower_bound_gap = self.total_distance, 0.0
+        
+        self._log(f"Optimal route calculated using Held-Karp: {self.total_distance:.2f} km "
+                  f"(heuristic: {heuristic_distance:.2f} km, {self.heuristic_gap:.2%} longer)")
+    
+    def print_optimized_route(self):
+        """Print the optimized route with step-by-step details"""
+        if not self.optimized_route:
+            print("No optimized route available. Run the TSP algorithm first.")
+            return
+            
+        vehicle_routes = self._current_vehicle_routes()
+        if vehicle_routes:
+            print("\n--- Vehicle Routes ---")
+            for k, (route, plan) in enumerate(zip(vehicle_routes, self.vehicle_plan), 1):
+                stops = " → ".join(self.cities[i] for i in route)
+                print(f"Vehicle {k}: {stops} ({plan.length:.2f} km, load {plan.load:g})")
+            print(f"\nTotal distance: {self.total_distance:.2f} km")
+            print(f"Vehicles used: {len(vehicle_routes)}")
+            if self.unserved_cities:
+                print(f"Unserved cities: {', '.join(self.unserved_cities)}")
+            return
+        
+        print("\n--- Optimized Tour Route ---")
+        print(f"Starting from: {self.cities[self.optimized_route[0]]}")
+        
+        for i in range(1, len(self.optimized_route)):
+            from_idx = self.optimized_route[i-1]
+            to_idx = self.optimized_route[i]
+            from_city = self.cities[from_idx]
+            to_city = self.cities[to_idx]
+            distance = self.distance(from_idx, to_idx)
+            
+            print(f"{i}. {from_city} → {to_city} ({distance:.2f} km)")
+        
+        print(f"\nTotal tour distance: {self.total_distance:.2f} km")
+        print(f"Number of cities visited: {len(self.cities)}")
+    
+    @timed_stage("visualize_matplotlib")
+    def visualize_matplotlib(self, save_path=None, show=True, dpi=300):
+        """Create a static visualization of the optimized route using Matplotlib
+        
+        The figure is kept and its artists are updated on later calls, so re-drawing
+        after a re-solve is cheap. Use ``show=False`` to only save the image.
+        """
+        if not self.optimized_route:
+            self._log("No optimized route available. Run the TSP algorithm first.", level="warning")
+            return
+        
+        # Matplotlib is only imported once a map is drawn, and pyplot only to show one
+        from matplotlib.figure import Figure
+        from route_renderer import DEFAULT_FIGSIZE, RouteRenderer
+        if show:
+            import matplotlib.pyplot as plt
+        
+        renderer = self._renderer
+        # A pyplot-managed figure is needed to show the map, and a closed window is replaced
+        if renderer is not None and show and not plt.fignum_exists(getattr(renderer.figure, "number", None)):
+            renderer = None
+        if renderer is None:
+            figure = plt.figure(figsize=DEFAULT_FIGSIZE) if show else Figure(figsize=DEFAULT_FIGSIZE)
+            renderer = self._renderer = RouteRenderer(figure)
+        
+        renderer.draw(self.city_store.lats, self.city_store.lons, self.optimized_route, self.cities,
+                      routes=self._current_vehicle_routes())
+        
+        if save_path:
+            renderer.save(save_path, dpi=dpi)
+            self._log(f"Map saved to {save_path}")
+        
+        if show:
+            plt.show()
+        return renderer.figure
+    
+    @timed_stage("visualize_folium")
+    def visualize_folium(self, save_path=None, large_tour_threshold=DEFAULT_LARGE_TOUR_CITIES,
+                         precision=DEFAULT_COORDINATE_PRECISION, route_segment_size=None):
+        """Create an interactive visualization of the optimized route using Folium
+        
+        Above ``large_tour_threshold`` cities the map stays small and fast: cities go into
+        one FastMarkerCluster layer and the route is a GeoJSON layer with coordinates
+        rounded to ``precision`` decimals. ``route_segment_size`` splits the route into
+        a toggleable layer per that many stops. Vehicle routes from solve_vrp get a
+        colored layer each.
+        """
+        if not self.optimized_route:
+            self._log("No optimized route available. Run the TSP algorithm first.", level="warning")
+            return
+        
+        import folium
+        from folium_layers import add_route_layers, add_vehicle_layers, city_cluster_layer, route_features
+        
+        # Calculate center coordinates for the map
+        lats, lons = self.city_store.lats, self.city_store.lons
+        center_lat = float(lats.mean())
+        center_lon = float(lons.mean())
+        
+        # Create a map
+        m = folium.Map(location=[center_lat, center_lon], zoom_start=6)
+        
+        start_idx = self.optimized_route[0]
+        vehicle_routes = self._current_vehicle_routes()
+        if len(self.cities) > large_tour_threshold:
+            city_cluster_layer(lats, lons, self.cities, precision).add_to(m)
+            folium.Marker(
+                [float(lats[start_idx]), float(lons[start_idx])],
+                popup=f"{self.cities[start_idx]} (Start/End)",
+                tooltip=self.cities[start_idx],
+                icon=folium.Icon(color='green', icon='star')
+            ).add_to(m)
+            if vehicle_routes:
+                add_vehicle_layers(m, lats, lons, vehicle_routes, [route.length for route in self.vehicle_plan],
+                                   precision)
+            else:
+                add_route_layers(m, route_features(lats, lons, self.optimized_route, precision, route_segment_size))
+            folium.LayerControl().add_to(m)
+            return self._finish_folium_map(m, save_path)
+        
+        # Add markers for each city
+        for idx, (city, lat, lon) in enumerate(zip(self.cities, lats.tolist(), lons.tolist())):
+            tooltip = f"{city}"
+            # Make the start/end city marker more prominent
+            if idx == start_idx:
+                folium.Marker(
+                    [lat, lon],
+                    popup=f"{city} (Start/End)",
+                    tooltip=tooltip,
+                    icon=folium.Icon(color='green', icon='star')
+                ).add_to(m)
+            else:
+                folium.Marker(
+                    [lat, lon],
+                    popup=city,
+                    tooltip=tooltip,
+                    icon=folium.Icon(color='blue')
+                ).add_to(m)
+        
+        if vehicle_routes:
+            add_vehicle_layers(m, lats, lons, vehicle_routes, [route.length for route in self.vehicle_plan], precision)
+            folium.LayerControl().add_to(m)
+            return self._finish_folium_map(m, save_path)
+        
+        # Draw the optimized route
+        route = np.asarray(self.optimized_route)
+        route_points = np.column_stack((lats[route], lons[route])).tolist()
+        
+        folium.PolyLine(
+            route_points,
+            color='red',
+            weight=2.5,
+            opacity=1,
+            tooltip="Optimized Route"
+        ).add_to(m)
+        
+        return self._finish_folium_map(m, save_path)
+    
+    def _finish_folium_map(self, m, save_path):
+        """Add the title with the route summary and save the map if requested"""
+        import folium
+        
+        # Add distance information
+        route_info = f"Total Distance: {self.total_distance:.2f} km<br>Cities: {len(self.cities)}"
+        title_html = f'<h3 align="center" style="font-size:16px"><b>Optimized City Tour</b><br>{route_info}</h3>'
+        m.get_root().html.add_child(folium.Element(title_html))
+        
+        if save_path:
+            m.save(save_path)
+            self._log(f"Interactive map saved to {save_path}")
+        
+        return m
+
+def main():
+    # Example usage
+    optimizer = CityTourOptimizer("cities.csv")
+    optimizer.fetch_coordinates()
+    optimizer.calculate_distance_matrix()
+    # Exact for small tours, Nearest Neighbor + 2-opt/Or-opt otherwise
+    optimizer.solve_exact(time_budget=5)
+    optimizer.print_optimized_route()
+    
+    # Generate visualizations
+    optimizer.visualize_matplotlib("tour_route_static.png")
+    interactive_map = optimizer.visualize_folium("tour_route_interactive.html")
+    
+    print("\nVisualization complete! Check the generated files.")
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
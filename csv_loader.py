@@ -0,0 +1,81 @@
+import csv
+from itertools import islice
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _column_index(column, header):
+    """Resolve a column given by position or by header name"""
+    if column is None or isinstance(column, int):
+        return column
+    if header is None:
+        raise ValueError(f"Column {column!r} given by name but the file has no header")
+    try:
+        return header.index(column)
+    except ValueError:
+        raise ValueError(f"Column {column!r} not found in header {header}")
+
+
+def _parse_coordinate(value, low, high):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if low <= number <= high else None
+
+
+def iter_city_rows(csv_file, name_column=0, lat_column=None, lon_column=None, has_header=None):
+    """Stream (city, coordinates) pairs from a CSV file, one row at a time
+
+    Columns are given by position or by header name. When latitude and longitude
+    columns are given and hold valid values, coordinates is a (lat, lon) tuple,
+    otherwise None. The first row is treated as a header if any column is given by
+    name, unless ``has_header`` says otherwise. Rows with an empty name are skipped,
+    duplicates are not (see iter_unique_city_rows).
+    """
+    if has_header is None:
+        has_header = any(isinstance(column, str) for column in (name_column, lat_column, lon_column))
+
+    with open(csv_file, 'r', newline='') as file:
+        reader = csv.reader(file)
+        header = None
+        if has_header:
+            header = [field.strip() for field in next(reader, [])]
+        name_index = _column_index(name_column, header)
+        lat_index = _column_index(lat_column, header)
+        lon_index = _column_index(lon_column, header)
+        with_coordinates = lat_index is not None and lon_index is not None
+
+        for row in reader:
+            if len(row) <= name_index:
+                continue
+            city = row[name_index].strip()
+            if not city:
+                continue
+
+            coordinates = None
+            if with_coordinates and len(row) > max(lat_index, lon_index):
+                lat = _parse_coordinate(row[lat_index], -90, 90)
+                lon = _parse_coordinate(row[lon_index], -180, 180)
+                if lat is not None and lon is not None:
+                    coordinates = (lat, lon)
+            yield city, coordinates
+
+
+def iter_unique_city_rows(csv_file, seen=None, **columns):
+    """Like iter_city_rows, but skip cities already seen (checked against a set in O(1))"""
+    seen = set() if seen is None else seen
+    for city, coordinates in iter_city_rows(csv_file, **columns):
+        if city not in seen:
+            seen.add(city)
+            yield city, coordinates
+
+
+def iter_city_chunks(csv_file, chunk_size=DEFAULT_CHUNK_SIZE, seen=None, **columns):
+    """Stream unique (city, coordinates) rows in lists of at most ``chunk_size``"""
+    rows = iter_unique_city_rows(csv_file, seen=seen, **columns)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
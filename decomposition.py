@@ -0,0 +1,220 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from distance_engine import haversine_to_many
+from distance_providers import DenseDistanceProvider
+from local_search import DEFAULT_NEIGHBOR_K, nearest_neighbor_tour, two_opt_or_opt
+from spatial_index import unit_vectors
+
+DEFAULT_CLUSTER_SIZE = 1000  # Target cities per cluster; each cluster gets its own dense matrix
+KMEANS_ITERATIONS = 10
+BOUNDARY_CANDIDATES = 8  # Cities per cluster considered as entry/exit points when stitching
+CLUSTER_METHODS = ("kmeans", "grid")
+
+
+def grid_clusters(lats, lons, cluster_size=DEFAULT_CLUSTER_SIZE):
+    """Split cities into balanced cells: latitude strips, each cut into runs of longitude
+
+    Returns a list of index arrays, none larger than ``cluster_size``.
+    """
+    n = len(lats)
+    num_clusters = max(1, math.ceil(n / cluster_size))
+    num_strips = max(1, math.ceil(math.sqrt(num_clusters)))
+    clusters = []
+    for strip in np.array_split(np.argsort(lats, kind="stable"), num_strips):
+        if len(strip) == 0:
+            continue
+        strip = strip[np.argsort(lons[strip], kind="stable")]
+        clusters.extend(np.array_split(strip, math.ceil(len(strip) / cluster_size)))
+    return clusters
+
+
+def kmeans_clusters(lats, lons, cluster_size=DEFAULT_CLUSTER_SIZE, seed=0, iterations=KMEANS_ITERATIONS):
+    """Spatial k-means on unit-sphere vectors, with about ``cluster_size`` cities per cluster
+
+    k-means does not balance cluster sizes, so clusters over twice ``cluster_size``
+    are split again with grid_clusters. Returns a list of index arrays.
+    """
+    n = len(lats)
+    num_clusters = max(1, math.ceil(n / cluster_size))
+    if num_clusters == 1:
+        return [np.arange(n)]
+
+    points = unit_vectors(lats, lons)
+    rng = np.random.default_rng(seed)
+    centers = points[rng.choice(n, num_clusters, replace=False)]
+    labels = np.zeros(n, dtype=np.intp)
+    # Assign in chunks so the n x k similarity array stays small
+    chunk = max(1, 2 ** 22 // num_clusters)
+
+    for _ in range(iterations):
+        for start in range(0, n, chunk):
+            # On the unit sphere, the nearest center has the largest dot product
+            labels[start:start + chunk] = np.argmax(points[start:start + chunk] @ centers.T, axis=1)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, points)
+        counts = np.bincount(labels, minlength=num_clusters)
+        moved = counts > 0
+        norms = np.linalg.norm(sums[moved], axis=1, keepdims=True)
+        new_centers = centers.copy()
+        new_centers[moved] = sums[moved] / np.maximum(norms, 1e-12)
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    clusters = []
+    for members in np.split(order, bounds):
+        if len(members) > 2 * cluster_size:
+            clusters.extend(members[cell] for cell in grid_clusters(lats[members], lons[members], cluster_size))
+        else:
+            clusters.append(members)
+    return clusters
+
+
+def _solve_cluster(lats, lons, time_budget, neighbor_k):
+    """Nearest Neighbor + 2-opt/Or-opt tour of one cluster, as local indices"""
+    n = len(lats)
+    if n <= 3:
+        return list(range(n))
+    provider = DenseDistanceProvider(lats, lons)
+    tour, _ = nearest_neighbor_tour(provider.row, n, 0)
+    tour, _ = two_opt_or_opt(tour, provider.matrix.item, provider.neighbor_lists(neighbor_k), time_budget=time_budget)
+    return tour
+
+
+def _cluster_order(lats, lons, clusters):
+    """Visit order of the clusters: a tour over their centroids"""
+    if len(clusters) <= 2:
+        return list(range(len(clusters)))
+    points = unit_vectors(lats, lons)
+    centroids = np.array([points[members].mean(axis=0) for members in clusters])
+    centroid_lats = np.degrees(np.arcsin(np.clip(centroids[:, 2] / np.linalg.norm(centroids, axis=1), -1, 1)))
+    centroid_lons = np.degrees(np.arctan2(centroids[:, 1], centroids[:, 0]))
+    provider = DenseDistanceProvider(centroid_lats, centroid_lons)
+    order, _ = nearest_neighbor_tour(provider.row, len(clusters), 0)
+    order, _ = two_opt_or_opt(order, provider.matrix.item, provider.neighbor_lists(DEFAULT_NEIGHBOR_K))
+    return order
+
+
+def _cut_states(tour, lats, lons, toward):
+    """Ways to open a cluster's cycle into a path near the points in ``toward``
+
+    Each state cuts one tour edge (u, v) and walks the cycle from one end to the
+    other. Returns (entry, exit, saving, cut position, forward) arrays, where
+    saving is the length of the removed edge.
+    """
+    tour = np.asarray(tour)
+    n = len(tour)
+    if n == 1:
+        return (tour.copy(), tour.copy(), np.zeros(1), np.zeros(1, dtype=np.intp), np.ones(1, dtype=bool))
+
+    # Tour positions of the cities nearest to the neighboring clusters
+    positions = set()
+    for lat, lon in toward:
+        distances = haversine_to_many(lat, lon, lats[tour], lons[tour])
+        k = min(BOUNDARY_CANDIDATES, n)
+        positions.update(np.argpartition(distances, k - 1)[:k].tolist())
+    # Cut the edge on either side of each candidate city
+    cuts = sorted({p % n for position in positions for p in (position, position - 1)})
+
+    u = tour[cuts]
+    v = tour[(np.array(cuts) + 1) % n]
+    saving = haversine_to_many(lats[u], lons[u], lats[v], lons[v])
+    cuts = np.array(cuts, dtype=np.intp)
+    # Forward: enter at v, walk forward, leave at u. Backward: enter at u, leave at v.
+    entry = np.concatenate((v, u))
+    exit_ = np.concatenate((u, v))
+    forward = np.concatenate((np.ones(len(cuts), dtype=bool), np.zeros(len(cuts), dtype=bool)))
+    return entry, exit_, np.concatenate((saving, saving)), np.concatenate((cuts, cuts)), forward
+
+
+def _open_path(tour, cut, forward):
+    """The cycle ``tour`` opened at the edge after position ``cut``"""
+    path = tour[cut + 1:] + tour[:cut + 1]
+    return path if forward else path[::-1]
+
+
+def stitch_tours(lats, lons, tours):
+    """Join cluster cycles, given in visit order, into one tour at the cheapest boundary edges
+
+    Every cycle is opened at one of its edges near the adjacent clusters. The cuts
+    and walking directions are chosen together by dynamic programming over the
+    cluster sequence, minimising the connecting edges minus the removed ones.
+    """
+    m = len(tours)
+    if m == 1:
+        return np.asarray(tours[0]).tolist()
+
+    def centre(tour):
+        return float(np.mean(lats[tour])), float(np.mean(lons[tour]))
+
+    centres = [centre(tour) for tour in tours]
+    states = [_cut_states(tour, lats, lons, (centres[i - 1], centres[(i + 1) % m])) for i, tour in enumerate(tours)]
+
+    def link(a, b):
+        """Connecting edge from every exit of state set a to every entry of state set b"""
+        exits, entries = a[1], b[0]
+        return haversine_to_many(lats[exits][:, None], lons[exits][:, None], lats[entries][None, :],
+                                 lons[entries][None, :])
+
+    # cost[s0, s]: cheapest chain from state s0 of the first cluster to state s of the current one
+    cost = np.where(np.eye(len(states[0][0]), dtype=bool), -states[0][2][:, None], np.inf)
+    back = []
+    for i in range(1, m):
+        step = cost[:, :, None] + link(states[i - 1], states[i])[None, :, :]
+        back.append(np.argmin(step, axis=1))
+        cost = np.take_along_axis(step, back[-1][:, None, :], axis=1)[:, 0, :] - states[i][2][None, :]
+    # Close the loop back to the first cluster's entry
+    closing = link(states[-1], states[0])
+    total = cost + closing.T
+    first, last = np.unravel_index(np.argmin(total), total.shape)
+
+    chosen = [int(last)]
+    for i in range(m - 1, 0, -1):
+        chosen.append(int(back[i - 1][first, chosen[-1]]))
+    chosen.reverse()
+
+    route = []
+    for tour, (_, _, _, cuts, forward), state in zip(tours, states, chosen):
+        route.extend(_open_path(np.asarray(tour).tolist(), int(cuts[state]), bool(forward[state])))
+    return route
+
+
+def solve_clustered(lats, lons, cluster_size=DEFAULT_CLUSTER_SIZE, method="kmeans", time_budget=None,
+                    neighbor_k=DEFAULT_NEIGHBOR_K, max_workers=None, seed=0):
+    """Cluster-first, route-second tour over all cities
+
+    Cities are partitioned with ``method`` ("kmeans" or "grid"), each cluster is solved
+    with Nearest Neighbor + 2-opt/Or-opt in a process pool (``time_budget`` seconds
+    each), clusters are ordered by a tour over their centroids and the sub-tours are
+    stitched together. Only one cluster's distance matrix exists per worker at a time.
+    Returns (tour, number of clusters).
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if method == "kmeans":
+        clusters = kmeans_clusters(lats, lons, cluster_size, seed=seed)
+    elif method == "grid":
+        clusters = grid_clusters(lats, lons, cluster_size)
+    else:
+        raise ValueError(f"Unknown clustering method {method!r}, expected one of {CLUSTER_METHODS}")
+
+    order = _cluster_order(lats, lons, clusters)
+    clusters = [clusters[i] for i in order]
+
+    args = ([lats[c] for c in clusters], [lons[c] for c in clusters],
+            [time_budget] * len(clusters), [neighbor_k] * len(clusters))
+    if len(clusters) == 1:
+        local_tours = [_solve_cluster(*(arg[0] for arg in args))]
+    else:
+        max_workers = max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            local_tours = list(pool.map(_solve_cluster, *args))
+
+    tours = [members[tour] for members, tour in zip(clusters, local_tours)]
+    return stitch_tours(lats, lons, tours), len(clusters)
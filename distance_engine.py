@@ -0,0 +1,150 @@
+import hashlib
+import math
+import struct
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Radius of earth in kilometers
+
+# Rows per block when building a matrix, keeps temporaries to a few hundred MB
+DEFAULT_BLOCK_SIZE = 1024
+
+# Binary distance matrix file: fixed 64 byte header followed by raw row-major data
+MATRIX_FILE_MAGIC = b"CTDM"
+MATRIX_FILE_VERSION = 1
+MATRIX_HEADER = struct.Struct("<4sH4sQ32s")  # magic, version, dtype, n, city list hash
+MATRIX_HEADER_SIZE = 64
+MATRIX_DTYPES = {"<f4": np.float32, "<f8": np.float64}
+
+
+def coordinate_arrays(cities, coordinates):
+    """Return latitude and longitude arrays (decimal degrees) in city order"""
+    lats = np.fromiter((coordinates[city][0] for city in cities), dtype=np.float64, count=len(cities))
+    lons = np.fromiter((coordinates[city][1] for city in cities), dtype=np.float64, count=len(cities))
+    return lats, lons
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance (in km) between two points given in decimal degrees"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def haversine_to_many(lat, lon, lats, lons):
+    """Great circle distances (in km) from one point to an array of points"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_matrix(lats, lons, dtype=np.float64, block_size=DEFAULT_BLOCK_SIZE):
+    """Build the full symmetric haversine distance matrix (in km) as a contiguous ndarray
+
+    Distances are computed with broadcasting one block of rows at a time, and only
+    against the columns from the block onwards. The upper triangle is then mirrored,
+    so each pair is evaluated once.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    n = len(lat)
+
+    matrix = np.zeros((n, n), dtype=dtype)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+
+        dlat = lat[start:stop, None] - lat[None, start:]
+        dlon = lon[start:stop, None] - lon[None, start:]
+        a = np.sin(dlat / 2) ** 2 + cos_lat[start:stop, None] * cos_lat[None, start:] * np.sin(dlon / 2) ** 2
+        block = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        # Upper triangle (and the diagonal square) of this block, then its mirror image
+        matrix[start:stop, start:] = block
+        matrix[start:, start:stop] = block.T
+
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+
+def nearest_neighbor_lists(matrix, k, block_size=DEFAULT_BLOCK_SIZE):
+    """Indices of the k nearest other cities for every row of a distance matrix, nearest first"""
+    n = len(matrix)
+    k = min(k, n - 1)
+    neighbors = np.empty((n, max(k, 0)), dtype=np.int64)
+    if k <= 0:
+        return neighbors
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        rows = np.array(matrix[start:stop], dtype=np.float64)
+        rows[np.arange(stop - start), np.arange(start, stop)] = np.inf  # A city is not its own neighbor
+
+        candidates = np.argpartition(rows, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(rows, candidates, axis=1), axis=1)
+        neighbors[start:stop] = np.take_along_axis(candidates, order, axis=1)
+    return neighbors
+
+
+def city_list_hash(cities, coordinates):
+    """SHA-256 digest identifying an ordered list of cities and their coordinates"""
+    digest = hashlib.sha256()
+    for city in cities:
+        lat, lon = coordinates[city]
+        digest.update(f"{city}\t{lat:.6f}\t{lon:.6f}\n".encode("utf-8"))
+    return digest.digest()
+
+
+def save_distance_matrix(path, matrix, city_hash):
+    """Write a square distance matrix to a versioned binary file"""
+    matrix = np.asarray(matrix)
+    dtype = np.dtype(matrix.dtype).newbyteorder("<").str
+    if dtype not in MATRIX_DTYPES or matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError("Only square float32/float64 matrices can be saved")
+
+    header = MATRIX_HEADER.pack(MATRIX_FILE_MAGIC, MATRIX_FILE_VERSION, dtype.encode("ascii"),
+                                matrix.shape[0], city_hash)
+    with open(path, "wb") as file:
+        file.write(header.ljust(MATRIX_HEADER_SIZE, b"\0"))
+        np.ascontiguousarray(matrix, dtype=dtype).tofile(file)
+
+
+def read_matrix_header(path):
+    """Read (dtype, n, city list hash) from a binary distance matrix file"""
+    with open(path, "rb") as file:
+        header = file.read(MATRIX_HEADER_SIZE)
+    if len(header) < MATRIX_HEADER_SIZE:
+        raise ValueError(f"{path} is not a distance matrix file")
+
+    magic, version, dtype, n, city_hash = MATRIX_HEADER.unpack_from(header)
+    dtype = dtype.rstrip(b"\0").decode("ascii")
+    if magic != MATRIX_FILE_MAGIC:
+        raise ValueError(f"{path} is not a distance matrix file")
+    if version != MATRIX_FILE_VERSION:
+        raise ValueError(f"Unsupported distance matrix file version {version}")
+    if dtype not in MATRIX_DTYPES:
+        raise ValueError(f"Unsupported distance matrix dtype {dtype}")
+    return np.dtype(dtype), n, city_hash
+
+
+def load_distance_matrix(path, city_hash=None, mmap=True):
+    """Open a binary distance matrix file, memory-mapped (read-only) by default
+
+    Raises ValueError when the file is invalid or was built for a different city list.
+    Memory-mapped matrices open instantly and share the OS page cache, so several
+    processes can read the same file without copying it.
+    """
+    dtype, n, stored_hash = read_matrix_header(path)
+    if city_hash is not None and stored_hash != city_hash:
+        raise ValueError(f"{path} was saved for a different list of cities")
+
+    if mmap:
+        return np.memmap(path, dtype=dtype, mode="r", offset=MATRIX_HEADER_SIZE, shape=(n, n))
+    with open(path, "rb") as file:
+        file.seek(MATRIX_HEADER_SIZE)
+        return np.fromfile(file, dtype=dtype, count=n * n).reshape(n, n)
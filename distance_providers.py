@@ -0,0 +1,400 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from distance_engine import haversine, haversine_matrix, haversine_to_many, nearest_neighbor_lists
+from road_network import DEFAULT_ROAD_CACHE_DIR, load_road_graph, road_distance_matrix, road_distances_from
+from spatial_index import UnitSphereKDTree
+
+DEFAULT_CACHE_ROWS = 256  # Rows kept by LazyDistanceProvider
+DEFAULT_STORED_NEIGHBORS = 16  # Neighbors kept per city by KNearestDistanceProvider
+
+
+class DistanceProvider:
+    """Distances between cities addressed by index
+
+    Subclasses implement ``distance``, ``row`` and ``neighbor_lists``. Indexing a
+    provider returns a row, so ``provider[i][j]`` works like a distance matrix.
+    ``evaluations`` counts the haversine distances computed so far. Cities can be
+    appended with ``add_point`` and dropped with ``remove_point``, which moves the
+    last city into the freed index.
+    """
+
+    # True when rows are stored, so scanning a row is cheaper than a spatial query
+    dense = False
+
+    def __init__(self, lats, lons):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self._tree = None
+        self.evaluations = 0
+        # Plain floats are much faster than numpy scalars in the scalar haversine
+        self._lat_list = self.lats.tolist()
+        self._lon_list = self.lons.tolist()
+
+    def __len__(self):
+        return len(self.lats)
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    def distance(self, i, j):
+        """Distance in km between cities i and j"""
+        raise NotImplementedError
+
+    def row(self, i):
+        """Distances in km from city i to every city, as a float64 array"""
+        raise NotImplementedError
+
+    def pair_distances(self, a, b):
+        """Distances between cities a[t] and b[t] for index arrays a and b"""
+        self.evaluations += len(a)
+        return haversine_to_many(self.lats[a], self.lons[a], self.lats[b], self.lons[b])
+
+    def neighbor_lists(self, k):
+        """The k nearest other cities of every city, nearest first"""
+        return [self.spatial_index().query_k(i, k) for i in range(len(self))]
+
+    def nearest(self, i, k):
+        """The k nearest other cities of city i, nearest first"""
+        return _nearest_in_row(self.row(i), i, k)
+
+    def spatial_index(self):
+        """KD-tree over the cities, built on first use"""
+        if self._tree is None:
+            self._tree = UnitSphereKDTree(self.lats, self.lons)
+        return self._tree
+
+    def add_point(self, lat, lon):
+        """Append a city and return its index"""
+        self._append_coordinates(lat, lon)
+        return len(self) - 1
+
+    def remove_point(self, i):
+        """Remove city i; the last city takes over index i"""
+        self._swap_remove_coordinates(i)
+
+    def _append_coordinates(self, lat, lon):
+        self.lats = np.append(self.lats, lat)
+        self.lons = np.append(self.lons, lon)
+        self._lat_list.append(float(lat))
+        self._lon_list.append(float(lon))
+        self._tree = None
+
+    def _swap_remove_coordinates(self, i):
+        last = len(self) - 1
+        for values in (self.lats, self.lons, self._lat_list, self._lon_list):
+            values[i] = values[last]
+        self.lats = self.lats[:last].copy()
+        self.lons = self.lons[:last].copy()
+        del self._lat_list[last], self._lon_list[last]
+        self._tree = None
+
+    def _haversine(self, i, j):
+        self.evaluations += 1
+        return haversine(self._lat_list[i], self._lon_list[i], self._lat_list[j], self._lon_list[j])
+
+    def _haversine_row(self, i):
+        row = haversine_to_many(self.lats[i], self.lons[i], self.lats, self.lons)
+        row[i] = 0.0
+        self.evaluations += len(row)
+        return row
+
+
+class DenseDistanceProvider(DistanceProvider):
+    """Full n x n distance matrix held in memory
+
+    Added cities go into a buffer with spare capacity, so an addition computes one
+    row and the matrix is only copied when the capacity doubles.
+    """
+
+    dense = True
+
+    def __init__(self, lats, lons, dtype=np.float64, matrix=None):
+        super().__init__(lats, lons)
+        if matrix is None:
+            matrix = haversine_matrix(self.lats, self.lons, dtype=dtype)
+            self.evaluations = len(self) * (len(self) - 1) // 2
+        self.matrix = matrix
+        self._buffer = None
+
+    def distance(self, i, j):
+        return self.matrix.item(i, j)
+
+    def row(self, i):
+        return self.matrix[i]
+
+    def pair_distances(self, a, b):
+        return np.asarray(self.matrix[a, b], dtype=np.float64)
+
+    def neighbor_lists(self, k):
+        return nearest_neighbor_lists(self.matrix, k).tolist()
+
+    def _writable_buffer(self, size):
+        """A writable square buffer of at least ``size`` rows holding the current matrix"""
+        if self._buffer is None or len(self._buffer) < size:
+            n = len(self.matrix)
+            capacity = max(size, 2 * n, 16)
+            # Also copies read-only memory-mapped matrices
+            buffer = np.zeros((capacity, capacity), dtype=self.matrix.dtype)
+            buffer[:n, :n] = self.matrix
+            self._buffer = buffer
+        return self._buffer
+
+    def add_point(self, lat, lon):
+        n = len(self)
+        self._append_coordinates(lat, lon)
+        row = self._new_row(n)
+        buffer = self._writable_buffer(n + 1)
+        buffer[n, :n + 1] = row
+        buffer[:n + 1, n] = row
+        self.matrix = buffer[:n + 1, :n + 1]
+        return n
+
+    def remove_point(self, i):
+        last = len(self) - 1
+        buffer = self._writable_buffer(last + 1)
+        if i != last:
+            buffer[i, :last + 1] = buffer[last, :last + 1]
+            buffer[:last + 1, i] = buffer[:last + 1, last]
+            buffer[i, i] = 0
+        self.matrix = buffer[:last, :last]
+        self._swap_remove_coordinates(i)
+
+    def _new_row(self, i):
+        """Distances from the just appended city i to every city"""
+        return self._haversine_row(i)
+
+
+class RoadDistanceProvider(DenseDistanceProvider):
+    """Full matrix of road distances over a road_network.RoadGraph
+
+    Every city is snapped to its nearest road node (``nodes``, ``snap_km`` away) and
+    the node-to-node shortest paths are cached on disk under ``cache_dir``; see
+    road_network.road_distance_matrix. Added cities run one Dijkstra search.
+    """
+
+    def __init__(self, lats, lons, graph, dtype=np.float64, max_workers=None, cache_dir=DEFAULT_ROAD_CACHE_DIR):
+        self.graph = load_road_graph(graph)
+        matrix, self.nodes, self.snap_km, self.cached = road_distance_matrix(
+            self.graph, lats, lons, max_workers=max_workers, cache_dir=cache_dir, dtype=dtype)
+        super().__init__(lats, lons, matrix=matrix)
+
+    def remove_point(self, i):
+        super().remove_point(i)
+        last = len(self.nodes) - 1
+        self.nodes[i] = self.nodes[last]
+        self.snap_km[i] = self.snap_km[last]
+        self.nodes = self.nodes[:last].copy()
+        self.snap_km = self.snap_km[:last].copy()
+
+    def _new_row(self, i):
+        row, node, snap = road_distances_from(self.graph, self.lats[i], self.lons[i], self.nodes, self.snap_km)
+        row = np.append(row, 0.0)
+        unreachable = ~np.isfinite(row)
+        if unreachable.any():
+            row[unreachable] = self._haversine_row(i)[unreachable]
+        self.nodes = np.append(self.nodes, node)
+        self.snap_km = np.append(self.snap_km, snap)
+        return row
+
+
+class LazyDistanceProvider(DistanceProvider):
+    """Haversine distances computed on demand, with an LRU cache of recently used rows"""
+
+    def __init__(self, lats, lons, cache_rows=DEFAULT_CACHE_ROWS):
+        super().__init__(lats, lons)
+        self.cache_rows = cache_rows
+        self._rows = OrderedDict()
+
+    def distance(self, i, j):
+        row = self._rows.get(i)
+        if row is not None:
+            return float(row[j])
+        return self._haversine(i, j)
+
+    def row(self, i):
+        row = self._rows.get(i)
+        if row is not None:
+            self._rows.move_to_end(i)
+            return row
+
+        row = self._haversine_row(i)
+        if self.cache_rows:
+            self._rows[i] = row
+            if len(self._rows) > self.cache_rows:
+                self._rows.popitem(last=False)
+        return row
+
+    def add_point(self, lat, lon):
+        # Cached rows are one entry short; dropping them is cheaper than extending each
+        self._rows.clear()
+        return super().add_point(lat, lon)
+
+    def remove_point(self, i):
+        self._rows.clear()
+        super().remove_point(i)
+
+
+class KNearestDistanceProvider(DistanceProvider):
+    """Sparse distances: only each city's k nearest neighbors are stored
+
+    Pairs outside the stored neighborhoods are computed on demand, so every
+    distance is still available, but memory stays at O(n * k). ``_holders[j]`` is
+    the set of cities listing j as a neighbor, so adding or removing a city only
+    touches the neighborhoods around it.
+    """
+
+    def __init__(self, lats, lons, k=DEFAULT_STORED_NEIGHBORS):
+        super().__init__(lats, lons)
+        tree = self.spatial_index()
+        # The requested k stays fixed; while there are at most k other cities, every list holds all of them
+        self.k = k
+        self.neighbors = [tree.query_k(i, self.k) for i in range(len(self))]
+        self.neighbor_distances = [
+            {j: self._haversine(i, j) for j in neighbors} for i, neighbors in enumerate(self.neighbors)
+        ]
+        self._holders = [set() for _ in range(len(self))]
+        for i, neighbors in enumerate(self.neighbors):
+            for j in neighbors:
+                self._holders[j].add(i)
+
+    def distance(self, i, j):
+        d = self.neighbor_distances[i].get(j)
+        if d is None:
+            d = self.neighbor_distances[j].get(i)
+            if d is None:
+                d = 0.0 if i == j else self._haversine(i, j)
+        return d
+
+    def row(self, i):
+        return self._haversine_row(i)
+
+    def neighbor_lists(self, k):
+        if k <= self.k:
+            return [neighbors[:k] for neighbors in self.neighbors]
+        return super().neighbor_lists(k)
+
+    def nearest(self, i, k):
+        if k <= self.k:
+            return self.neighbors[i][:k]
+        return super().nearest(i, k)
+
+    def _radius(self):
+        """Distance from every city to its farthest stored neighbor (inf if its list has room left)"""
+        full = min(self.k, len(self) - 1)
+        return np.array([
+            self.neighbor_distances[i][neighbors[-1]] if neighbors and len(neighbors) >= full else np.inf
+            for i, neighbors in enumerate(self.neighbors)
+        ])
+
+    def _set_neighbors(self, i, row):
+        """Replace the stored neighbors of city i by the k nearest in its distance row"""
+        for j in self.neighbors[i]:
+            self._holders[j].discard(i)
+        neighbors = _nearest_in_row(row, i, self.k)
+        self.neighbors[i] = neighbors
+        self.neighbor_distances[i] = {j: float(row[j]) for j in neighbors}
+        for j in neighbors:
+            self._holders[j].add(i)
+
+    def add_point(self, lat, lon):
+        n = len(self)
+        self._append_coordinates(lat, lon)
+        row = self._haversine_row(n)
+        self.neighbors.append([])
+        self.neighbor_distances.append({})
+        self._holders.append(set())
+        self._set_neighbors(n, row)
+
+        # The new city displaces the farthest neighbor of every city it is closer to
+        for i in np.flatnonzero(row[:n] < self._radius()[:n]).tolist():
+            d = float(row[i])
+            neighbors, distances = self.neighbors[i], self.neighbor_distances[i]
+            position = next((p for p, j in enumerate(neighbors) if distances[j] > d), len(neighbors))
+            neighbors.insert(position, n)
+            distances[n] = d
+            self._holders[n].add(i)
+            if len(neighbors) > self.k:
+                dropped = neighbors.pop()
+                del distances[dropped]
+                self._holders[dropped].discard(i)
+        return n
+
+    def remove_point(self, i):
+        last = len(self) - 1
+
+        # Cities that listed i lose a neighbor and are refilled below
+        refill = self._holders[i]
+        for h in refill:
+            self.neighbors[h].remove(i)
+            del self.neighbor_distances[h][i]
+        for j in self.neighbors[i]:
+            self._holders[j].discard(i)
+
+        if i != last:
+            # Relabel the last city as i everywhere it appears
+            for j in self.neighbors[last]:
+                self._holders[j].discard(last)
+                self._holders[j].add(i)
+            for h in self._holders[last]:
+                neighbors = self.neighbors[h]
+                neighbors[neighbors.index(last)] = i
+                self.neighbor_distances[h][i] = self.neighbor_distances[h].pop(last)
+            self.neighbors[i] = self.neighbors[last]
+            self.neighbor_distances[i] = self.neighbor_distances[last]
+            self._holders[i] = self._holders[last]
+            if last in refill:
+                refill = (refill - {last}) | {i}
+
+        del self.neighbors[last], self.neighbor_distances[last], self._holders[last]
+        self._swap_remove_coordinates(i)
+        for h in refill:
+            self._set_neighbors(h, self._haversine_row(h))
+
+
+class LazyNeighborLists:
+    """Neighbor lists built per city on first access
+
+    Local repairs after adding or removing a city only look at the neighborhoods
+    of a few cities, so building all n lists up front would dominate their cost.
+    """
+
+    def __init__(self, provider, k):
+        self.provider = provider
+        self.k = k
+        self._lists = {}
+
+    def __getitem__(self, i):
+        neighbors = self._lists.get(i)
+        if neighbors is None:
+            neighbors = self._lists[i] = self.provider.nearest(i, self.k)
+        return neighbors
+
+
+def _nearest_in_row(row, i, k):
+    """Indices of the k smallest entries of a distance row, excluding i, nearest first"""
+    row = np.array(row, dtype=np.float64)
+    row[i] = np.inf
+    k = min(k, len(row) - 1)
+    if k <= 0:
+        return []
+    candidates = np.argpartition(row, k - 1)[:k]
+    return candidates[np.argsort(row[candidates])].tolist()
+
+
+DISTANCE_PROVIDERS = {
+    "dense": DenseDistanceProvider,
+    "lazy": LazyDistanceProvider,
+    "knn": KNearestDistanceProvider,
+    "road": RoadDistanceProvider,
+}
+
+
+def create_distance_provider(kind, lats, lons, **options):
+    """Create a distance provider by name ("dense", "lazy", "knn" or "road")"""
+    try:
+        provider_class = DISTANCE_PROVIDERS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown distance provider {kind!r}, expected one of {sorted(DISTANCE_PROVIDERS)}")
+    return provider_class(lats, lons, **options)
@@ -0,0 +1,79 @@
+import numpy as np
+
+from vrp import VEHICLE_COLORS
+
+DEFAULT_LARGE_TOUR_CITIES = 500  # Above this, visualize_folium switches to clustered markers
+DEFAULT_COORDINATE_PRECISION = 5  # Decimal places kept in the HTML, about 1 m
+
+# Builds each clustered marker in the browser from a [lat, lon, name] row
+CITY_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {radius: 4, color: 'blue', fillOpacity: 0.8});
+    marker.bindTooltip(row[2]);
+    return marker;
+}
+"""
+
+ROUTE_STYLE = {"color": "red", "weight": 2.5, "opacity": 1}
+
+
+def city_cluster_layer(lats, lons, names, precision=DEFAULT_COORDINATE_PRECISION):
+    """All cities as one FastMarkerCluster layer, embedded as a compact array of rows"""
+    # folium is imported on use, so the optimizer can import the defaults above cheaply
+    from folium.plugins import FastMarkerCluster
+
+    rows = [[lat, lon, name] for lat, lon, name in
+            zip(np.round(lats, precision).tolist(), np.round(lons, precision).tolist(), names)]
+    return FastMarkerCluster(rows, callback=CITY_MARKER_CALLBACK, name="Cities")
+
+
+def route_features(lats, lons, route, precision=DEFAULT_COORDINATE_PRECISION, segment_size=None):
+    """GeoJSON LineString features for a route, split every ``segment_size`` stops if given
+
+    Coordinates are rounded to ``precision`` decimal places. Consecutive segments
+    share their boundary stop, so together they draw the whole route.
+    """
+    route = np.asarray(route)
+    # GeoJSON positions are [longitude, latitude]
+    coordinates = np.round(np.column_stack((lons[route], lats[route])), precision)
+    last = len(coordinates) - 1
+    step = segment_size or max(last, 1)
+    features = []
+    for start in range(0, max(last, 1), step):
+        end = min(start + step, last)
+        features.append({
+            "type": "Feature",
+            "properties": {"first_stop": start, "last_stop": end},
+            "geometry": {"type": "LineString", "coordinates": coordinates[start:end + 1].tolist()},
+        })
+    return features
+
+
+def add_route_layers(m, features):
+    """Add route features to a map: one layer, or one toggleable layer per segment"""
+    import folium
+
+    def style(feature):
+        return ROUTE_STYLE
+
+    if len(features) == 1:
+        folium.GeoJson({"type": "FeatureCollection", "features": features}, name="Optimized Route",
+                       style_function=style, tooltip="Optimized Route").add_to(m)
+        return
+    for feature in features:
+        properties = feature["properties"]
+        name = f"Route stops {properties['first_stop']}-{properties['last_stop']}"
+        folium.GeoJson({"type": "FeatureCollection", "features": [feature]}, name=name,
+                       style_function=style, tooltip=name).add_to(m)
+
+
+def add_vehicle_layers(m, lats, lons, routes, lengths, precision=DEFAULT_COORDINATE_PRECISION):
+    """Add one toggleable, colored GeoJSON route layer per vehicle"""
+    import folium
+
+    for k, (route, length) in enumerate(zip(routes, lengths)):
+        color = VEHICLE_COLORS[k % len(VEHICLE_COLORS)]
+        name = f"Vehicle {k + 1}: {len(route) - 2} stops, {length:.1f} km"
+        features = route_features(lats, lons, route, precision)
+        folium.GeoJson({"type": "FeatureCollection", "features": features}, name=name, tooltip=name,
+                       style_function=lambda feature, color=color: dict(ROUTE_STYLE, color=color)).add_to(m)
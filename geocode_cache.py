@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "geocode_cache.db"
+DEFAULT_TTL = 30 * 24 * 3600  # Coordinates of a city don't move, keep them for a month
+DEFAULT_NEGATIVE_TTL = 24 * 3600  # Retry unknown places once a day
+DEFAULT_MAX_ENTRIES = 100000
+
+# Returned by GeocodeCache.get when the query has no (fresh) entry at all
+MISSING = object()
+
+
+def normalize_query(query):
+    """Normalize a geocoding query so trivial spelling variants share a cache entry"""
+    parts = [" ".join(part.split()) for part in query.split(",")]
+    return ", ".join(part for part in parts if part).casefold()
+
+
+class GeocodeCache:
+    """Persistent SQLite cache of geocoding results
+
+    Entries expire after ``ttl`` seconds (``negative_ttl`` for places the geocoder
+    could not find), and the least recently used entries are evicted once the
+    cache holds more than ``max_entries`` queries.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # Write-ahead logging lets several processes (e.g. batch_cli workers) share the file
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            " query TEXT PRIMARY KEY,"
+            " latitude REAL,"
+            " longitude REAL,"
+            " fetched_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS geocodes_last_used ON geocodes (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def __len__(self):
+        return self._size
+
+    def get(self, query):
+        """Return cached (lat, lon), None for a cached miss, or MISSING if not cached"""
+        key = normalize_query(query)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, fetched_at FROM geocodes WHERE query = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+
+            latitude, longitude, fetched_at = row
+            ttl = self.negative_ttl if latitude is None else self.ttl
+            if now - fetched_at > ttl:
+                self._conn.execute("DELETE FROM geocodes WHERE query = ?", (key,))
+                self._conn.commit()
+                self._size -= 1
+                self.misses += 1
+                return MISSING
+
+            self._conn.execute("UPDATE geocodes SET last_used = ? WHERE query = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        if latitude is None:
+            return None
+        return (latitude, longitude)
+
+    def put(self, query, coordinates):
+        """Store (lat, lon) for a query, or None to remember that it could not be found"""
+        key = normalize_query(query)
+        latitude, longitude = coordinates if coordinates else (None, None)
+        now = time.time()
+
+        with self._lock:
+            existed = self._conn.execute("SELECT 1 FROM geocodes WHERE query = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocodes (query, latitude, longitude, fetched_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, latitude, longitude, now, now)
+            )
+            if not existed:
+                self._size += 1
+            if self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used entries beyond max_entries (lock must be held)"""
+        self._conn.execute(
+            "DELETE FROM geocodes WHERE query IN ("
+            " SELECT query FROM geocodes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._size = self._conn.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def purge_expired(self):
+        """Delete all expired entries and return how many were removed"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM geocodes WHERE"
+                " (latitude IS NOT NULL AND fetched_at < ?) OR (latitude IS NULL AND fetched_at < ?)",
+                (now - self.ttl, now - self.negative_ttl)
+            )
+            self._conn.commit()
+            self._size -= cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM geocodes")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+def open_geocode_cache(cache):
+    """Accept a GeocodeCache, a database path or None and return a cache (or None)"""
+    if cache is None or isinstance(cache, GeocodeCache):
+        return cache
+    if isinstance(cache, (str, os.PathLike)):
+        return GeocodeCache(cache)
+    raise TypeError(f"Unsupported geocode cache: {cache!r}")
@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_RATE_LIMIT = 1.0  # Requests per second, Nominatim's usage policy allows one
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_TRIES = 3
+DEFAULT_TIMEOUT = 10  # Seconds per request made by the default Nominatim geocoder
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second
+
+    Up to ``capacity`` tokens can be saved up, which bounds the size of a burst.
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def nominatim_geocoder(user_agent="city_tour_optimizer", timeout=DEFAULT_TIMEOUT):
+    """The default geocoder; geopy is imported on first use rather than at start-up"""
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent=user_agent, timeout=timeout)
+
+
+def geopy_retry_errors():
+    """geopy's timeout and service errors, which are worth retrying; none without geopy"""
+    try:
+        from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+    except ImportError:
+        return ()
+    return (GeocoderTimedOut, GeocoderServiceError)
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Exponential backoff with full jitter for the given (1-based) retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class GeocodeResult:
+    """Outcome of geocoding one query"""
+    __slots__ = ("query", "coordinates", "error", "attempts")
+
+    def __init__(self, query, coordinates=None, error=None, attempts=0):
+        self.query = query
+        self.coordinates = coordinates
+        self.error = error
+        self.attempts = attempts
+
+
+def geocode_one(geocoder, query, limiter=None, max_tries=DEFAULT_MAX_TRIES, timeout=None,
+                retry_on=(), on_retry=None):
+    """Geocode a single query, retrying ``retry_on`` errors with jittered exponential backoff
+
+    The geocoder is called as ``geocode(query)``, or as ``geocode(query, timeout=timeout)``
+    when a ``timeout`` is given, which then overrides the geocoder's own.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            if timeout is None:
+                location = geocoder.geocode(query)
+            else:
+                location = geocoder.geocode(query, timeout=timeout)
+        except retry_on as e:
+            if attempt >= max_tries:
+                return GeocodeResult(query, error=e, attempts=attempt)
+            if on_retry is not None:
+                on_retry(query, attempt, e)
+            time.sleep(backoff_delay(attempt))
+            continue
+        except Exception as e:
+            return GeocodeResult(query, error=e, attempts=attempt)
+
+        coordinates = (location.latitude, location.longitude) if location else None
+        return GeocodeResult(query, coordinates=coordinates, attempts=attempt)
+
+
+def geocode_all(geocoder, queries, rate_limit=DEFAULT_RATE_LIMIT, max_workers=DEFAULT_MAX_WORKERS,
+                max_tries=DEFAULT_MAX_TRIES, timeout=None, retry_on=(), on_retry=None):
+    """Geocode many queries concurrently under a shared rate limit
+
+    Requests are spread over a thread pool, but every request (retries included)
+    first takes a token from one bucket, so the provider never sees more than
+    ``rate_limit`` requests per second. Results are returned in query order.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries)))) as pool:
+        futures = [
+            pool.submit(geocode_one, geocoder, query, limiter, max_tries, timeout, retry_on, on_retry)
+            for query in queries
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,129 @@
+import numpy as np
+
+# Largest instance solved exactly by default: the DP table holds 2^(n-1) * (n-1) entries
+DEFAULT_EXACT_MAX_CITIES = 20
+DEFAULT_BOUND_MAX_CITIES = 2000  # Largest instance given a lower bound by default, each iteration is O(n^2)
+DEFAULT_BOUND_ITERATIONS = 100  # Subgradient steps of the Held-Karp lower bound
+BOUND_STALL_ITERATIONS = 5  # Steps without a better bound before the step size is halved
+
+
+def held_karp(matrix, start=0):
+    """Provably shortest closed tour with the Held-Karp dynamic program
+
+    ``dp[mask, j]`` is the length of the shortest path leaving ``start``, visiting
+    exactly the cities in bitmask ``mask`` and ending at city ``j``. The table is a
+    dense NumPy array indexed by bitmask, and all subsets of the same size are
+    updated together, one end city at a time. Returns the tour (without the repeated
+    start) and its length. Time is O(n^2 * 2^n), memory O(n * 2^n).
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    if n <= 3:
+        tour = [start] + [i for i in range(n) if i != start]
+        return tour, sum(float(matrix[tour[i - 1], tour[i]]) for i in range(n))
+
+    others = np.array([i for i in range(n) if i != start])
+    m = len(others)
+    dist = matrix[np.ix_(others, others)]
+    full = (1 << m) - 1
+
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int8)
+    singles = 1 << np.arange(m)
+    dp[singles, np.arange(m)] = matrix[start, others]
+
+    masks = np.arange(1 << m)
+    sizes = np.zeros(1 << m, dtype=np.int8)
+    for bit in range(m):
+        sizes += (masks >> bit) & 1
+
+    for size in range(2, m + 1):
+        layer = masks[sizes == size]
+        for j in range(m):
+            subset = layer[(layer >> j) & 1 == 1]
+            # Best previous end city k for every subset ending at j
+            candidates = dp[subset ^ (1 << j)] + dist[:, j]
+            best = np.argmin(candidates, axis=1)
+            dp[subset, j] = candidates[np.arange(len(subset)), best]
+            parent[subset, j] = best
+
+    closing = dp[full] + matrix[others, start]
+    last = int(np.argmin(closing))
+    length = float(closing[last])
+
+    # Walk the parent pointers back from the full set
+    tour = []
+    mask = full
+    while last != -1:
+        tour.append(int(others[last]))
+        mask, last = mask ^ (1 << last), int(parent[mask, last])
+    tour.append(start)
+    tour.reverse()
+    return tour, length
+
+
+def one_tree(weights):
+    """Minimum 1-tree of a complete graph: a spanning tree of cities 1..n-1 plus city 0's two shortest edges
+
+    Returns the tree's length and every city's degree in it.
+    """
+    n = len(weights)
+    degree = np.zeros(n, dtype=np.int64)
+    # Prim's algorithm over cities 1..n-1, one dense row at a time
+    key = weights[1].copy()
+    parent = np.ones(n, dtype=np.int64)
+    key[:2] = np.inf
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[:2] = True
+    length = 0.0
+    for _ in range(n - 2):
+        j = int(np.argmin(key))
+        length += key[j]
+        degree[j] += 1
+        degree[parent[j]] += 1
+        in_tree[j] = True
+        key[j] = np.inf
+        closer = (weights[j] < key) & ~in_tree
+        key[closer] = weights[j][closer]
+        parent[closer] = j
+
+    closest = np.argpartition(weights[0, 1:], 1)[:2] + 1
+    length += float(weights[0, closest].sum())
+    degree[0] = 2
+    degree[closest] += 1
+    return length, degree
+
+
+def held_karp_bound(matrix, upper_bound, iterations=DEFAULT_BOUND_ITERATIONS):
+    """Held-Karp lower bound on the length of the shortest closed tour
+
+    Every tour is a 1-tree, and adding a penalty pi[i] to all edges of city i adds
+    2 * sum(pi) to every tour, so the minimum 1-tree length minus 2 * sum(pi) is a
+    lower bound for any pi. Subgradient steps push pi up at cities of degree above
+    two, with step sizes scaled by the gap to ``upper_bound`` (e.g. a known tour's
+    length). Returns the best bound found in ``iterations`` steps.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    if n <= 3:
+        return float(sum(matrix[i - 1, i] for i in range(n))) if n > 1 else 0.0
+
+    pi = np.zeros(n)
+    best = -np.inf
+    scale = 2.0
+    stall = 0
+    for _ in range(iterations):
+        length, degree = one_tree(matrix + pi[:, None] + pi[None, :])
+        bound = length - 2 * pi.sum()
+        if bound > best + 1e-9:
+            best, stall = bound, 0
+        else:
+            stall += 1
+            if stall >= BOUND_STALL_ITERATIONS:
+                scale, stall = scale / 2, 0
+        direction = degree - 2
+        norm = float(direction @ direction)
+        if norm == 0 or upper_bound <= bound:
+            break  # The 1-tree is a tour or meets the upper bound, the bound can't rise further
+        pi += scale * (upper_bound - bound) / norm * direction
+    return float(best)
@@ -0,0 +1,166 @@
+import cProfile
+import functools
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_TOP_FUNCTIONS = 15  # Functions listed in a stage event's profile summary
+
+
+class PrintSink:
+    """Print messages to stdout, and optionally a line per finished stage"""
+
+    def __init__(self, stages=False):
+        self.stages = stages
+
+    def __call__(self, event):
+        if event["event"] == "message":
+            print(event["message"])
+        elif self.stages and event["event"] == "stage":
+            print(f"[{event['stage']}] {event['seconds']:.3f}s")
+
+
+class LoggingSink:
+    """Forward events to a standard library logger"""
+
+    LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("city_tour_optimizer")
+
+    def __call__(self, event):
+        if event["event"] == "message":
+            self.logger.log(self.LEVELS.get(event["level"], logging.INFO), event["message"])
+        elif event["event"] == "stage":
+            counters = ", ".join(f"{name}={value}" for name, value in event["counters"].items())
+            self.logger.debug("%s took %.3fs %s", event["stage"], event["seconds"], counters)
+
+
+class JsonLinesSink:
+    """Append every event as one JSON object per line to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock, open(self.path, "a") as file:
+            file.write(line + "\n")
+
+
+class Instrumentation:
+    """Stage timers, counters and optional profiling, reported to pluggable sinks
+
+    A sink is any callable taking an event dict. Every event has an ``event`` key:
+    "message" events carry ``level`` and ``message``, "stage" events carry ``stage``,
+    ``seconds``, the ``counters`` incremented during the stage and, when enabled, a
+    cProfile summary (``profile``) and the peak traced memory (``peak_memory_mb``).
+    Profiling and memory tracing only wrap the outermost stage.
+    """
+
+    def __init__(self, sinks=None, profile=False, trace_memory=False):
+        self.sinks = list(sinks) if sinks is not None else [PrintSink()]
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.counters = Counter()
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._depth = threading.local()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def emit(self, event):
+        """Send an event to every sink"""
+        event.setdefault("time", time.time())
+        for sink in list(self.sinks):
+            sink(event)
+
+    def message(self, message, level="info"):
+        """Report a human readable status message"""
+        self.emit({"event": "message", "level": level, "message": message})
+
+    def count(self, name, value=1):
+        """Increment a counter (thread-safe)"""
+        with self._lock:
+            self.counters[name] += value
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of work and emit a "stage" event when it ends"""
+        depth = getattr(self._depth, "value", 0)
+        outermost = depth == 0
+        self._depth.value = depth + 1
+
+        with self._lock:
+            counters_before = Counter(self.counters)
+        profiler = cProfile.Profile() if self.profile and outermost else None
+        started_tracing = False
+        if self.trace_memory and outermost:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            self._depth.value = depth
+
+            with self._lock:
+                counters = {key: value - counters_before[key] for key, value in self.counters.items()
+                            if value != counters_before[key]}
+                self.timings[name] = seconds
+
+            event = {"event": "stage", "stage": name, "seconds": seconds, "counters": counters}
+            if self.trace_memory and outermost:
+                event["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profiler is not None:
+                event["profile"] = _profile_summary(profiler)
+            self.emit(event)
+
+
+def _profile_summary(profiler):
+    """Top functions by cumulative time as a list of dicts"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    summary = []
+    for func in stats.fcn_list[:PROFILE_TOP_FUNCTIONS]:
+        calls, _, own_time, cumulative_time, _ = stats.stats[func]
+        filename, line, name = func
+        summary.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_seconds": round(own_time, 6),
+            "cumulative_seconds": round(cumulative_time, 6),
+        })
+    return summary
+
+
+def timed_stage(name):
+    """Decorator running a method inside ``self.instrumentation.stage(name)``"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.instrumentation.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
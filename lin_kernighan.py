@@ -0,0 +1,358 @@
+import math
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+from local_search import DOUBLE_BRIDGE_SPAN, EPSILON, _try_or_opt, tour_length
+
+DEFAULT_LK_CANDIDATES = 8  # Candidate cities per city, two from each quadrant where possible
+CANDIDATE_POOL_FACTOR = 3  # Quadrant candidates are picked among this many times as many nearest cities
+DEFAULT_LK_DEPTH = 10  # Most edge exchanges chained into one move
+DEFAULT_LK_BREADTH = 3  # Alternatives tried for the first exchange of a move
+MIN_SEGMENT_SIZE = 8
+
+
+class _Segment:
+    __slots__ = ("cities", "reversed", "rank")
+
+    def __init__(self, cities, reversed=False, rank=0):
+        self.cities = cities
+        self.reversed = reversed
+        self.rank = rank
+
+
+class SegmentTour:
+    """Tour stored as a two-level list of segments, so reversing a path costs O(sqrt(n))
+
+    The tour is cut into about sqrt(n) segments. Every segment keeps its cities in
+    a list, a reversed flag and its rank in the segment order. Reversing a path
+    splits at most two segments at its ends, then reverses the order of the whole
+    segments in between and flips their flags without touching their cities. Once
+    the splits have doubled the number of segments, they are rebuilt evenly.
+    """
+
+    def __init__(self, tour):
+        self.n = len(tour)
+        self._segment_size = max(MIN_SEGMENT_SIZE, math.isqrt(self.n))
+        self._segment_of = [None] * self.n
+        self._index = [0] * self.n
+        self._build(list(tour))
+
+    def _build(self, tour):
+        size = self._segment_size
+        self.segments = []
+        for start in range(0, self.n, size):
+            segment = _Segment(tour[start:start + size], rank=len(self.segments))
+            self.segments.append(segment)
+            for i, city in enumerate(segment.cities):
+                self._segment_of[city] = segment
+                self._index[city] = i
+        self._max_segments = 2 * len(self.segments) + 2
+
+    def to_list(self):
+        """The cities in tour order"""
+        tour = []
+        for segment in self.segments:
+            tour.extend(reversed(segment.cities) if segment.reversed else segment.cities)
+        return tour
+
+    def succ(self, city):
+        segment = self._segment_of[city]
+        i = self._index[city]
+        if segment.reversed:
+            if i > 0:
+                return segment.cities[i - 1]
+        elif i + 1 < len(segment.cities):
+            return segment.cities[i + 1]
+        following = self.segments[segment.rank + 1 if segment.rank + 1 < len(self.segments) else 0]
+        return following.cities[-1] if following.reversed else following.cities[0]
+
+    def pred(self, city):
+        segment = self._segment_of[city]
+        i = self._index[city]
+        if not segment.reversed:
+            if i > 0:
+                return segment.cities[i - 1]
+        elif i + 1 < len(segment.cities):
+            return segment.cities[i + 1]
+        previous = self.segments[segment.rank - 1]
+        return previous.cities[0] if previous.reversed else previous.cities[-1]
+
+    def _offset(self, city):
+        """Position of a city within its segment, in tour order"""
+        segment = self._segment_of[city]
+        i = self._index[city]
+        return len(segment.cities) - 1 - i if segment.reversed else i
+
+    def _split_before(self, city):
+        """Split the segment of ``city`` so that it starts with ``city``"""
+        segment = self._segment_of[city]
+        offset = self._offset(city)
+        if offset == 0:
+            return
+        cities = segment.cities
+        if segment.reversed:
+            head, tail = cities[len(cities) - offset:], cities[:len(cities) - offset]
+        else:
+            head, tail = cities[:offset], cities[offset:]
+
+        segment.cities = head
+        if segment.reversed:
+            for i, c in enumerate(head):
+                self._index[c] = i
+        new = _Segment(tail, segment.reversed)
+        for i, c in enumerate(tail):
+            self._segment_of[c] = new
+            self._index[c] = i
+        self.segments.insert(segment.rank + 1, new)
+        for rank in range(segment.rank + 1, len(self.segments)):
+            self.segments[rank].rank = rank
+
+    def reverse(self, first, last):
+        """Reverse the path running forward from ``first`` to ``last``"""
+        if first == last:
+            return
+        segment = self._segment_of[first]
+        if segment is self._segment_of[last]:
+            i, j = self._offset(first), self._offset(last)
+            if i > j:
+                # The path runs around the whole tour, flip the rest of this segment instead
+                if self.succ(last) != first:
+                    self.reverse(self.succ(last), self.pred(first))
+                return
+            i, j = sorted((self._index[first], self._index[last]))
+            cities = segment.cities
+            cities[i:j + 1] = cities[j:i - 1 if i else None:-1]
+            for k in range(i, j + 1):
+                self._index[cities[k]] = k
+            return
+
+        following = self.succ(last)
+        if following == first:
+            return  # Reversing the whole tour leaves the same cycle
+        self._split_before(first)
+        self._split_before(following)
+
+        count = len(self.segments)
+        start, stop = self._segment_of[first].rank, self._segment_of[last].rank
+        span = (stop - start) % count + 1
+        if 2 * span > count:
+            # The complementary path is shorter and reversing it gives the same cycle
+            start, span = (stop + 1) % count, count - span
+        ranks = [(start + k) % count for k in range(span)]
+        chosen = [self.segments[rank] for rank in ranks]
+        for rank, segment in zip(ranks, reversed(chosen)):
+            self.segments[rank] = segment
+            segment.rank = rank
+            segment.reversed = not segment.reversed
+
+        if len(self.segments) > self._max_segments:
+            self._build(self.to_list())
+
+    def exchange(self, x1, x2, y1, y2):
+        """Replace edges (x1, x2) and (y1, y2) with (x1, y1) and (x2, y2)
+
+        Both edges must run in the same direction around the tour.
+        """
+        if self.succ(x1) == x2:
+            self.reverse(x2, y1)
+        else:
+            self.reverse(y1, x2)
+
+
+def quadrant_candidates(lats, lons, pool, k=DEFAULT_LK_CANDIDATES):
+    """Pick ``k`` candidates per city from its nearest cities, spread over the four quadrants
+
+    ``pool`` lists the nearest cities of every city, nearest first. Up to k/4 of
+    them are taken from each quadrant around the city (in a local east/north
+    plane), so clustered cities still get candidates towards every side; free
+    places go to the nearest remaining cities. Candidates stay sorted by distance.
+    """
+    pool = np.asarray(pool, dtype=np.intp)
+    if pool.ndim != 2 or pool.shape[1] <= k:
+        return pool.tolist()
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    east = (lons[pool] - lons[:, None] + 180) % 360 - 180
+    east *= np.cos(np.radians(lats))[:, None]
+    north = lats[pool] - lats[:, None]
+    quadrant = (east >= 0).astype(np.int8) + 2 * (north >= 0)
+
+    chosen = np.zeros(pool.shape, dtype=bool)
+    for q in range(4):
+        inside = quadrant == q
+        chosen |= inside & (np.cumsum(inside, axis=1) <= k // 4)
+    free = k - chosen.sum(axis=1)
+    chosen |= ~chosen & (np.cumsum(~chosen, axis=1) <= free[:, None])
+    return [row[mask].tolist() for row, mask in zip(pool, chosen)]
+
+
+class _LinKernighan:
+    """Lin-Kernighan search state: the tour, its length and a log of exchanges to undo"""
+
+    def __init__(self, tour, dist, candidates, max_depth, breadth):
+        self.tour = SegmentTour(tour)
+        self.n = self.tour.n
+        self.dist = dist
+        self.candidates = candidates
+        self.max_depth = max_depth
+        self.breadth = breadth
+        self.length = tour_length(tour, dist)
+        self.log = []
+
+    # succ, pred and exchange let local_search's Or-opt move work on this tour too
+    def succ(self, city):
+        return self.tour.succ(city)
+
+    def pred(self, city):
+        return self.tour.pred(city)
+
+    def exchange(self, x1, x2, y1, y2):
+        dist = self.dist
+        self.length += dist(x1, y1) + dist(x2, y2) - dist(x1, x2) - dist(y1, y2)
+        self.tour.exchange(x1, x2, y1, y2)
+        self.log.append((x1, x2, y1, y2))
+
+    def undo(self, size):
+        """Undo the logged exchanges until only ``size`` are left"""
+        dist = self.dist
+        while len(self.log) > size:
+            x1, x2, y1, y2 = self.log.pop()
+            self.length -= dist(x1, y1) + dist(x2, y2) - dist(x1, x2) - dist(y1, y2)
+            self.tour.exchange(x1, y1, x2, y2)
+
+    def _steps(self, t1, t2, gain, added):
+        """Possible next exchanges (gain, t3, t4), best first
+
+        The tour edge (t1, t2) is the one to close: t2 gets the new edge (t2, t3)
+        and t3 loses its edge to t4, after which (t4, t1) closes the tour again.
+        """
+        dist = self.dist
+        forward = self.succ(t1) == t2
+        steps = []
+        for t3 in self.candidates[t2]:
+            g1 = gain - dist(t2, t3)
+            if g1 <= EPSILON:
+                break  # Candidates are sorted, no later one keeps the gain positive
+            if t3 == t1:
+                continue
+            t4 = self.pred(t3) if forward else self.succ(t3)
+            if t4 == t2 or (min(t3, t4), max(t3, t4)) in added:
+                continue
+            steps.append((g1 + dist(t3, t4), t3, t4))
+        steps.sort(reverse=True)
+        return steps
+
+    def _lk_move(self, t1, t2, wake):
+        """Find and apply an improving chain of exchanges that starts by removing (t1, t2)"""
+        dist = self.dist
+        start = len(self.log)
+        for gain, t3, t4 in self._steps(t1, t2, dist(t1, t2), ())[:self.breadth]:
+            self.exchange(t1, t2, t4, t3)
+            added = {(min(t2, t3), max(t2, t3))}
+            best_gain, best_size = gain - dist(t4, t1), len(self.log)
+            last = t4
+            for _ in range(self.max_depth - 1):
+                steps = self._steps(t1, last, gain, added)
+                if not steps:
+                    break
+                gain, t3, t4 = steps[0]
+                self.exchange(t1, last, t4, t3)
+                added.add((min(last, t3), max(last, t3)))
+                last = t4
+                if gain - dist(t4, t1) > best_gain:
+                    best_gain, best_size = gain - dist(t4, t1), len(self.log)
+
+            if best_gain > EPSILON:
+                self.undo(best_size)
+                for entry in self.log[start:]:
+                    wake(*entry)
+                return True
+            self.undo(start)
+        return False
+
+    def optimize(self, active, deadline):
+        """Apply improving moves around the ``active`` cities until none is left or time is up
+
+        Returns the number of moves applied.
+        """
+        queue = deque(active)
+        queued = [False] * self.n
+        for city in queue:
+            queued[city] = True
+
+        def wake(*cities):
+            for city in cities:
+                if not queued[city]:
+                    queued[city] = True
+                    queue.append(city)
+
+        moves = 0
+        while queue:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            a = queue.popleft()
+            queued[a] = False
+            improved = (self._lk_move(a, self.succ(a), wake) or self._lk_move(a, self.pred(a), wake)
+                        or _try_or_opt(self, a, self.dist, self.candidates, wake))
+            if improved:
+                moves += 1
+                wake(a)
+        return moves
+
+    def kick(self, rng, span=DOUBLE_BRIDGE_SPAN):
+        """Apply a double-bridge move inside a window of ``span`` cities, return the cities it touched
+
+        A B C D becomes A C B D through three exchanges, so it can be undone like any move.
+        """
+        p1, p2, p3 = sorted(rng.sample(range(1, min(span, self.n - 1) + 1), 3))
+        path = [rng.randrange(self.n)]
+        for _ in range(p3):
+            path.append(self.succ(path[-1]))
+        a, b1, b2, c1, c2, d = path[p1 - 1], path[p1], path[p2 - 1], path[p2], path[p3 - 1], path[p3]
+        self.exchange(a, b1, c2, d)
+        self.exchange(a, c2, c1, b2)
+        self.exchange(c2, b2, b1, d)
+        return [a, b1, b2, c1, c2, d]
+
+
+def lin_kernighan(tour, dist, candidates, time_budget=None, max_depth=DEFAULT_LK_DEPTH,
+                  breadth=DEFAULT_LK_BREADTH, seed=0):
+    """Improve a closed tour with Lin-Kernighan style variable-depth moves
+
+    A move removes a tour edge and keeps exchanging edges, each time adding an edge
+    to one of the ``candidates`` of the current end while the running gain stays
+    positive, for at most ``max_depth`` exchanges; the best prefix of the chain is
+    kept. The first exchange tries ``breadth`` alternatives. Cities no move improves
+    also try an Or-opt move. With a ``time_budget`` (seconds), the time left after
+    the first local optimum goes to double-bridge kicks, each kept only if the
+    re-optimized tour is shorter.
+
+    Returns the improved tour, the number of moves and the number of kicks kept.
+    """
+    n = len(tour)
+    if n < 5:
+        return list(tour), 0, 0
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    search = _LinKernighan(tour, dist, candidates, max_depth, breadth)
+    moves = search.optimize(range(n), deadline)
+    search.log.clear()
+
+    kicks = 0
+    if deadline is not None and n >= 8:
+        rng = random.Random(seed)
+        best_length = search.length
+        while time.perf_counter() < deadline:
+            touched = search.kick(rng)
+            kick_moves = search.optimize(touched, deadline)
+            if search.length < best_length - EPSILON:
+                best_length = search.length
+                moves += kick_moves
+                kicks += 1
+                search.log.clear()
+            else:
+                search.undo(0)
+    return search.tour.to_list(), moves, kicks
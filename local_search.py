@@ -0,0 +1,246 @@
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_NEIGHBOR_K = 10  # Candidate cities considered per city
+MAX_SEGMENT_LENGTH = 3  # Longest segment moved by Or-opt
+DOUBLE_BRIDGE_SPAN = 50  # Tour positions spanned by a double-bridge perturbation
+
+# Ignore "improvements" below this, they are floating point noise
+EPSILON = 1e-9
+
+
+def tour_length(tour, dist):
+    """Length of the closed tour (a list of city indices, without the repeated start)"""
+    return sum(dist(tour[i - 1], tour[i]) for i in range(len(tour)))
+
+
+def nearest_neighbor_tour(row, n, start=0):
+    """Greedy Nearest Neighbor tour from ``start``, where ``row(i)`` gives distances from city i
+
+    Returns the tour (without the repeated start) and its closed length.
+    """
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    tour = [start]
+    length = 0.0
+    current = start
+
+    for _ in range(n - 1):
+        distances = np.where(visited, np.inf, row(current))
+        nearest = int(np.argmin(distances))
+        length += float(distances[nearest])
+        visited[nearest] = True
+        tour.append(nearest)
+        current = nearest
+
+    length += float(row(current)[start])
+    return tour, length
+
+
+class _ArrayTour:
+    """Array tour with a position index, supporting 2-opt style edge exchanges"""
+
+    def __init__(self, tour):
+        self.tour = list(tour)
+        self.n = len(self.tour)
+        self.pos = [0] * self.n
+        for i, city in enumerate(self.tour):
+            self.pos[city] = i
+
+    def succ(self, city):
+        return self.tour[(self.pos[city] + 1) % self.n]
+
+    def pred(self, city):
+        return self.tour[self.pos[city] - 1]
+
+    def reverse(self, first, last):
+        """Reverse the path running forward from ``first`` to ``last``
+
+        Reversing the complementary path yields the same cycle, so the shorter
+        of the two is the one actually flipped.
+        """
+        n = self.n
+        i, j = self.pos[first], self.pos[last]
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+
+        tour, pos = self.tour, self.pos
+        for _ in range(length // 2):
+            a, b = tour[i], tour[j]
+            tour[i], pos[b] = b, i
+            tour[j], pos[a] = a, j
+            i = i + 1 if i + 1 < n else 0
+            j = j - 1 if j > 0 else n - 1
+
+    def exchange(self, x1, x2, y1, y2):
+        """Replace edges (x1, x2) and (y1, y2) with (x1, y1) and (x2, y2)
+
+        Both edges must run in the same direction around the tour.
+        """
+        if self.succ(x1) == x2:
+            self.reverse(x2, y1)
+        else:
+            self.reverse(y1, x2)
+
+
+def two_opt_or_opt(tour, dist, neighbors, time_budget=None, or_opt=True, active=None):
+    """Improve a closed tour with 2-opt and Or-opt moves restricted to neighbor lists
+
+    ``tour`` lists every city index once (no repeated start), ``dist(a, b)`` returns a
+    distance and ``neighbors[a]`` lists candidate cities for ``a`` sorted by distance.
+    Don't-look bits keep each pass close to O(n*k): a city is only re-examined after
+    one of its tour edges changed. ``active`` limits the initial work to some cities.
+
+    Returns the improved tour and the number of moves applied.
+    """
+    search = iter_two_opt_or_opt(tour, dist, neighbors, time_budget=time_budget, or_opt=or_opt, active=active)
+    return deque(search, maxlen=1)[0]
+
+
+def iter_two_opt_or_opt(tour, dist, neighbors, time_budget=None, or_opt=True, active=None,
+                        report_interval=None, cancel=None):
+    """Generator form of two_opt_or_opt, yielding (tour, moves) while the search runs
+
+    A copy of the current tour is yielded every ``report_interval`` seconds if it
+    changed since the last report, and the final tour is always yielded last. The
+    search stops early once ``cancel`` (e.g. a threading.Event) is set.
+    """
+    t = _ArrayTour(tour)
+    n = t.n
+    if n < 5:
+        yield t.tour, 0
+        return
+
+    start = time.perf_counter()
+    deadline = None if time_budget is None else start + time_budget
+    next_report = None if report_interval is None else start + report_interval
+    queue = deque(range(n) if active is None else active)
+    queued = [False] * n
+    for city in queue:
+        queued[city] = True
+
+    def wake(*cities):
+        for city in cities:
+            if not queued[city]:
+                queued[city] = True
+                queue.append(city)
+
+    moves = reported = 0
+    while queue:
+        if deadline is not None or next_report is not None:
+            now = time.perf_counter()
+            if deadline is not None and now > deadline:
+                break
+            if next_report is not None and now > next_report:
+                next_report = now + report_interval
+                if moves > reported:
+                    reported = moves
+                    yield list(t.tour), moves
+        if cancel is not None and cancel.is_set():
+            break
+
+        a = queue.popleft()
+        queued[a] = False
+
+        improved = _try_two_opt(t, a, dist, neighbors, wake)
+        if not improved and or_opt:
+            improved = _try_or_opt(t, a, dist, neighbors, wake)
+        if improved:
+            moves += 1
+            wake(a)
+
+    yield t.tour, moves
+
+
+def double_bridge(tour, rng, span=DOUBLE_BRIDGE_SPAN):
+    """Perturb a tour with a double-bridge move inside a window of ``span`` cities
+
+    The tour is cut into A B C D with the three cuts close together and reassembled
+    as A C B D, a change 2-opt and Or-opt cannot easily undo. Returns the new tour
+    and the cities at the six changed edge ends.
+    """
+    n = len(tour)
+    offset = rng.randrange(n)
+    tour = tour[offset:] + tour[:offset]
+    p1, p2, p3 = sorted(rng.sample(range(1, min(span, n - 1) + 1), 3))
+    touched = [tour[p - 1] for p in (p1, p2, p3)] + [tour[p % n] for p in (p1, p2, p3)]
+    return tour[:p1] + tour[p2:p3] + tour[p1:p2] + tour[p3:], touched
+
+
+def _try_two_opt(t, a, dist, neighbors, wake):
+    """Apply the first improving 2-opt move that adds an edge from ``a`` to a neighbor"""
+    for forward in (True, False):
+        b = t.succ(a) if forward else t.pred(a)
+        d_ab = dist(a, b)
+        for c in neighbors[a]:
+            d_ac = dist(a, c)
+            if d_ac >= d_ab:
+                break  # Neighbors are sorted, no later candidate can gain
+            d = t.succ(c) if forward else t.pred(c)
+            if c == b or d == a:
+                continue
+
+            delta = d_ac + dist(b, d) - d_ab - dist(c, d)
+            if delta < -EPSILON:
+                t.exchange(a, b, c, d)
+                wake(b, c, d)
+                return True
+    return False
+
+
+def _try_or_opt(t, a, dist, neighbors, wake):
+    """Move a segment of 1-3 cities starting at ``a`` between two neighboring cities"""
+    n = t.n
+    for length in range(1, MAX_SEGMENT_LENGTH + 1):
+        if length + 3 > n:
+            break
+
+        # Segment s1..s2 running forward from a, between p and nx
+        s1 = a
+        segment = [s1]
+        for _ in range(length - 1):
+            segment.append(t.succ(segment[-1]))
+        s2 = segment[-1]
+        p, nx = t.pred(s1), t.succ(s2)
+        removal_gain = dist(p, s1) + dist(s2, nx) - dist(p, nx)
+        if removal_gain <= EPSILON:
+            continue
+
+        for end in (s1, s2):
+            for c in neighbors[end]:
+                if dist(end, c) >= removal_gain:
+                    break
+                if c in segment:
+                    continue
+
+                # Try the edges on both sides of c
+                for u, v in ((c, t.succ(c)), (t.pred(c), c)):
+                    if u in segment or v in segment:
+                        continue
+                    d_uv = dist(u, v)
+                    forward_cost = dist(u, s1) + dist(s2, v) - d_uv
+                    reverse_cost = dist(u, s2) + dist(s1, v) - d_uv
+                    if min(forward_cost, reverse_cost) - removal_gain < -EPSILON:
+                        if u == nx:
+                            # Next to the old successor: p nx s2..s1 v is one exchange away
+                            t.exchange(p, s1, nx, v)
+                            if forward_cost < reverse_cost:
+                                t.exchange(nx, s2, s1, v)
+                        elif v == p:
+                            # Next to the old predecessor: u s2..s1 p nx is one exchange away
+                            t.exchange(u, p, s2, nx)
+                            if forward_cost < reverse_cost:
+                                t.exchange(u, s2, s1, p)
+                        else:
+                            # Splice p->nx and insert s2..s1 between u and v
+                            t.exchange(p, s1, u, v)
+                            t.exchange(p, u, nx, s2)
+                            if forward_cost < reverse_cost:
+                                t.exchange(u, s2, s1, v)
+                        wake(p, nx, u, v, s1, s2)
+                        return True
+    return False
@@ -0,0 +1,84 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from distance_engine import nearest_neighbor_lists
+from local_search import DEFAULT_NEIGHBOR_K, nearest_neighbor_tour, tour_length, two_opt_or_opt
+
+# Per-process state of pool workers, set up once by _init_worker
+_worker = {}
+
+
+def _attach(name, shape, dtype):
+    """Attach to a shared memory block created by the parent process"""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _init_worker(matrix_spec, neighbors_spec):
+    matrix_shm, matrix = _attach(*matrix_spec)
+    neighbors_shm, neighbors = _attach(*neighbors_spec)
+    _worker["blocks"] = (matrix_shm, neighbors_shm)
+    _worker["matrix"] = matrix
+    _worker["neighbors"] = neighbors.tolist()
+
+
+def _solve_from(start, improve, time_budget):
+    """Build (and optionally improve) the tour from one start city, in a worker"""
+    matrix = _worker["matrix"]
+    tour, length = nearest_neighbor_tour(matrix.__getitem__, len(matrix), start)
+    if improve:
+        tour, _ = two_opt_or_opt(tour, matrix.item, _worker["neighbors"], time_budget=time_budget)
+        length = tour_length(tour, matrix.item)
+    return length, start, tour
+
+
+def _share(array):
+    """Copy an array into a new shared memory block"""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def choose_starts(n, num_starts, random_starts=False, seed=None, include=None):
+    """Pick start cities: spread evenly over the index range, or sampled at random"""
+    num_starts = min(num_starts, n)
+    if random_starts:
+        starts = random.Random(seed).sample(range(n), num_starts)
+    else:
+        starts = np.linspace(0, n, num_starts, endpoint=False).astype(int).tolist()
+    if include is not None and include not in starts:
+        starts[0] = include
+    return starts
+
+
+def solve_multistart(matrix, starts, improve=True, time_budget=None, neighbor_k=DEFAULT_NEIGHBOR_K,
+                     max_workers=None):
+    """Run Nearest Neighbor (plus 2-opt/Or-opt) from every start city across a process pool
+
+    The distance matrix and neighbor lists are copied once into shared memory, so
+    each task only sends a start index to the workers. Returns (length, start, tour)
+    of the shortest tour found.
+    """
+    matrix = np.asarray(matrix)
+    neighbors = nearest_neighbor_lists(matrix, neighbor_k)
+    max_workers = max_workers or os.cpu_count() or 1
+    starts = list(starts)
+
+    matrix_shm, matrix_spec = _share(matrix)
+    neighbors_shm, neighbors_spec = _share(neighbors)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(matrix_spec, neighbors_spec)) as pool:
+            results = pool.map(_solve_from, starts, [improve] * len(starts), [time_budget] * len(starts),
+                               chunksize=max(1, len(starts) // (4 * max_workers)))
+            return min(results, key=lambda result: result[0])
+    finally:
+        matrix_shm.close()
+        matrix_shm.unlink()
+        neighbors_shm.close()
+        neighbors_shm.unlink()
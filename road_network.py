@@ -0,0 +1,329 @@
+"""Road network distances: a CSR road graph, city snapping and shortest path tables
+
+Convert a road network (e.g. exported from an OpenStreetMap extract) to the graph file
+used by ``calculate_distance_matrix(road_graph=...)``:
+
+    python road_network.py nodes.csv edges.csv roads.npz
+
+``nodes.csv`` has ``id,lat,lon`` rows and ``edges.csv`` has ``from,to`` rows with an
+optional ``length_km`` column (the straight line between the nodes if missing) and
+an optional ``oneway`` column (1 for edges that can only be driven from -> to).
+"""
+import argparse
+import csv
+import hashlib
+import heapq
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from distance_engine import haversine_to_many, load_distance_matrix, save_distance_matrix
+from spatial_index import UnitSphereKDTree, chord_to_km, unit_vectors
+
+ROAD_GRAPH_VERSION = 1
+DEFAULT_ROAD_CACHE_DIR = "road_distance_cache"
+MAX_SNAP_KM = 5.0  # Cities farther than this from any road node are reported when snapped
+MIN_PARALLEL_SOURCES = 32  # Fewer Dijkstra runs than this are not worth a process pool
+
+
+class RoadGraph:
+    """Road network as a CSR adjacency structure
+
+    Node i lies at (``lats[i]``, ``lons[i]``); its outgoing edges lead to
+    ``indices[indptr[i]:indptr[i + 1]]`` and are ``weights[...]`` km long. Two-way
+    roads are stored as one edge per direction, and ``directed`` records whether
+    any road is one-way.
+    """
+
+    def __init__(self, indptr, indices, weights, lats, lons, directed=False):
+        self.indptr = np.ascontiguousarray(indptr, dtype=np.int64)
+        self.indices = np.ascontiguousarray(indices, dtype=np.int64)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.lats = np.ascontiguousarray(lats, dtype=np.float64)
+        self.lons = np.ascontiguousarray(lons, dtype=np.float64)
+        self.directed = bool(directed)
+        if len(self.indptr) != len(self.lats) + 1 or len(self.lats) != len(self.lons):
+            raise ValueError("indptr must have one entry per node plus one")
+        if len(self.indices) != len(self.weights) or self.indptr[-1] != len(self.indices):
+            raise ValueError("indices and weights must have one entry per edge")
+        if len(self.weights) and self.weights.min() < 0:
+            raise ValueError("edge lengths must not be negative")
+        self._tree = None
+        self._reverse = None
+        self._fingerprint = None
+        self._adjacency = None
+
+    @property
+    def num_nodes(self):
+        return len(self.lats)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @classmethod
+    def from_edges(cls, lats, lons, sources, targets, lengths=None, oneway=None):
+        """Build a graph from edge arrays; edges are two-way unless ``oneway`` marks them"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if lengths is None:
+            lengths = haversine_to_many(lats[sources], lons[sources], lats[targets], lons[targets])
+        lengths = np.asarray(lengths, dtype=np.float64)
+        oneway = np.zeros(len(sources), dtype=bool) if oneway is None else np.asarray(oneway, dtype=bool)
+
+        two_way = ~oneway
+        sources, targets = (np.concatenate((sources, targets[two_way])),
+                            np.concatenate((targets, sources[two_way])))
+        lengths = np.concatenate((lengths, lengths[two_way]))
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(len(lats) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(lats)), out=indptr[1:])
+        return cls(indptr, targets[order], lengths[order], lats, lons, directed=bool(oneway.any()))
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph saved with ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != ROAD_GRAPH_VERSION:
+                raise ValueError(f"Unsupported road graph version {version}")
+            return cls(data["indptr"], data["indices"], data["weights"], data["lats"], data["lons"],
+                       directed=bool(data["directed"]))
+
+    def save(self, path):
+        """Write the graph to an uncompressed .npz file"""
+        np.savez(path, version=ROAD_GRAPH_VERSION, indptr=self.indptr, indices=self.indices, weights=self.weights,
+                 lats=self.lats, lons=self.lons, directed=self.directed)
+
+    def fingerprint(self):
+        """SHA-256 digest of the graph's contents, used to key cached distance tables"""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for array in (self.indptr, self.indices, self.weights, self.lats, self.lons):
+                digest.update(array.tobytes())
+            digest.update(b"directed" if self.directed else b"undirected")
+            self._fingerprint = digest.digest()
+        return self._fingerprint
+
+    def adjacency(self):
+        """(indptr, indices, weights) as plain lists for dijkstra, converted once per graph"""
+        if self._adjacency is None:
+            self._adjacency = (self.indptr.tolist(), self.indices.tolist(), self.weights.tolist())
+        return self._adjacency
+
+    def reverse(self):
+        """The graph with every edge reversed (the graph itself when undirected)"""
+        if not self.directed:
+            return self
+        if self._reverse is None:
+            sources = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.num_nodes), out=indptr[1:])
+            self._reverse = RoadGraph(indptr, sources[order], self.weights[order], self.lats, self.lons,
+                                      directed=True)
+            self._reverse._reverse = self
+        return self._reverse
+
+    def snap(self, lats, lons):
+        """Nearest graph node of every point and the straight-line distance to it (km)"""
+        if self._tree is None:
+            self._tree = UnitSphereKDTree(self.lats, self.lons)
+        nodes = np.empty(len(lats), dtype=np.int64)
+        chords = np.empty(len(lats))
+        for i, point in enumerate(unit_vectors(lats, lons).tolist()):
+            nodes[i], chords[i] = self._tree.nearest_to_point(point)
+        return nodes, chord_to_km(chords)
+
+
+def load_road_graph(graph):
+    """Accept a RoadGraph or the path to a saved one"""
+    if isinstance(graph, RoadGraph):
+        return graph
+    if isinstance(graph, (str, os.PathLike)):
+        return RoadGraph.load(graph)
+    raise TypeError(f"Unsupported road graph: {graph!r}")
+
+
+def graph_from_csv(nodes_path, edges_path):
+    """Build a RoadGraph from node and edge CSV files (see the module docstring)"""
+    ids = {}
+    lats = []
+    lons = []
+    with open(nodes_path, newline="") as file:
+        for row in csv.DictReader(file):
+            ids[row["id"]] = len(lats)
+            lats.append(float(row["lat"]))
+            lons.append(float(row["lon"]))
+
+    sources = []
+    targets = []
+    lengths = []
+    oneway = []
+    with open(edges_path, newline="") as file:
+        for row in csv.DictReader(file):
+            sources.append(ids[row["from"]])
+            targets.append(ids[row["to"]])
+            lengths.append(float(row["length_km"]) if row.get("length_km") else np.nan)
+            oneway.append(row.get("oneway", "").strip().lower() in ("1", "yes", "true"))
+
+    lats = np.array(lats)
+    lons = np.array(lons)
+    sources = np.array(sources, dtype=np.int64)
+    targets = np.array(targets, dtype=np.int64)
+    lengths = np.array(lengths)
+    missing = np.isnan(lengths)
+    lengths[missing] = haversine_to_many(lats[sources[missing]], lons[sources[missing]],
+                                         lats[targets[missing]], lons[targets[missing]])
+    return RoadGraph.from_edges(lats, lons, sources, targets, lengths, oneway)
+
+
+def dijkstra(indptr, indices, weights, source, targets):
+    """Shortest path lengths from ``source`` to every node of ``targets`` (a list), inf if unreachable
+
+    The adjacency arrays are plain lists for speed. The search stops as soon as
+    every target is settled, so nearby targets only explore part of the graph.
+    """
+    inf = float("inf")
+    position = {}
+    for i, node in enumerate(targets):
+        position.setdefault(node, []).append(i)
+    result = [inf] * len(targets)
+    remaining = len(position)
+
+    best = [inf] * (len(indptr) - 1)
+    best[source] = 0.0
+    heap = [(0.0, source)]
+    heappush, heappop = heapq.heappush, heapq.heappop
+    while heap and remaining:
+        d, u = heappop(heap)
+        if d > best[u]:
+            continue  # Stale entry, u was settled at a shorter distance
+        if u in position:
+            for i in position[u]:
+                result[i] = d
+            remaining -= 1
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            candidate = d + weights[e]
+            if candidate < best[v]:
+                best[v] = candidate
+                heappush(heap, (candidate, v))
+    return result
+
+
+# Per-process state of pool workers: the adjacency lists, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(indptr, indices, weights):
+    _worker["graph"] = (indptr.tolist(), indices.tolist(), weights.tolist())
+
+
+def _rows_from(sources, targets):
+    return [dijkstra(*_worker["graph"], source, targets) for source in sources]
+
+
+def shortest_path_table(graph, sources, targets, max_workers=None):
+    """Shortest path lengths (km) from every source node to every target node
+
+    One Dijkstra search runs per source, spread over a process pool for larger
+    tables; each worker receives the graph once.
+    """
+    sources = [int(node) for node in sources]
+    targets = [int(node) for node in targets]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(sources) < MIN_PARALLEL_SOURCES:
+        adjacency = graph.adjacency()
+        rows = [dijkstra(*adjacency, source, targets) for source in sources]
+    else:
+        chunk = max(1, len(sources) // (4 * max_workers))
+        chunks = [sources[i:i + chunk] for i in range(0, len(sources), chunk)]
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(graph.indptr, graph.indices, graph.weights)) as pool:
+            rows = [row for rows in pool.map(_rows_from, chunks, [targets] * len(chunks)) for row in rows]
+    return np.array(rows, dtype=np.float64).reshape(len(sources), len(targets))
+
+
+def _node_table(graph, nodes, max_workers=None, cache_dir=DEFAULT_ROAD_CACHE_DIR):
+    """Symmetric node-to-node road distances, read from or written to the disk cache
+
+    Returns the table and whether it came from the cache.
+    """
+    digest = hashlib.sha256(graph.fingerprint())
+    digest.update(np.asarray(nodes, dtype="<i8").tobytes())
+    key = digest.digest()
+    path = os.path.join(cache_dir, key.hex()[:32] + ".ctdm") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            return load_distance_matrix(path, key, mmap=False), True
+        except ValueError:
+            pass
+
+    table = shortest_path_table(graph, nodes, nodes, max_workers)
+    if graph.directed:
+        # The tour solvers assume d(a, b) == d(b, a); average the two directions
+        table = (table + table.T) / 2
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        save_distance_matrix(path, table, key)
+    return table, False
+
+
+def road_distance_matrix(graph, lats, lons, max_workers=None, cache_dir=DEFAULT_ROAD_CACHE_DIR, dtype=np.float64):
+    """Road distances (km) between cities, via their nearest graph nodes
+
+    Returns (matrix, snapped nodes, snap distances in km, cached). A distance is the
+    straight line from each city to its node plus the shortest path between the
+    nodes. Pairs with no road connection fall back to the haversine distance.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    nodes, snap_km = graph.snap(lats, lons)
+    # Cities sharing a node share a Dijkstra search and a row of the cached table
+    unique_nodes, inverse = np.unique(nodes, return_inverse=True)
+    table, cached = _node_table(graph, unique_nodes, max_workers, cache_dir)
+
+    matrix = table[np.ix_(inverse, inverse)] + snap_km[:, None] + snap_km[None, :]
+    unreachable = ~np.isfinite(matrix)
+    if unreachable.any():
+        rows, cols = np.nonzero(unreachable)
+        matrix[rows, cols] = haversine_to_many(lats[rows], lons[rows], lats[cols], lons[cols])
+    np.fill_diagonal(matrix, 0.0)
+    return matrix.astype(dtype, copy=False), nodes, snap_km, cached
+
+
+def road_distances_from(graph, lat, lon, nodes, snap_km):
+    """Road distances (km) from a new point to cities snapped to ``nodes``, and the point's snap
+
+    Returns (row, node, snap distance). Like road_distance_matrix, one-way roads
+    are averaged over both directions and unreachable cities get inf.
+    """
+    node, snap = graph.snap([lat], [lon])
+    node, snap = int(node[0]), float(snap[0])
+    row = shortest_path_table(graph, [node], nodes, max_workers=1)[0]
+    if graph.directed:
+        row = (row + shortest_path_table(graph.reverse(), [node], nodes, max_workers=1)[0]) / 2
+    return row + snap + np.asarray(snap_km), node, snap
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert node and edge CSV files to a road graph file")
+    parser.add_argument("nodes", help="CSV with id, lat, lon columns")
+    parser.add_argument("edges", help="CSV with from, to and optional length_km, oneway columns")
+    parser.add_argument("output", help="graph file to write (.npz)")
+    args = parser.parse_args(argv)
+
+    graph = graph_from_csv(args.nodes, args.edges)
+    graph.save(args.output)
+    print(f"Wrote {args.output}: {graph.num_nodes} nodes, {graph.num_edges} directed edges"
+          f"{' (with one-way roads)' if graph.directed else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
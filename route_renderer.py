@@ -0,0 +1,124 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from vrp import VEHICLE_COLORS
+
+DEFAULT_FIGSIZE = (12, 10)
+DEFAULT_MAX_LABELS = 200  # Most city names drawn at once
+LABEL_CELL_POINTS = (90, 18)  # Screen area reserved for one label, in points
+BOUNDS_MARGIN = 0.05  # Padding around the cities, as a fraction of their extent
+
+
+class RouteRenderer:
+    """Draws cities and a tour on one matplotlib Figure, updating its artists in place
+
+    The route is a single LineCollection built from coordinate arrays, and city names
+    are decluttered: at most one label per screen cell, ``max_labels`` in total, and
+    only for cities in view. Labels are chosen again whenever the axes are zoomed or
+    panned. Re-drawing a new tour for the same cities keeps the current zoom.
+    """
+
+    def __init__(self, figure=None, max_labels=DEFAULT_MAX_LABELS, title='Optimized City Tour Route'):
+        self.figure = figure if figure is not None else Figure(figsize=DEFAULT_FIGSIZE)
+        self.max_labels = max_labels
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_title(title)
+        self.ax.set_xlabel('Longitude')
+        self.ax.set_ylabel('Latitude')
+        self.ax.grid(True)
+
+        self.cities = self.ax.scatter([], [], c='blue', s=50, label='Cities', zorder=2)
+        self.route = LineCollection([], colors='red', linewidths=2, label='Optimized Route', zorder=1)
+        self.ax.add_collection(self.route)
+        self.start = self.ax.scatter([], [], c='green', s=200, marker='*', label='Start/End City', zorder=3)
+        self.ax.legend(loc='upper right')
+
+        self._labels = []
+        self._names = []
+        self._points = np.empty((0, 2))
+        self._priority = np.empty(0, dtype=np.intp)
+        self._bounds = None
+        self._updating = False
+        self.ax.callbacks.connect('xlim_changed', self._on_view_changed)
+        self.ax.callbacks.connect('ylim_changed', self._on_view_changed)
+
+    def draw(self, lats, lons, route, names=None, routes=None):
+        """Show the cities at ``lats``/``lons`` and the closed ``route`` (a list of indices)
+
+        With ``routes``, a closed route per vehicle, each vehicle gets its own color.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        route = np.asarray(route, dtype=np.intp)
+        n = len(lats)
+        self._points = np.column_stack((lons, lats))
+        self._names = list(names) if names is not None else []
+
+        # Marker size and line width shrink as the map gets crowded
+        self.cities.set_offsets(self._points)
+        self.cities.set_sizes([50 if n <= 100 else max(2.0, 50 * np.sqrt(100 / n))])
+        route_points = self._points[route]
+        self.route.set_segments(np.stack((route_points[:-1], route_points[1:]), axis=1))
+        if routes:
+            self.route.set_color([VEHICLE_COLORS[k % len(VEHICLE_COLORS)]
+                                  for k, vehicle in enumerate(routes) for _ in range(len(vehicle) - 1)])
+        else:
+            self.route.set_color('red')
+        self.route.set_linewidth(2 if n <= 1000 else 0.8)
+        if len(route):
+            self.start.set_offsets(self._points[route[:1]])
+
+        # Labels go to the start city first, then to the others in route order
+        self._priority = route[:-1] if len(route) > 1 else np.arange(n)
+
+        bounds = (np.nanmin(lons), np.nanmax(lons), np.nanmin(lats), np.nanmax(lats)) if n else None
+        self._updating = True
+        try:
+            if bounds is not None and bounds != self._bounds:
+                self._bounds = bounds
+                x_pad = max((bounds[1] - bounds[0]) * BOUNDS_MARGIN, 0.1)
+                y_pad = max((bounds[3] - bounds[2]) * BOUNDS_MARGIN, 0.1)
+                self.ax.set_xlim(bounds[0] - x_pad, bounds[1] + x_pad)
+                self.ax.set_ylim(bounds[2] - y_pad, bounds[3] + y_pad)
+        finally:
+            self._updating = False
+        self.update_labels()
+
+    def update_labels(self):
+        """Pick the labels to show for the current view"""
+        chosen = self._choose_labels() if self._names else []
+        while len(self._labels) < len(chosen):
+            self._labels.append(self.ax.text(0, 0, '', fontsize=8, ha='right', va='bottom', clip_on=True))
+        for label, i in zip(self._labels, chosen):
+            label.set_text(self._names[i])
+            label.set_position(self._points[i])
+            label.set_visible(True)
+        for label in self._labels[len(chosen):]:
+            label.set_visible(False)
+
+    def _choose_labels(self):
+        """Indices of the cities to label: visible, one per screen cell, in priority order"""
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        candidates = self._priority
+        points = self._points[candidates]
+        inside = (points[:, 0] >= x0) & (points[:, 0] <= x1) & (points[:, 1] >= y0) & (points[:, 1] <= y1)
+        candidates, points = candidates[inside], points[inside]
+        if len(candidates) == 0:
+            return []
+
+        pixels = self.ax.transData.transform(points)
+        scale = self.figure.dpi / 72
+        cells = np.floor(pixels / (np.array(LABEL_CELL_POINTS) * scale)).astype(np.int64)
+        # np.unique keeps the first (highest priority) city of every cell
+        _, first = np.unique(cells, axis=0, return_index=True)
+        first.sort()
+        return candidates[first[:self.max_labels]].tolist()
+
+    def _on_view_changed(self, ax):
+        if not self._updating:
+            self.update_labels()
+
+    def save(self, path, dpi=300):
+        self.figure.savefig(path, dpi=dpi, bbox_inches='tight')
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_SOLVE_CACHE_PATH = "solve_cache.db"
+DEFAULT_MEMORY_ENTRIES = 64  # Solved instances kept in memory
+DEFAULT_MAX_ENTRIES = 10000  # Solved instances kept on disk
+CANONICAL_PRECISION = 6  # Decimals of latitude/longitude that identify an instance, about 0.1 m
+
+
+def canonical_instance(lats, lons, start_city_index, params):
+    """Key a tour instance independently of the order and names of its cities
+
+    The key is a SHA-256 digest of the coordinates rounded to CANONICAL_PRECISION
+    decimals and sorted, the start city's coordinates and the JSON-serializable
+    solver ``params``. Returns ``(key, order)``, where ``order[p]`` is the index of
+    the city at canonical position p.
+    """
+    scale = 10 ** CANONICAL_PRECISION
+    points = np.column_stack((np.round(np.asarray(lats, dtype=np.float64) * scale),
+                              np.round(np.asarray(lons, dtype=np.float64) * scale))).astype(np.int64)
+    order = np.lexsort((points[:, 1], points[:, 0]))
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    digest.update(points[start_city_index].tobytes())
+    digest.update(points[order].tobytes())
+    return digest.digest(), order
+
+
+def to_canonical(tour, order):
+    """A tour of city indices as canonical positions"""
+    position = np.empty(len(order), dtype=np.int32)
+    position[order] = np.arange(len(order), dtype=np.int32)
+    return position[np.asarray(tour, dtype=np.intp)]
+
+
+def from_canonical(positions, order):
+    """A tour of canonical positions as city indices"""
+    return order[positions].tolist()
+
+
+class SolveCache:
+    """Solved tours keyed by canonical instance, in an in-memory LRU and optionally on disk
+
+    A tour is stored as canonical positions (see canonical_instance) with its length
+    and a dict of JSON-serializable stats about it, such as a lower bound.
+    The ``max_memory_entries`` most recently used tours stay in memory; with a
+    ``path`` every tour is also written to a SQLite database that keeps the
+    ``max_entries`` most recently used ones and can be shared between processes.
+    """
+
+    def __init__(self, path=None, max_memory_entries=DEFAULT_MEMORY_ENTRIES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tours ("
+                " key BLOB PRIMARY KEY,"
+                " tour BLOB NOT NULL,"
+                " distance REAL NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " stats TEXT NOT NULL DEFAULT '{}')"
+            )
+            # Databases written before stats were kept get the column, their tours have none
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(tours)")]
+            if "stats" not in columns:
+                self._conn.execute("ALTER TABLE tours ADD COLUMN stats TEXT NOT NULL DEFAULT '{}'")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tours_last_used ON tours (last_used)")
+            self._conn.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def get(self, key):
+        """Return (canonical positions, distance, stats) for a key, or None if it is not cached"""
+        with self._lock:
+            entry = self._memory.pop(key, None)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute("SELECT tour, distance, stats FROM tours WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (np.frombuffer(row[0], dtype="<i4"), row[1], json.loads(row[2]))
+                    self._conn.execute("UPDATE tours SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+        return entry[0], entry[1], dict(entry[2])
+
+    def put(self, key, positions, distance, stats=None):
+        """Store a tour, given as canonical positions, its length and optional stats"""
+        entry = (np.asarray(positions, dtype="<i4"), float(distance), dict(stats or {}))
+        with self._lock:
+            self._memory.pop(key, None)
+            self._remember(key, entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tours (key, tour, distance, last_used, stats) VALUES (?, ?, ?, ?, ?)",
+                    (key, entry[0].tobytes(), entry[1], time.time(), json.dumps(entry[2], sort_keys=True))
+                )
+                self._conn.execute(
+                    "DELETE FROM tours WHERE key IN ("
+                    " SELECT key FROM tours ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._conn.commit()
+
+    def _remember(self, key, entry):
+        """Make an entry the most recently used in memory (lock must be held)"""
+        self._memory[key] = entry
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM tours")
+                self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection, if any"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def open_solve_cache(cache):
+    """Accept a SolveCache, a database path, True (in memory only) or None and return a cache (or None)"""
+    if cache is None or isinstance(cache, SolveCache):
+        return cache
+    if cache is False:
+        return None
+    if cache is True:
+        return SolveCache()
+    if isinstance(cache, (str, os.PathLike)):
+        return SolveCache(cache)
+    raise TypeError(f"Unsupported solve cache: {cache!r}")
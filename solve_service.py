@@ -0,0 +1,440 @@
+"""Long-running local HTTP service that solves tours and answers with JSON
+
+Example:
+    python solve_service.py --port 8765 --workers 4
+    curl -X POST localhost:8765/solve -d '{"cities": ["Mumbai", "Delhi", "Pune", "Jaipur"]}'
+
+Endpoints:
+    POST /solve   {"cities": [...], "solver": "auto", "time_budget": 2.0, "start": 0}
+    GET  /status  request, batch and cache counters
+
+Cities are names (geocoded like the optimizer does) or {"name", "lat", "lon"}
+objects. The geocode cache, the coordinates of every city located so far and the
+distance matrices of recently solved city lists stay in memory between requests,
+so a request costs solver time only. Requests arriving within ``--batch-window``
+seconds of each other are solved as one batch: identical requests are solved once,
+and the others are handed to the worker processes in a single call per worker.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from city_store import CityStore
+from city_tour_optimizer import SOLVERS, CityTourOptimizer
+from decomposition import DEFAULT_CLUSTER_SIZE
+from distance_engine import city_list_hash
+from geocode_cache import DEFAULT_CACHE_PATH, open_geocode_cache
+from geocoding import DEFAULT_RATE_LIMIT
+from instrumentation import Instrumentation, LoggingSink
+from solve_cache import SolveCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_TIME_BUDGET = 2.0  # Seconds of local search per request, unless the request asks for another
+MAX_TIME_BUDGET = 60.0
+DEFAULT_BATCH_WINDOW = 0.01  # Seconds the dispatcher waits for more requests to join a batch
+DEFAULT_MAX_BATCH = 64
+DEFAULT_WARM_MATRICES = 8  # Distance matrices kept by each worker process
+WARM_MATRIX_MAX_CITIES = 5000  # Larger tours are solved without a dense matrix
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+# Worker process state: city list hash -> distance provider, least recently used first,
+# and the tours solved by this worker
+_warm_providers = OrderedDict()
+_warm_limit = DEFAULT_WARM_MATRICES
+_solve_cache = SolveCache()
+
+
+def _init_worker(warm_matrices):
+    global _warm_limit
+    _warm_limit = warm_matrices
+
+
+def _ping():
+    return os.getpid()
+
+
+def solve_jobs(jobs):
+    """Solve a batch of jobs in a worker process, in order"""
+    results = []
+    for job in jobs:
+        try:
+            results.append(_solve_job(job))
+        except Exception as e:
+            results.append({"error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def _solve_job(job):
+    """Solve one located city list, reusing its distance matrix if this worker built it recently"""
+    started = time.perf_counter()
+    optimizer = CityTourOptimizer(geocode_cache=None, solve_cache=_solve_cache,
+                                  instrumentation=Instrumentation(sinks=[]))
+    store = optimizer.city_store
+    for name, lat, lon in zip(job["names"], job["lats"], job["lons"]):
+        store.append(name, (lat, lon))
+
+    warm = False
+    if len(store) <= WARM_MATRIX_MAX_CITIES:
+        provider = _warm_providers.pop(job["hash"], None)
+        if provider is not None:
+            warm = True
+            optimizer.set_distance_provider(provider)
+        else:
+            provider = optimizer.build_distance_provider("dense")
+        _warm_providers[job["hash"]] = provider
+        while len(_warm_providers) > _warm_limit:
+            _warm_providers.popitem(last=False)
+
+    hits = _solve_cache.hits
+    solver = optimizer.solve(job["solver"], time_budget=job["time_budget"], start_city_index=job["start"],
+                             cluster_size=job["cluster_size"])
+    return {
+        "route": [store[i] for i in optimizer.optimized_route],
+        "total_distance_km": round(float(optimizer.total_distance), 3),
+        "solver": solver,
+        "warm_matrix": warm,
+        "cached": _solve_cache.hits > hits,
+        "solve_seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+class SolveService:
+    """Solves tour requests from many clients against state kept warm in memory
+
+    The service process holds the geocode cache and a ``CityStore`` of every city
+    located so far; geocoding runs on a thread, one request at a time so the rate
+    limit holds across clients. Solving runs on ``workers`` single-process pools.
+    A city list always goes to the same worker (chosen by its hash), which keeps
+    the distance matrices of its ``warm_matrices`` most recent city lists.
+    """
+
+    def __init__(self, workers=None, geocode_cache=DEFAULT_CACHE_PATH, geocoder=None,
+                 rate_limit=DEFAULT_RATE_LIMIT, batch_window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH,
+                 warm_matrices=DEFAULT_WARM_MATRICES, cluster_size=DEFAULT_CLUSTER_SIZE):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.geocode_cache = open_geocode_cache(geocode_cache)
+        self.geocoder = geocoder
+        self.rate_limit = rate_limit
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.warm_matrices = warm_matrices
+        self.cluster_size = cluster_size
+        # Coordinates of every city geocoded so far, answered without a cache lookup
+        self.known = CityStore()
+        self.stats = Counter()
+
+        self._geocode_lock = threading.Lock()
+        self._geocoding = {}  # City name -> future of the geocoding call looking it up
+        self._pools = []
+        self._queue = None
+        self._dispatcher = None
+
+    async def start(self):
+        """Start the worker processes and the batch dispatcher"""
+        loop = asyncio.get_running_loop()
+        self._pools = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.warm_matrices,))
+                       for _ in range(self.workers)]
+        # Start every worker now rather than on its first request
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping) for pool in self._pools))
+        self._queue = asyncio.Queue()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for pool in self._pools:
+            pool.shutdown(wait=False)
+        self._pools = []
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Serve HTTP requests until cancelled"""
+        await self.start()
+        try:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print(f"Solve service listening on http://{host}:{port} with {self.workers} workers", flush=True)
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def solve(self, request):
+        """Locate and solve the cities of one request, returning the JSON response as a dict"""
+        started = time.perf_counter()
+        self.stats["requests"] += 1
+        cities, solver, time_budget, start = self._parse_request(request)
+
+        found = {}
+        missing = []
+        for name, coordinates in cities:
+            if coordinates is None and name in self.known:
+                coordinates = self.known.get_coordinates(self.known.index(name))
+            if coordinates is None:
+                missing.append(name)
+            else:
+                found[name] = coordinates
+        if missing:
+            # Names another request is already geocoding are waited for, not geocoded twice
+            new = [name for name in missing if name not in self._geocoding]
+            if new:
+                task = asyncio.get_running_loop().run_in_executor(None, self._geocode, new)
+                task.add_done_callback(lambda task, names=new: self._geocoded(task, names))
+                for name in new:
+                    self._geocoding[name] = task
+            for located in await asyncio.gather(*{self._geocoding[name] for name in missing}):
+                found.update((name, coordinates) for name, coordinates in located.items() if name in missing)
+
+        names = [name for name, _ in cities if name in found]
+        lats = [float(found[name][0]) for name in names]
+        lons = [float(found[name][1]) for name in names]
+        unlocated = [name for name in missing if name not in found]
+        if not names:
+            raise ValueError("none of the cities could be located")
+        if isinstance(start, int):
+            start = cities[start][0]
+        if start not in found:
+            raise ValueError(f"start city {start!r} could not be located")
+
+        job = {
+            "names": names,
+            "lats": lats,
+            "lons": lons,
+            "hash": city_list_hash(names, dict(zip(names, zip(lats, lons)))),
+            "solver": solver,
+            "time_budget": time_budget,
+            "start": names.index(start),
+            "cluster_size": self.cluster_size,
+        }
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future))
+        result, batch_size = await future
+        if "error" in result:
+            raise RuntimeError(result["error"])
+
+        return dict(result, cities=len(names), unlocated=unlocated, batch_size=batch_size,
+                    seconds=round(time.perf_counter() - started, 4))
+
+    def _parse_request(self, request):
+        """Validate a /solve body into ([(name, coordinates or None)], solver, time_budget, start)"""
+        if not isinstance(request, dict):
+            raise ValueError("the request body must be a JSON object")
+        requested = request.get("cities")
+        if not isinstance(requested, list):
+            raise ValueError("'cities' must be a list of names or {name, lat, lon} objects")
+        cities = []
+        seen = set()
+        for city in requested:
+            if isinstance(city, str):
+                name, coordinates = city.strip(), None
+            elif isinstance(city, dict) and isinstance(city.get("name"), str):
+                name = city["name"].strip()
+                try:
+                    coordinates = (float(city["lat"]), float(city["lon"])) if "lat" in city else None
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError(f"invalid coordinates for {name!r}")
+                if coordinates is not None and not (-90 <= coordinates[0] <= 90 and -180 <= coordinates[1] <= 180):
+                    # NaN fails both comparisons and infinity the range, so neither gets through
+                    raise ValueError(f"coordinates of {name!r} must be finite, with |lat| <= 90 and |lon| <= 180")
+            else:
+                raise ValueError(f"invalid city {city!r}, expected a name or a {{name, lat, lon}} object")
+            # Duplicates are skipped like in the CSV loader
+            if name and name not in seen:
+                seen.add(name)
+                cities.append((name, coordinates))
+        if not cities:
+            raise ValueError("'cities' must list at least one city")
+
+        solver = request.get("solver", "auto")
+        if solver not in SOLVERS:
+            raise ValueError(f"unknown solver {solver!r}, expected one of {SOLVERS}")
+        try:
+            time_budget = float(request.get("time_budget", DEFAULT_TIME_BUDGET))
+        except (TypeError, ValueError):
+            raise ValueError("'time_budget' must be a number of seconds")
+        if not (math.isfinite(time_budget) and time_budget >= 0):
+            raise ValueError("'time_budget' must be a finite, non-negative number of seconds")
+        time_budget = min(time_budget, MAX_TIME_BUDGET)
+
+        start = request.get("start", 0)
+        if isinstance(start, int) and not isinstance(start, bool):
+            if not 0 <= start < len(cities):
+                raise ValueError(f"start index {start} out of range")
+        elif not (isinstance(start, str) and start in seen):
+            raise ValueError("'start' must be a city index or one of the requested city names")
+        return cities, solver, time_budget, start
+
+    def _geocode(self, names):
+        """Geocode city names through the shared cache, returning {name: (lat, lon)} for those found"""
+        with self._geocode_lock:
+            optimizer = CityTourOptimizer(geocoder=self.geocoder, geocode_cache=self.geocode_cache,
+                                          instrumentation=Instrumentation(sinks=[LoggingSink(logger)]))
+            for name in names:
+                optimizer.city_store.append(name)
+            optimizer.fetch_coordinates(rate_limit=self.rate_limit)
+            # Keep the geocoder for the next request
+            self.geocoder = optimizer.geocoder
+            self.stats["geocode_calls"] += optimizer.instrumentation.counters["geocode_calls"]
+        return {name: tuple(coordinates) for name, coordinates in optimizer.coordinates.items()}
+
+    def _geocoded(self, task, names):
+        """Remember the coordinates found by a finished geocoding call"""
+        for name in names:
+            self._geocoding.pop(name, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        for name, coordinates in task.result().items():
+            if name not in self.known:
+                self.known.append(name, coordinates)
+
+    async def _dispatch(self):
+        """Collect queued requests into batches and hand them to the workers"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        """Solve identical jobs once and send each worker its share of the batch in one call"""
+        loop = asyncio.get_running_loop()
+        waiting = {}
+        for job, future in batch:
+            key = (job["hash"], job["solver"], job["time_budget"], job["start"])
+            waiting.setdefault(key, (job, []))[1].append(future)
+        self.stats["batches"] += 1
+        self.stats["jobs"] += len(waiting)
+        self.stats["duplicate_requests"] += len(batch) - len(waiting)
+
+        shares = {}
+        for job, futures in waiting.values():
+            worker = int.from_bytes(job["hash"][:8], "big") % self.workers
+            shares.setdefault(worker, []).append((job, futures))
+        for worker, share in shares.items():
+            task = loop.run_in_executor(self._pools[worker], solve_jobs, [job for job, _ in share])
+            task.add_done_callback(lambda task, share=share: self._deliver(task, share, len(batch)))
+
+    def _deliver(self, task, share, batch_size):
+        """Answer the requests waiting on a worker's share of a batch"""
+        try:
+            results = task.result()
+        except Exception as e:
+            results = [{"error": f"{type(e).__name__}: {e}"}] * len(share)
+        for result, (_, futures) in zip(results, share):
+            self.stats["warm_matrix_hits"] += bool(result.get("warm_matrix"))
+            self.stats["solve_cache_hits"] += bool(result.get("cached"))
+            for future in futures:
+                if not future.done():
+                    future.set_result((result, batch_size))
+
+    def status(self):
+        return dict(self.stats, workers=self.workers, known_cities=len(self.known),
+                    queued=self._queue.qsize() if self._queue is not None else 0,
+                    geocode_cache_entries=len(self.geocode_cache) if self.geocode_cache is not None else None)
+
+    async def handle_connection(self, reader, writer):
+        """Answer one HTTP/1.1 request on a connection, then close it"""
+        try:
+            status, body = await self._handle_request(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        payload = json.dumps(body).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _handle_request(self, reader):
+        """Read one request and return (HTTPStatus, JSON body)"""
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if len(request_line) != 3:
+            return HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}
+        method, path, _ = request_line
+        path = path.split("?", 1)[0]
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"}
+        if length > MAX_BODY_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": f"body larger than {MAX_BODY_BYTES} bytes"}
+        body = await reader.readexactly(length) if length > 0 else b""
+
+        if path == "/status":
+            if method != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use GET"}
+            return HTTPStatus.OK, self.status()
+        if path != "/solve":
+            return HTTPStatus.NOT_FOUND, {"error": f"no such endpoint {path}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+
+        try:
+            return HTTPStatus.OK, await self.solve(json.loads(body or b"null"))
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            logger.exception("Solve request failed")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-window", type=float, default=DEFAULT_BATCH_WINDOW,
+                        help="seconds to wait for concurrent requests to join a batch")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--warm-matrices", type=int, default=DEFAULT_WARM_MATRICES,
+                        help="distance matrices kept in memory by each worker")
+    parser.add_argument("--geocode-cache", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE_LIMIT, help="geocoding requests per second")
+    parser.add_argument("--verbose", action="store_true", help="log every optimizer message")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+    service = SolveService(workers=args.workers, geocode_cache=args.geocode_cache, rate_limit=args.rate_limit,
+                           batch_window=args.batch_window, max_batch=args.max_batch,
+                           warm_matrices=args.warm_matrices)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
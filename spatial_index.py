@@ -0,0 +1,170 @@
+import numpy as np
+
+from distance_engine import EARTH_RADIUS_KM
+
+LEAF_SIZE = 16  # Points per leaf bucket
+
+
+def unit_vectors(lats, lons):
+    """Convert latitude/longitude arrays (decimal degrees) to 3D points on the unit sphere"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord):
+    """Convert a straight-line distance between unit vectors into a great circle distance (km)"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+class UnitSphereKDTree:
+    """KD-tree over cities as unit vectors, with deletion
+
+    The chord between two unit vectors grows monotonically with the great circle
+    distance, so a Euclidean nearest neighbor search on the sphere gives exactly
+    the nearest city by haversine distance. Deleted points are skipped and whole
+    subtrees are pruned once all their points are gone.
+    """
+
+    def __init__(self, lats, lons, leaf_size=LEAF_SIZE):
+        self.points = unit_vectors(lats, lons)
+        self.n = len(self.points)
+        self.leaf_size = leaf_size
+        self._coords = self.points.tolist()
+
+        # Flat node arrays, node 0 is the root
+        self._split_dim = []
+        self._split_value = []
+        self._children = []
+        self._parent = []
+        self._alive = []
+        self._leaf_points = []
+        self._leaf_of = [0] * self.n
+        self._deleted = [False] * self.n
+
+        if self.n:
+            self._build(np.arange(self.n), -1)
+
+    def __len__(self):
+        return self._alive[0] if self.n else 0
+
+    def _build(self, indices, parent):
+        """Build the subtree for ``indices`` and return its node id"""
+        node = len(self._alive)
+        self._parent.append(parent)
+        self._alive.append(len(indices))
+
+        if len(indices) <= self.leaf_size:
+            self._split_dim.append(-1)
+            self._split_value.append(0.0)
+            self._children.append(None)
+            self._leaf_points.append(indices.tolist())
+            for i in indices.tolist():
+                self._leaf_of[i] = node
+            return node
+
+        pts = self.points[indices]
+        dim = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        mid = len(indices) // 2
+        order = np.argpartition(pts[:, dim], mid)
+        split_value = float(pts[order[mid], dim])
+
+        self._split_dim.append(dim)
+        self._split_value.append(split_value)
+        self._children.append(None)
+        self._leaf_points.append(None)
+        left = self._build(indices[order[:mid]], node)
+        right = self._build(indices[order[mid:]], node)
+        self._children[node] = (left, right)
+        return node
+
+    def remove(self, i):
+        """Delete point ``i`` from the index"""
+        if self._deleted[i]:
+            return
+        self._deleted[i] = True
+        node = self._leaf_of[i]
+        while node != -1:
+            self._alive[node] -= 1
+            node = self._parent[node]
+
+    def nearest(self, i, exclude_self=True):
+        """Return (index, chord distance) of the nearest remaining point to point ``i``
+
+        Returns (None, inf) when no other point remains.
+        """
+        return self.nearest_to_point(self._coords[i], skip=i if exclude_self else None)
+
+    def nearest_to_point(self, point, skip=None):
+        """Return (index, chord distance) of the nearest remaining point to a unit vector"""
+        if not self.n or self._alive[0] == 0:
+            return None, float("inf")
+
+        x, y, z = point
+        best, best_sq = None, float("inf")
+        coords, deleted = self._coords, self._deleted
+        stack = [(0, 0.0)]
+
+        while stack:
+            node, bound_sq = stack.pop()
+            if bound_sq >= best_sq or self._alive[node] == 0:
+                continue
+
+            points = self._leaf_points[node]
+            if points is not None:
+                for j in points:
+                    if deleted[j] or j == skip:
+                        continue
+                    px, py, pz = coords[j]
+                    d_sq = (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                    if d_sq < best_sq:
+                        best, best_sq = j, d_sq
+                continue
+
+            dim = self._split_dim[node]
+            diff = point[dim] - self._split_value[node]
+            left, right = self._children[node]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Far side pushed first so the near side is searched first
+            stack.append((far, max(bound_sq, diff * diff)))
+            stack.append((near, bound_sq))
+
+        return best, best_sq ** 0.5
+
+    def query_k(self, i, k):
+        """Return up to ``k`` nearest remaining points to point ``i`` (excluding itself), nearest first"""
+        if k <= 0 or not self.n or self._alive[0] == 0:
+            return []
+
+        x, y, z = point = self._coords[i]
+        best = []  # Sorted list of (d_sq, index), at most k long
+        coords, deleted = self._coords, self._deleted
+        stack = [(0, 0.0)]
+
+        while stack:
+            node, bound_sq = stack.pop()
+            if self._alive[node] == 0 or (len(best) == k and bound_sq >= best[-1][0]):
+                continue
+
+            points = self._leaf_points[node]
+            if points is not None:
+                for j in points:
+                    if deleted[j] or j == i:
+                        continue
+                    px, py, pz = coords[j]
+                    d_sq = (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                    if len(best) < k or d_sq < best[-1][0]:
+                        best.append((d_sq, j))
+                        best.sort()
+                        del best[k:]
+                continue
+
+            dim = self._split_dim[node]
+            diff = point[dim] - self._split_value[node]
+            left, right = self._children[node]
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, max(bound_sq, diff * diff)))
+            stack.append((near, bound_sq))
+
+        return [j for _, j in best]
@@ -0,0 +1,38 @@
+import json
+import os
+
+import batch_cli
+
+
+def write_tour(path, cities):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write("name,lat,lon\n")
+        for name, lat, lon in cities:
+            file.write(f"{name},{lat},{lon}\n")
+
+
+def test_output_names_keep_directories_of_same_named_inputs(tmp_path):
+    a, b = str(tmp_path / "a" / "t1.csv"), str(tmp_path / "b" / "t1.csv")
+    assert batch_cli.output_names([a, b]) == {a: os.path.join("a", "t1"), b: os.path.join("b", "t1")}
+    single = str(tmp_path / "t2.csv")
+    assert batch_cli.output_names([single]) == {single: "t2"}
+
+
+def test_same_named_inputs_write_separate_outputs(tmp_path):
+    a, b = str(tmp_path / "a" / "t1.csv"), str(tmp_path / "b" / "t1.csv")
+    write_tour(a, [("A1", 10.0, 70.0), ("A2", 11.0, 71.0), ("A3", 12.0, 70.5)])
+    write_tour(b, [("B1", 20.0, 80.0), ("B2", 21.0, 81.0), ("B3", 22.0, 80.5), ("B4", 20.5, 81.5)])
+    output_dir = tmp_path / "results"
+
+    status = batch_cli.main([a, b, "--output-dir", str(output_dir), "--workers", "1", "--time-budget", "0.1",
+                             "--name-column", "name", "--lat-column", "lat", "--lon-column", "lon",
+                             "--geocode-cache", str(tmp_path / "geocode.db")])
+
+    assert status == 0
+    with open(output_dir / "a" / "t1_route.json") as file:
+        first = json.load(file)
+    with open(output_dir / "b" / "t1_route.json") as file:
+        second = json.load(file)
+    assert first["source"] == a and len(first["route"]) == 4
+    assert second["source"] == b and len(second["route"]) == 5
@@ -0,0 +1,30 @@
+import numpy as np
+
+from city_tour_optimizer import CityTourOptimizer
+from distance_engine import haversine_matrix
+from distance_providers import DenseDistanceProvider
+
+
+def optimizer_with_cities(n, seed=0):
+    rng = np.random.default_rng(seed)
+    optimizer = CityTourOptimizer(geocode_cache=None, solve_cache=None)
+    optimizer.cities = [f"City {i}" for i in range(n)]
+    optimizer.coordinates = {name: (rng.uniform(10, 30), rng.uniform(70, 90)) for name in optimizer.cities}
+    return optimizer
+
+
+def tour_length(matrix, route):
+    return float(sum(matrix[a, b] for a, b in zip(route, route[1:])))
+
+
+def test_clustered_tour_is_measured_by_the_distance_provider():
+    optimizer = optimizer_with_cities(60)
+    lats, lons = optimizer.city_store.lats, optimizer.city_store.lons
+    # Stands in for road distances: longer than the great-circle ones, and not by a constant factor
+    matrix = haversine_matrix(lats, lons) * (1.2 + np.add.outer(lats, lats) / 100)
+    optimizer.set_distance_provider(DenseDistanceProvider(lats, lons, matrix=matrix))
+
+    optimizer.solve_clustered(cluster_size=20, max_workers=1)
+
+    assert sorted(optimizer.optimized_route[:-1]) == list(range(60))
+    assert np.isclose(optimizer.total_distance, tour_length(matrix, optimizer.optimized_route))
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from distance_providers import KNearestDistanceProvider, _nearest_in_row
+
+
+def assert_exact_neighbors(provider):
+    for i in range(len(provider)):
+        assert provider.neighbors[i] == _nearest_in_row(provider._haversine_row(i), i, provider.k)
+        for j in provider.neighbors[i]:
+            assert i in provider._holders[j]
+
+
+@pytest.mark.parametrize("k, n", [(4, 300), (16, 5)])
+def test_k_nearest_keeps_requested_k_through_edits(k, n):
+    rng = np.random.default_rng(0)
+    provider = KNearestDistanceProvider(rng.uniform(10, 20, n), rng.uniform(70, 80, n), k=k)
+    for _ in range(15):
+        provider.add_point(rng.uniform(10, 20), rng.uniform(70, 80))
+        assert provider.k == k
+    assert_exact_neighbors(provider)
+    for _ in range(10):
+        provider.remove_point(int(rng.integers(len(provider))))
+        assert provider.k == k
+    assert_exact_neighbors(provider)
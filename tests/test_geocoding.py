@@ -0,0 +1,34 @@
+from geocoding import geocode_all, geocode_one
+
+
+class PlainGeocoder:
+    """Follows the documented geocode(query) contract, without a timeout parameter"""
+
+    class Location:
+        latitude, longitude = 28.6, 77.2
+
+    def geocode(self, query):
+        return self.Location()
+
+
+class TimeoutGeocoder:
+    def __init__(self):
+        self.timeouts = []
+
+    def geocode(self, query, timeout=None):
+        self.timeouts.append(timeout)
+        return None
+
+
+def test_plain_geocoder_is_called_without_timeout():
+    result = geocode_one(PlainGeocoder(), "Delhi, India")
+    assert result.error is None and result.coordinates == (28.6, 77.2)
+    results = geocode_all(PlainGeocoder(), ["Delhi, India", "Agra, India"], rate_limit=None)
+    assert [r.coordinates for r in results] == [(28.6, 77.2)] * 2
+
+
+def test_explicit_timeout_is_passed_on():
+    geocoder = TimeoutGeocoder()
+    geocode_one(geocoder, "Delhi, India", timeout=5)
+    geocode_one(geocoder, "Delhi, India")
+    assert geocoder.timeouts == [5, None]
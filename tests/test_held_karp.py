@@ -0,0 +1,36 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from held_karp import held_karp
+
+
+def random_matrix(n, seed):
+    points = np.random.default_rng(seed).uniform(0, 100, (n, 2))
+    return np.sqrt(((points[:, None] - points[None]) ** 2).sum(axis=2))
+
+
+def closed_length(matrix, tour):
+    return float(sum(matrix[tour[i - 1], tour[i]] for i in range(len(tour))))
+
+
+def brute_force(matrix, start):
+    others = [c for c in range(len(matrix)) if c != start]
+    return min(closed_length(matrix, [start, *rest]) for rest in itertools.permutations(others))
+
+
+@pytest.mark.parametrize("n, seed, start", [(4, 0, 0), (7, 1, 3), (8, 2, 0), (8, 3, 7)])
+def test_held_karp_matches_brute_force(n, seed, start):
+    matrix = random_matrix(n, seed)
+    tour, length = held_karp(matrix, start)
+    assert tour[0] == start
+    assert sorted(tour) == list(range(n))
+    assert np.isclose(length, closed_length(matrix, tour))
+    assert np.isclose(length, brute_force(matrix, start))
+
+
+def test_held_karp_handles_tiny_instances():
+    assert held_karp(np.zeros((1, 1)))[0] == [0]
+    tour, length = held_karp(np.array([[0.0, 3.0], [3.0, 0.0]]), start=1)
+    assert tour == [1, 0] and length == 6.0
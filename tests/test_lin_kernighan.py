@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+
+from held_karp import held_karp, held_karp_bound
+from lin_kernighan import SegmentTour, lin_kernighan, quadrant_candidates
+from local_search import nearest_neighbor_tour, tour_length
+
+
+def random_instance(n, seed):
+    rng = np.random.default_rng(seed)
+    lats, lons = rng.uniform(10, 30, n), rng.uniform(70, 90, n)
+    points = np.column_stack((lats, lons))
+    matrix = np.sqrt(((points[:, None] - points[None]) ** 2).sum(axis=2))
+    return lats, lons, matrix
+
+
+def cycle_edges(tour):
+    return {frozenset((tour[i - 1], tour[i])) for i in range(len(tour))}
+
+
+def test_segment_tour_reversals_match_a_plain_list():
+    n = 100
+    rng = random.Random(0)
+    tour = list(range(n))
+    rng.shuffle(tour)
+    segments = SegmentTour(tour)
+    for _ in range(500):
+        # The tour's direction may flip, so the plain list follows the segment tour's order
+        tour = segments.to_list()
+        assert all(segments.succ(tour[k - 1]) == tour[k] and segments.pred(tour[k]) == tour[k - 1]
+                   for k in range(n))
+        i, j = rng.randrange(n), rng.randrange(n)
+        first, last = tour[i], tour[j]
+        path = [tour[(i + k) % n] for k in range((j - i) % n + 1)]
+        for k, city in enumerate(reversed(path)):
+            tour[(i + k) % n] = city
+        segments.reverse(first, last)
+        assert cycle_edges(segments.to_list()) == cycle_edges(tour)
+
+
+def test_quadrant_candidates_come_from_the_pool():
+    lats, lons, matrix = random_instance(80, 1)
+    pool = np.argsort(matrix, axis=1)[:, 1:25]
+    candidates = quadrant_candidates(lats, lons, pool, k=8)
+    for row, chosen in zip(pool.tolist(), candidates):
+        assert len(chosen) == 8
+        assert set(chosen) <= set(row)
+        assert chosen == [c for c in row if c in chosen]
+
+
+@pytest.mark.parametrize("seed, time_budget", [(0, None), (1, None), (2, 0.2)])
+def test_lin_kernighan_keeps_a_permutation_and_never_lengthens(seed, time_budget):
+    n = 150
+    lats, lons, matrix = random_instance(n, seed)
+    candidates = quadrant_candidates(lats, lons, np.argsort(matrix, axis=1)[:, 1:25], k=8)
+    for tour in (nearest_neighbor_tour(lambda i: matrix[i], n)[0], random.Random(seed).sample(range(n), n)):
+        improved, moves, kicks = lin_kernighan(tour, matrix.item, candidates, time_budget=time_budget, seed=seed)
+        assert sorted(improved) == list(range(n))
+        assert tour_length(improved, matrix.item) <= tour_length(tour, matrix.item) + 1e-9
+        assert moves > 0
+        assert time_budget is not None or kicks == 0
+
+
+def test_held_karp_bound_is_below_the_optimum():
+    for seed in range(3):
+        _, _, matrix = random_instance(10, seed)
+        _, optimum = held_karp(matrix)
+        bound = held_karp_bound(matrix, optimum * 1.1)
+        assert 0.9 * optimum <= bound <= optimum + 1e-6
@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+from local_search import _ArrayTour, _try_or_opt, nearest_neighbor_tour, tour_length, two_opt_or_opt
+
+
+def line_dist(a, b):
+    return float(abs(a - b))
+
+
+def sorted_neighbors(n, dist):
+    return [sorted((c for c in range(n) if c != a), key=lambda c: dist(a, c)) for a in range(n)]
+
+
+def cycle_edges(tour):
+    return {frozenset((tour[i - 1], tour[i])) for i in range(len(tour))}
+
+
+@pytest.mark.parametrize("tour, expected", [
+    # City 2 belongs just after its old successor 1
+    ([0, 2, 1, 3, 4, 5, 6, 7], [0, 1, 2, 3, 4, 5, 6, 7]),
+    # City 2 belongs just before its old predecessor 3
+    ([0, 1, 3, 2, 4, 5, 6, 7], [0, 1, 2, 3, 4, 5, 6, 7]),
+])
+def test_or_opt_moves_a_city_next_to_its_old_neighbor(tour, expected):
+    n = len(tour)
+    t = _ArrayTour(tour)
+    assert _try_or_opt(t, 2, line_dist, sorted_neighbors(n, line_dist), lambda *cities: None)
+    assert sorted(t.tour) == list(range(n))
+    assert cycle_edges(t.tour) == cycle_edges(expected)
+    assert tour_length(t.tour, line_dist) == tour_length(tour, line_dist) - 2
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_two_opt_or_opt_keeps_a_permutation_and_never_lengthens(seed):
+    rng = np.random.default_rng(seed)
+    n = 120
+    points = rng.uniform(0, 100, (n, 2))
+    matrix = np.sqrt(((points[:, None] - points[None]) ** 2).sum(axis=2))
+    dist = matrix.item
+    neighbors = [np.argsort(matrix[a])[1:9].tolist() for a in range(n)]
+
+    tour = list(range(n))
+    random.Random(seed).shuffle(tour)
+    improved, moves = two_opt_or_opt(tour, dist, neighbors)
+    assert sorted(improved) == list(range(n))
+    assert moves > 0
+    assert tour_length(improved, dist) < tour_length(tour, dist)
+
+    nn_tour, nn_length = nearest_neighbor_tour(lambda i: matrix[i], n)
+    assert np.isclose(nn_length, tour_length(nn_tour, dist))
+    improved, _ = two_opt_or_opt(nn_tour, dist, neighbors)
+    assert sorted(improved) == list(range(n))
+    assert tour_length(improved, dist) <= nn_length + 1e-9
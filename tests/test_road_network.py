@@ -0,0 +1,23 @@
+import numpy as np
+
+from road_network import RoadGraph, road_distances_from, shortest_path_table
+
+
+def line_graph():
+    # Four nodes on a line, 1 km apart in graph length
+    return RoadGraph.from_edges([0.0, 0.0, 0.0, 0.0], [0.0, 0.01, 0.02, 0.03], [0, 1, 2], [1, 2, 3], [1.0, 1.0, 1.0])
+
+
+def test_adjacency_lists_are_built_once_per_graph():
+    graph = line_graph()
+    assert graph.adjacency() is graph.adjacency()
+    assert shortest_path_table(graph, [0], [1, 3], max_workers=1).tolist() == [[1.0, 3.0]]
+
+
+def test_road_distances_from_reuses_adjacency():
+    graph = line_graph()
+    adjacency = graph.adjacency()
+    row, node, snap = road_distances_from(graph, 0.0, 0.0, [2, 3], np.zeros(2))
+    assert node == 0 and snap == 0.0
+    assert row.tolist() == [2.0, 3.0]
+    assert graph.adjacency() is adjacency
@@ -0,0 +1,62 @@
+import sqlite3
+
+import numpy as np
+
+from city_tour_optimizer import CityTourOptimizer
+from solve_cache import SolveCache, canonical_instance, from_canonical, to_canonical
+
+
+def random_instance(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(10, 30, n), rng.uniform(70, 90, n)
+
+
+def test_canonical_key_ignores_city_order():
+    lats, lons = random_instance(30)
+    key, order = canonical_instance(lats, lons, 4, {"solver": "lk"})
+    permutation = np.random.default_rng(1).permutation(30)
+    start = int(np.flatnonzero(permutation == 4)[0])
+    shuffled_key, shuffled_order = canonical_instance(lats[permutation], lons[permutation], start, {"solver": "lk"})
+    assert shuffled_key == key
+
+    # A tour stored in one order maps back to the same cities in the other
+    tour = list(range(30))
+    mapped = from_canonical(to_canonical(tour, order), shuffled_order)
+    assert [int(permutation[i]) for i in mapped] == tour
+
+    assert canonical_instance(lats, lons, 5, {"solver": "lk"})[0] != key
+    assert canonical_instance(lats, lons, 4, {"solver": "exact"})[0] != key
+
+
+def test_cache_hit_restores_lower_bound_and_gaps(tmp_path):
+    lats, lons = random_instance(9)
+    cache = SolveCache(str(tmp_path / "solve_cache.db"))
+    results = []
+    for _ in range(2):
+        optimizer = CityTourOptimizer(geocode_cache=None, solve_cache=cache)
+        optimizer.cities = [f"City {i}" for i in range(9)]
+        optimizer.coordinates = {f"City {i}": (lats[i], lons[i]) for i in range(9)}
+        optimizer.solve("exact")
+        results.append((optimizer.total_distance, optimizer.lower_bound, optimizer.lower_bound_gap,
+                        optimizer.heuristic_gap))
+    assert cache.hits == 1
+    assert results[0] == results[1]
+    assert results[0][2] == 0.0 and results[0][3] is not None
+
+    # Stats also survive the on-disk copy
+    reopened = SolveCache(str(tmp_path / "solve_cache.db"))
+    key = next(iter(cache._memory))
+    assert reopened.get(key)[2] == {"heuristic_gap": results[0][3], "lower_bound": results[0][1],
+                                    "lower_bound_gap": 0.0}
+
+
+def test_databases_without_stats_column_are_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tours (key BLOB PRIMARY KEY, tour BLOB NOT NULL, distance REAL NOT NULL,"
+                 " last_used REAL NOT NULL)")
+    conn.execute("INSERT INTO tours VALUES (?, ?, ?, ?)", (b"k", np.arange(3, dtype="<i4").tobytes(), 12.5, 0.0))
+    conn.commit()
+    conn.close()
+    positions, distance, stats = SolveCache(path).get(b"k")
+    assert positions.tolist() == [0, 1, 2] and distance == 12.5 and stats == {}
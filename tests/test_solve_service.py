@@ -0,0 +1,65 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from solve_service import MAX_TIME_BUDGET, SolveService
+
+
+def post_solve(service, body):
+    async def run():
+        reader = asyncio.StreamReader()
+        data = body.encode("utf-8")
+        reader.feed_data(b"POST /solve HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(data) + data)
+        reader.feed_eof()
+        return await service._handle_request(reader)
+    return asyncio.run(run())
+
+
+def cities(lat=28.6, lon=77.2):
+    return [{"name": "Delhi", "lat": lat, "lon": lon}, {"name": "Agra", "lat": 27.2, "lon": 78.0}]
+
+
+@pytest.mark.parametrize("time_budget", ["-1", "NaN", "Infinity", "-Infinity", "\"nan\""])
+def test_invalid_time_budget_is_rejected(time_budget):
+    body = '{"cities": %s, "time_budget": %s}' % (json.dumps(cities()), time_budget)
+    status, response = post_solve(SolveService(geocode_cache=None), body)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "time_budget" in response["error"]
+
+
+@pytest.mark.parametrize("lat, lon", [("NaN", "77.2"), ("28.6", "Infinity"), ("-Infinity", "77.2"),
+                                      ("\"nan\"", "77.2"), ("91", "77.2"), ("28.6", "-181")])
+def test_invalid_coordinates_are_rejected(lat, lon):
+    body = '{"cities": [{"name": "Delhi", "lat": %s, "lon": %s}, "Agra"]}' % (lat, lon)
+    status, response = post_solve(SolveService(geocode_cache=None), body)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "Delhi" in response["error"]
+
+
+def test_valid_request_is_parsed():
+    service = SolveService(geocode_cache=None)
+    parsed = service._parse_request({"cities": cities(), "time_budget": 0, "start": "Agra"})
+    assert parsed == ([("Delhi", (28.6, 77.2)), ("Agra", (27.2, 78.0))], "auto", 0.0, "Agra")
+    assert service._parse_request({"cities": cities(), "time_budget": 1e9})[2] == MAX_TIME_BUDGET
+
+
+@pytest.mark.parametrize("value", ['"Delhi"', "42", '{"name": "Delhi"}', "null", "true"])
+def test_cities_must_be_a_list(value):
+    status, response = post_solve(SolveService(geocode_cache=None), '{"cities": %s}' % value)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "'cities' must be a list" in response["error"]
+
+
+@pytest.mark.parametrize("city", ["42", "null", '["Delhi"]', '{"lat": 28.6, "lon": 77.2}'])
+def test_cities_must_be_names_or_objects(city):
+    status, response = post_solve(SolveService(geocode_cache=None), '{"cities": ["Agra", %s]}' % city)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "invalid city" in response["error"]
+
+
+def test_missing_or_empty_cities_are_rejected():
+    for body in ("{}", '{"cities": []}'):
+        status, response = post_solve(SolveService(geocode_cache=None), body)
+        assert status == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from spatial_index import UnitSphereKDTree, chord_to_km, unit_vectors
+
+
+def brute_force_k(points, alive, i, k):
+    d_sq = ((points - points[i]) ** 2).sum(axis=1)
+    candidates = [j for j in np.argsort(d_sq, kind="stable").tolist() if j != i and alive[j]]
+    return candidates[:k]
+
+
+@pytest.mark.parametrize("k", [1, 5, 40, 500])
+def test_query_k_matches_brute_force(k):
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-60, 60, 300), rng.uniform(-180, 180, 300)
+    tree = UnitSphereKDTree(lats, lons, leaf_size=8)
+    points = unit_vectors(lats, lons)
+    alive = np.ones(300, dtype=bool)
+    for j in rng.choice(300, 60, replace=False).tolist():
+        tree.remove(j)
+        alive[j] = False
+
+    for i in range(0, 300, 7):
+        assert tree.query_k(i, k) == brute_force_k(points, alive, i, k)
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(1)
+    lats, lons = rng.uniform(10, 30, 200), rng.uniform(70, 90, 200)
+    tree = UnitSphereKDTree(lats, lons)
+    points = unit_vectors(lats, lons)
+    for i in range(200):
+        j, chord = tree.nearest(i)
+        assert [j] == brute_force_k(points, np.ones(200, dtype=bool), i, 1)
+        assert np.isclose(chord_to_km(chord), chord_to_km(np.linalg.norm(points[i] - points[j])))
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_query_k_without_neighbors_requested_is_empty(k):
+    tree = UnitSphereKDTree([10.0, 11.0, 12.0], [70.0, 71.0, 72.0])
+    assert tree.query_k(0, k) == []
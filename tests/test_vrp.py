@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from vrp import VehicleRouter
+
+MINUTES_PER_KM = 1.0
+
+
+def random_problem(n, seed, window_width):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 100, (n, 2))
+    matrix = np.sqrt(((points[:, None] - points[None]) ** 2).sum(axis=2))
+    earliest = rng.uniform(0, 300, n)
+    earliest[0] = 0.0
+    latest = earliest + window_width
+    latest[0] = 600.0  # The depot's window is the whole shift
+    return {
+        "dist": matrix.item,
+        "n": n,
+        "depot": 0,
+        "demand": rng.integers(1, 5, n).astype(float).tolist(),
+        "capacity": 12.0,
+        "earliest": earliest.tolist(),
+        "latest": latest.tolist(),
+        "service": rng.uniform(0, 10, n).tolist(),
+        "minutes_per_km": MINUTES_PER_KM,
+        "neighbors": np.argsort(matrix, axis=1)[:, 1:16].tolist(),
+    }
+
+
+def check_route(problem, stops):
+    """Simulate a route from and back to the depot, returning its length"""
+    dist, depot = problem["dist"], problem["depot"]
+    assert sum(problem["demand"][c] for c in stops) <= problem["capacity"]
+    time_now, previous, length = problem["earliest"][depot], depot, 0.0
+    for c in stops:
+        length += dist(previous, c)
+        service = problem["service"][previous] if previous != depot else 0.0
+        time_now = max(time_now + service + dist(previous, c) * MINUTES_PER_KM, problem["earliest"][c])
+        assert time_now <= problem["latest"][c] + 1e-9
+        previous = c
+    length += dist(previous, depot)
+    assert time_now + problem["service"][previous] + dist(previous, depot) * MINUTES_PER_KM \
+        <= problem["latest"][depot] + 1e-9
+    return length
+
+
+@pytest.mark.parametrize("seed, window_width", [(0, 60.0), (1, 120.0), (2, 600.0)])
+def test_routes_respect_capacity_and_time_windows(seed, window_width):
+    problem = random_problem(60, seed, window_width)
+    router = VehicleRouter(**problem)
+    customers = list(range(1, 60))
+    router.construct(customers)
+    constructed = sum(route.length for route in router.routes)
+    router.improve()
+
+    served = [c for route in router.routes for c in route.stops]
+    assert sorted(served + router.unserved) == customers
+    for route in router.routes:
+        assert route.stops
+        assert np.isclose(check_route(problem, route.stops), route.length)
+    assert sum(route.length for route in router.routes) <= constructed + 1e-9
+
+
+def test_limit_vehicles_keeps_routes_feasible():
+    problem = random_problem(40, 3, 600.0)
+    router = VehicleRouter(**problem)
+    router.construct(list(range(1, 40)))
+    router.limit_vehicles(3)
+    assert len(router.routes) <= 3
+    served = [c for route in router.routes for c in route.stops]
+    assert sorted(served + router.unserved) == list(range(1, 40))
+    for route in router.routes:
+        check_route(problem, route.stops)
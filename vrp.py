@@ -0,0 +1,266 @@
+import time
+
+from local_search import EPSILON
+
+DEFAULT_SPEED_KMH = 50.0  # Average driving speed, turns km into minutes of travel
+DEFAULT_SAVINGS_NEIGHBORS = 20  # Savings are only computed between a city and its nearest cities
+
+# Route colors by vehicle, cycled when there are more vehicles (matplotlib's tab10)
+VEHICLE_COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+                  "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf")
+
+
+class VehicleRoute:
+    """One vehicle's stops with the schedule data that makes feasibility checks O(1)
+
+    ``stops`` lists the customers in visiting order, without the depot. ``begin[p]``
+    is the earliest time service can begin at stop p (waiting if the vehicle is
+    early) and ``latest[p]`` the latest service start at p that still lets every
+    later stop, and the return to the depot, keep its time window.
+    """
+
+    __slots__ = ("stops", "begin", "latest", "load", "length")
+
+    def __init__(self, stops):
+        self.stops = list(stops)
+        self.begin = []
+        self.latest = []
+        self.load = 0.0
+        self.length = 0.0
+
+    def __len__(self):
+        return len(self.stops)
+
+
+class VehicleRouter:
+    """Capacitated vehicle routing with time windows over any distance function
+
+    Routes start and end at ``depot``. Every customer c has a ``demand[c]``, a
+    ``service[c]`` time in minutes and a time window ``earliest[c]``-``latest[c]``
+    (minutes after the depot opens) in which service must begin; the depot's window
+    bounds when vehicles leave and return. Travel takes ``minutes_per_km`` per km.
+
+    Routes are built with the Clarke-Wright savings algorithm and improved with
+    inter-route relocate and exchange moves. Each route keeps its forward start
+    times and backward latest start times, so checking whether a city can be
+    inserted, removed or swapped only looks at the two neighboring stops; only
+    the routes changed by an applied move are rescanned.
+    """
+
+    def __init__(self, dist, n, depot, demand, capacity, earliest, latest, service, minutes_per_km, neighbors):
+        self.dist = dist
+        self.n = n
+        self.depot = depot
+        self.demand = demand
+        self.capacity = capacity
+        self.earliest = earliest
+        self.latest = latest
+        self.service = service
+        self.minutes_per_km = minutes_per_km
+        self.neighbors = neighbors
+        self.routes = []
+        self.route_of = [None] * n
+        self.position = [0] * n
+        self.unserved = []
+
+    def travel(self, i, j):
+        return self.dist(i, j) * self.minutes_per_km
+
+    def update(self, route):
+        """Recompute a route's schedule, load, length and the position of its stops"""
+        stops = route.stops
+        depot = self.depot
+        begin = [0.0] * len(stops)
+        time_now = self.earliest[depot]
+        previous = depot
+        length = load = 0.0
+        for p, c in enumerate(stops):
+            leg = self.dist(previous, c)
+            length += leg
+            load += self.demand[c]
+            time_now = max(time_now + self.service[previous] * (p > 0) + leg * self.minutes_per_km, self.earliest[c])
+            begin[p] = time_now
+            self.route_of[c] = route
+            self.position[c] = p
+            previous = c
+        route.length = length + self.dist(previous, depot)
+
+        latest = [0.0] * len(stops)
+        bound = self.latest[depot]
+        following = depot
+        for p in range(len(stops) - 1, -1, -1):
+            c = stops[p]
+            bound = min(self.latest[c], bound - self.travel(c, following) - self.service[c])
+            latest[p] = bound
+            following = c
+        route.begin, route.latest, route.load = begin, latest, load
+
+    def _node(self, route, p):
+        return route.stops[p] if 0 <= p < len(route.stops) else self.depot
+
+    def _departure(self, route, p):
+        """Time the vehicle leaves position p (-1 is the depot at the start)"""
+        if p < 0:
+            return self.earliest[self.depot]
+        return route.begin[p] + self.service[route.stops[p]]
+
+    def _latest_arrival(self, route, p):
+        """Latest arrival at position p that keeps the rest of the route feasible"""
+        return route.latest[p] if p < len(route.stops) else self.latest[self.depot]
+
+    def _fits_between(self, route, before, after, c):
+        """Whether c can be served between positions ``before`` and ``after`` of a route"""
+        start = max(self._departure(route, before) + self.travel(self._node(route, before), c), self.earliest[c])
+        return (start <= self.latest[c] and
+                start + self.service[c] + self.travel(c, self._node(route, after)) <= self._latest_arrival(route, after))
+
+    def _bridges(self, route, before, after):
+        """Whether the stops at ``before`` and ``after`` can follow each other directly"""
+        arrival = self._departure(route, before) + self.travel(self._node(route, before), self._node(route, after))
+        return arrival <= self._latest_arrival(route, after)
+
+    def _feasible_alone(self, c):
+        route = VehicleRoute([])
+        return self.demand[c] <= self.capacity and self._fits_between(route, -1, 0, c)
+
+    def construct(self, customers):
+        """Clarke-Wright savings: start with one route per customer, then merge route ends"""
+        depot = self.depot
+        self.routes = []
+        for c in customers:
+            if self._feasible_alone(c):
+                route = VehicleRoute([c])
+                self.update(route)
+                self.routes.append(route)
+            else:
+                self.unserved.append(c)
+
+        savings = []
+        for i in customers:
+            if self.route_of[i] is None:
+                continue
+            d_i = self.dist(i, depot)
+            for j in self.neighbors[i]:
+                if j != depot and j != i and self.route_of[j] is not None:
+                    saving = d_i + self.dist(depot, j) - self.dist(i, j)
+                    if saving > EPSILON:
+                        savings.append((saving, i, j))
+        savings.sort(reverse=True)
+
+        for _, i, j in savings:
+            first, second = self.route_of[i], self.route_of[j]
+            # i must end one route and j start another, and the merged route must fit
+            if (first is second or first.stops[-1] != i or second.stops[0] != j
+                    or first.load + second.load > self.capacity):
+                continue
+            arrival = self._departure(first, len(first) - 1) + self.travel(i, j)
+            if max(arrival, self.earliest[j]) > second.latest[0]:
+                continue
+            first.stops.extend(second.stops)
+            self.update(first)
+            self.routes.remove(second)
+
+    def limit_vehicles(self, num_vehicles):
+        """Dissolve the smallest routes into the others until at most ``num_vehicles`` remain
+
+        Customers that fit nowhere else become unserved.
+        """
+        while len(self.routes) > num_vehicles:
+            route = min(self.routes, key=len)
+            self.routes.remove(route)
+            for c in route.stops:
+                self.route_of[c] = None
+                if not self._insert_cheapest(c):
+                    self.unserved.append(c)
+
+    def _insert_cheapest(self, c):
+        best = None
+        for route in self.routes:
+            if route.load + self.demand[c] > self.capacity:
+                continue
+            for p in range(len(route) + 1):
+                a, b = self._node(route, p - 1), self._node(route, p)
+                cost = self.dist(a, c) + self.dist(c, b) - self.dist(a, b)
+                if (best is None or cost < best[0]) and self._fits_between(route, p - 1, p, c):
+                    best = (cost, route, p)
+        if best is None:
+            return False
+        _, route, p = best
+        route.stops.insert(p, c)
+        self.update(route)
+        return True
+
+    def improve(self, time_budget=None):
+        """Apply improving relocate and exchange moves between routes until none is left
+
+        Returns the number of moves applied.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        moves = 0
+        improved = True
+        while improved:
+            improved = False
+            for u in range(self.n):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return moves
+                if self.route_of[u] is None or u == self.depot:
+                    continue
+                if self._relocate(u) or self._exchange(u):
+                    moves += 1
+                    improved = True
+        return moves
+
+    def _relocate(self, u):
+        """Move u next to a neighboring city on another route if that shortens the total"""
+        source = self.route_of[u]
+        p = self.position[u]
+        a, b = self._node(source, p - 1), self._node(source, p + 1)
+        gain = self.dist(a, u) + self.dist(u, b) - self.dist(a, b)
+        if gain <= EPSILON or not self._bridges(source, p - 1, p + 1):
+            return False
+
+        for v in self.neighbors[u]:
+            target = self.route_of[v]
+            if target is None or target is source or target.load + self.demand[u] > self.capacity:
+                continue
+            q = self.position[v]
+            # Insert u just before or just after v
+            for before in (q - 1, q):
+                c, d = self._node(target, before), self._node(target, before + 1)
+                cost = self.dist(c, u) + self.dist(u, d) - self.dist(c, d)
+                if cost - gain < -EPSILON and self._fits_between(target, before, before + 1, u):
+                    del source.stops[p]
+                    target.stops.insert(before + 1, u)
+                    self.update(target)
+                    if source.stops:
+                        self.update(source)
+                    else:
+                        self.routes.remove(source)
+                    return True
+        return False
+
+    def _exchange(self, u):
+        """Swap u with a neighboring city on another route if that shortens the total"""
+        first = self.route_of[u]
+        p = self.position[u]
+        a, b = self._node(first, p - 1), self._node(first, p + 1)
+        removed_u = self.dist(a, u) + self.dist(u, b)
+
+        for v in self.neighbors[u]:
+            second = self.route_of[v]
+            if second is None or second is first:
+                continue
+            if (first.load - self.demand[u] + self.demand[v] > self.capacity
+                    or second.load - self.demand[v] + self.demand[u] > self.capacity):
+                continue
+            q = self.position[v]
+            c, d = self._node(second, q - 1), self._node(second, q + 1)
+            delta = (self.dist(a, v) + self.dist(v, b) - removed_u
+                     + self.dist(c, u) + self.dist(u, d) - self.dist(c, v) - self.dist(v, d))
+            if (delta < -EPSILON and self._fits_between(first, p - 1, p + 1, v)
+                    and self._fits_between(second, q - 1, q + 1, u)):
+                first.stops[p], second.stops[q] = v, u
+                self.update(first)
+                self.update(second)
+                return True
+        return False